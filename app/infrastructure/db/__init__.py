@@ -6,15 +6,26 @@ incluindo modelos SQLAlchemy e repositórios.
 """
 
 from .database import db, bcrypt
-from .models import UserModel, ComplaintModel, NotificationModel, VoteModel, ResponseModel
+from .password_hasher import password_hasher, PasswordHasherBusy
+from .user_lookup import user_lookup, UserSnapshot
+from .availability_filter import availability_filter
+from .token_blocklist import token_blocklist
+from .models import UserModel, ComplaintModel, NotificationModel, VoteModel, ResponseModel, RevokedTokenModel
 
 __all__ = [
     'db', 
     'bcrypt', 
+    'password_hasher',
+    'PasswordHasherBusy',
+    'user_lookup',
+    'UserSnapshot',
+    'availability_filter',
+    'token_blocklist',
     'UserModel', 
     'ComplaintModel', 
     'NotificationModel', 
     'VoteModel', 
-    'ResponseModel'
+    'ResponseModel',
+    'RevokedTokenModel'
 ]
 
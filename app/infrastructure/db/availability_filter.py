@@ -0,0 +1,190 @@
+"""
+Filtros de Disponibilidade
+
+Filtros de Bloom em memória para username, email e CPF. Um valor ausente do
+filtro está livre com certeza e é respondido sem consultar o banco; só os
+possíveis duplicados seguem para a consulta no índice único.
+"""
+
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, exists, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from .database import db
+
+AVAILABILITY_SESSION_KEY = 'availability_values'
+FIELDS = ('username', 'email', 'cpf')
+
+
+class BloomFilter:
+    """Filtro de Bloom de tamanho fixo; nunca responde False para um valor adicionado."""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(int(capacity), 1)
+        self.size = max(64, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str):
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hash_count)]
+
+    def add(self, value: str) -> None:
+        positions = self._positions(value)
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    def expected_false_positive_rate(self) -> float:
+        """Taxa de falso positivo esperada para a ocupação atual."""
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class AvailabilityFilter:
+    """
+    Disponibilidade de username, email e CPF com filtros de Bloom.
+
+    Valores confirmados nesta aplicação entram no filtro no commit; usuários
+    criados ou alterados por outros processos são lidos numa consulta
+    incremental a cada ``refresh_interval`` segundos. As restrições únicas
+    da tabela continuam sendo a garantia final no cadastro.
+    """
+
+    def __init__(self):
+        self.error_rate = 0.01
+        self.min_capacity = 100000
+        self.refresh_interval = 30
+        self._filters = None
+        self._max_id = 0
+        self._refreshed_at = None
+        self._next_refresh = 0.0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        """
+        Lê a configuração dos filtros e registra os eventos de sessão.
+
+        Args:
+            app: Instância da aplicação Flask
+        """
+        self.error_rate = app.config.get('AVAILABILITY_FILTER_ERROR_RATE', 0.01)
+        self.min_capacity = app.config.get('AVAILABILITY_FILTER_CAPACITY', 100000)
+        self.refresh_interval = app.config.get('AVAILABILITY_FILTER_REFRESH', 30)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def build(self):
+        """Monta os filtros a partir da tabela de usuários (requer contexto da aplicação)."""
+        from .models import UserModel
+
+        refreshed_at = datetime.utcnow()
+        total = db.session.execute(select(func.count(UserModel.id))).scalar() or 0
+        filters = {field: BloomFilter(max(self.min_capacity, total * 2), self.error_rate) for field in FIELDS}
+        max_id = 0
+        rows = db.session.execute(
+            select(UserModel.id, UserModel.username, UserModel.email, UserModel.cpf).execution_options(yield_per=5000)
+        )
+        for row in rows:
+            for field in FIELDS:
+                filters[field].add(getattr(row, field))
+            max_id = max(max_id, row.id)
+
+        with self._lock:
+            self._filters = filters
+            self._max_id = max_id
+            self._refreshed_at = refreshed_at
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def _refresh(self):
+        from .models import UserModel
+
+        if time.monotonic() < self._next_refresh or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            refreshed_at = datetime.utcnow()
+            rows = db.session.execute(
+                select(UserModel.id, UserModel.username, UserModel.email, UserModel.cpf).where(or_(
+                    UserModel.id > self._max_id,
+                    UserModel.updated_at >= self._refreshed_at - timedelta(seconds=5)
+                ))
+            ).all()
+            for row in rows:
+                for field in FIELDS:
+                    self._filters[field].add(getattr(row, field))
+                self._max_id = max(self._max_id, row.id)
+            self._refreshed_at = refreshed_at
+            outgrown = self._filters['email'].count > self._filters['email'].capacity
+        finally:
+            self._lock.release()
+
+        if outgrown:
+            self.build()
+
+    def _after_flush(self, session, flush_context):
+        from .models import UserModel
+
+        if self._filters is None:
+            return
+        users = [obj for obj in session.new if isinstance(obj, UserModel)]
+        users.extend(
+            obj for obj in session.dirty if isinstance(obj, UserModel)
+            and any(inspect(obj).attrs[field].history.has_changes() for field in FIELDS)
+        )
+        if users:
+            session.info.setdefault(AVAILABILITY_SESSION_KEY, []).extend(
+                {field: getattr(user, field) for field in FIELDS} for user in users
+            )
+
+    def _after_commit(self, session):
+        values = session.info.pop(AVAILABILITY_SESSION_KEY, None)
+        filters = self._filters
+        if values and filters is not None:
+            for row in values:
+                for field in FIELDS:
+                    filters[field].add(row[field])
+
+    def _after_rollback(self, session):
+        session.info.pop(AVAILABILITY_SESSION_KEY, None)
+
+    def is_taken(self, field: str, value: str) -> bool:
+        """
+        Verifica se algum usuário já usa o valor.
+
+        Args:
+            field: 'username', 'email' ou 'cpf'
+            value: Valor já no formato armazenado
+
+        Returns:
+            True se o valor já está em uso
+        """
+        from .models import UserModel
+
+        if self._filters is not None:
+            self._refresh()
+            if value not in self._filters[field]:
+                return False
+
+        column = getattr(UserModel, field)
+        return bool(db.session.execute(select(exists().where(column == value))).scalar())
+
+
+# Instância compartilhada
+availability_filter = AvailabilityFilter()
@@ -9,6 +9,8 @@ from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 import os
 
+from .password_hasher import password_hasher
+
 # Instâncias das extensões
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -31,10 +33,36 @@ def init_database(app):
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'dev-jwt-secret-key')
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = int(os.getenv('JWT_ACCESS_TOKEN_EXPIRES', 3600))
     
+    # Configuração do hashing de senhas
+    app.config['BCRYPT_LOG_ROUNDS'] = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+    if os.getenv('PASSWORD_HASH_WORKERS'):
+        app.config['PASSWORD_HASH_WORKERS'] = int(os.getenv('PASSWORD_HASH_WORKERS'))
+    
     # Inicialização das extensões
     db.init_app(app)
     bcrypt.init_app(app)
     jwt.init_app(app)
+    password_hasher.init_app(app)
+    
+    # Usuário do token (current_user) a partir do cache de snapshots
+    from .user_lookup import user_lookup
+    user_lookup.init_app(app)
+    
+    @jwt.user_lookup_loader
+    def load_user(jwt_header, jwt_payload):
+        return user_lookup.get(jwt_payload['sub'])
+    
+    # Filtros de disponibilidade de username/email/CPF (montados em create_tables)
+    from .availability_filter import availability_filter
+    availability_filter.init_app(app)
+    
+    # Tokens revogados no logout, verificados em memória
+    from .token_blocklist import token_blocklist
+    token_blocklist.init_app(app)
+    
+    @jwt.token_in_blocklist_loader
+    def check_token_revoked(jwt_header, jwt_payload):
+        return token_blocklist.is_revoked(jwt_payload['jti'])
 
 
 def create_tables(app):
@@ -44,8 +72,15 @@ def create_tables(app):
     Args:
         app: Instância da aplicação Flask
     """
+    from .availability_filter import availability_filter
+    from .token_blocklist import token_blocklist
+    
     with app.app_context():
         db.create_all()
+        availability_filter.build()
+    
+    # Revogações lidas e varridas numa thread, fora das requisições
+    token_blocklist.start()
 
 
 def drop_tables(app):
@@ -138,3 +138,18 @@ class NotificationModel(db.Model):
     def __repr__(self):
         return f'<NotificationModel {self.title[:30]}... - {self.notification_type}>'
 
+
+
+class RevokedTokenModel(db.Model):
+    """Modelo SQLAlchemy para tokens JWT revogados no logout."""
+    
+    __tablename__ = 'revoked_tokens'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self):
+        return f'<RevokedTokenModel {self.jti}>'
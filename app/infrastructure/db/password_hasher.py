@@ -0,0 +1,13 @@
+"""
+Hashing de Senhas
+
+Executa o bcrypt num pool de threads limitado, para que rajadas de login e
+cadastro não ocupem todos os workers com CPU. A implementação (pool, fila,
+timeout e estatísticas) é o PasswordService de src/services/password_service.py;
+aqui fica só a instância usada pelo app/.
+"""
+
+from src.services.password_service import PasswordService, PasswordHasherBusy
+
+# Instância compartilhada pelos casos de uso do app/ (configurada em init_db)
+password_hasher = PasswordService()
@@ -0,0 +1,154 @@
+"""
+Lista de Tokens Revogados
+
+Guarda em memória os ``jti`` revogados no logout até o token expirar, para que
+a verificação a cada requisição seja uma consulta a um dicionário. As
+revogações são gravadas no banco, o que as preserva entre reinícios e permite
+que cada processo leia as feitas pelos demais.
+"""
+
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import delete, insert, select
+
+from .database import db
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBlocklist:
+    """
+    Tokens revogados, com expiração igual ao tempo restante de cada token.
+
+    Uma thread em segundo plano lê as revogações feitas por outros processos
+    numa consulta incremental a cada ``poll_interval`` segundos e remove as
+    entradas expiradas da memória e da tabela a cada ``sweep_interval``
+    segundos; a verificação das requisições só consulta o dicionário.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.poll_interval = 1
+        self.sweep_interval = 300
+        self._revoked = {}
+        self._last_id = 0
+        self._lock = threading.Lock()
+        self._worker = None
+        self._stop = threading.Event()
+
+    def init_app(self, app):
+        """
+        Lê a configuração da lista de revogação.
+
+        Args:
+            app: Instância da aplicação Flask
+        """
+        self.app = app
+        self.poll_interval = app.config.get('TOKEN_REVOCATION_POLL_INTERVAL', 1)
+        self.sweep_interval = app.config.get('TOKEN_REVOCATION_SWEEP_INTERVAL', 300)
+
+    def start(self):
+        """Lê as revogações ainda válidas e inicia a thread de sincronização."""
+        if self._worker:
+            return
+        with self.app.app_context():
+            self._poll()
+            db.session.remove()
+        self._worker = threading.Thread(target=self._run, name='token-blocklist', daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout=None):
+        """Encerra a thread de sincronização."""
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+        self._stop.clear()
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        return (value - datetime(1970, 1, 1)).total_seconds()
+
+    def _poll(self):
+        from .models import RevokedTokenModel
+
+        rows = db.session.execute(
+            select(RevokedTokenModel.id, RevokedTokenModel.jti, RevokedTokenModel.expires_at).where(
+                RevokedTokenModel.id > self._last_id,
+                RevokedTokenModel.expires_at > datetime.utcnow()
+            ).order_by(RevokedTokenModel.id)
+        ).all()
+        if rows:
+            with self._lock:
+                for row in rows:
+                    self._revoked[row.jti] = self._timestamp(row.expires_at)
+                self._last_id = rows[-1].id
+
+    def _sweep(self):
+        from .models import RevokedTokenModel
+
+        current = time.time()
+        with self._lock:
+            # Reconstruído em vez de alterado, para que as consultas nunca vejam o dicionário mudando
+            self._revoked = {jti: exp for jti, exp in self._revoked.items() if exp > current}
+        try:
+            db.session.execute(delete(RevokedTokenModel).where(RevokedTokenModel.expires_at <= datetime.utcnow()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def _run(self):
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.wait(self.poll_interval):
+            try:
+                with self.app.app_context():
+                    self._poll()
+                    if time.monotonic() >= next_sweep:
+                        next_sweep = time.monotonic() + self.sweep_interval
+                        self._sweep()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Erro ao sincronizar tokens revogados: {str(e)}")
+
+    def is_revoked(self, jti: str) -> bool:
+        """
+        Verifica se um token foi revogado.
+
+        Args:
+            jti: Identificador do token
+
+        Returns:
+            True se o token foi revogado e ainda não expirou
+        """
+        expires = self._revoked.get(jti)
+        return expires is not None and expires > time.time()
+
+    def revoke(self, jwt_payload: dict):
+        """
+        Revoga um token até a sua expiração.
+
+        Args:
+            jwt_payload: Claims do token (``get_jwt()``)
+        """
+        from .models import RevokedTokenModel
+
+        jti, expires = jwt_payload['jti'], jwt_payload['exp']
+        if expires <= time.time() or self.is_revoked(jti):
+            return
+        with self._lock:
+            self._revoked[jti] = expires
+        db.session.execute(insert(RevokedTokenModel).values(
+            jti=jti,
+            user_id=int(jwt_payload['sub']) if jwt_payload.get('sub') is not None else None,
+            expires_at=datetime.utcfromtimestamp(expires),
+            revoked_at=datetime.utcnow()
+        ))
+        db.session.commit()
+
+
+# Instância compartilhada
+token_blocklist = TokenBlocklist()
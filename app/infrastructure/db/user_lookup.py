@@ -0,0 +1,147 @@
+"""
+Consulta de Usuários por Identidade
+
+Resolve a identidade do JWT para um snapshot imutável do usuário, com memória
+por requisição e um cache LRU com TTL no processo, para que as verificações de
+permissão não consultem o banco a cada requisição.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from .database import db
+
+USER_LOOKUP_SESSION_KEY = 'user_snapshot_changes'
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Cópia somente leitura dos campos usados em autorização."""
+    id: int
+    role: str
+    city: str
+    is_active: bool
+
+
+class UserLookup:
+    """
+    Cache de snapshots de usuários.
+
+    Alterações em usuários confirmadas nesta aplicação (perfil, papel,
+    desativação) removem a entrada no commit; o TTL limita por quanto tempo
+    uma alteração feita por outro processo pode não ser vista.
+    """
+
+    def __init__(self):
+        self.cache_size = 10000
+        self.cache_ttl = 60
+        self._cache = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listening = False
+
+    def init_app(self, app):
+        """
+        Lê a configuração do cache e registra os eventos de invalidação.
+
+        Args:
+            app: Instância da aplicação Flask
+        """
+        self.cache_size = app.config.get('USER_LOOKUP_CACHE_SIZE', 10000)
+        self.cache_ttl = app.config.get('USER_LOOKUP_CACHE_TTL', 60)
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_flush(self, session, flush_context):
+        from .models import UserModel
+
+        changed = {obj.id for obj in session.dirty if isinstance(obj, UserModel) and session.is_modified(obj)}
+        changed.update(obj.id for obj in session.deleted if isinstance(obj, UserModel))
+        if changed:
+            session.info.setdefault(USER_LOOKUP_SESSION_KEY, set()).update(changed)
+
+    def _after_commit(self, session):
+        for user_id in session.info.pop(USER_LOOKUP_SESSION_KEY, None) or ():
+            self.invalidate(user_id)
+
+    def _after_rollback(self, session):
+        session.info.pop(USER_LOOKUP_SESSION_KEY, None)
+
+    def get(self, user_id) -> Optional[UserSnapshot]:
+        """
+        Busca o snapshot de um usuário.
+
+        Args:
+            user_id: ID do usuário
+
+        Returns:
+            Snapshot do usuário ou None se ele não existir
+        """
+        from .models import UserModel
+
+        user_id = int(user_id)
+        memo = None
+        if has_app_context():
+            memo = g.setdefault('user_snapshots', {})
+            if user_id in memo:
+                return memo[user_id]
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            snapshot = cached[0] if cached is not None and now - cached[1] < self.cache_ttl else None
+            generation = self._generation
+
+        if snapshot is None:
+            row = db.session.query(
+                UserModel.id, UserModel.role, UserModel.city, UserModel.is_active
+            ).filter(UserModel.id == user_id).first()
+            if row is None:
+                return None
+            snapshot = UserSnapshot(row.id, row.role, row.city, bool(row.is_active))
+            with self._lock:
+                if generation == self._generation:
+                    self._cache[user_id] = (snapshot, now)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+        else:
+            with self._lock:
+                if user_id in self._cache:
+                    self._cache.move_to_end(user_id)
+
+        if memo is not None:
+            memo[user_id] = snapshot
+        return snapshot
+
+    def invalidate(self, user_id=None):
+        """
+        Remove o snapshot de um usuário (ou de todos, quando None).
+
+        Args:
+            user_id: ID do usuário
+        """
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(int(user_id), None)
+        if has_app_context() and 'user_snapshots' in g:
+            if user_id is None:
+                g.user_snapshots.clear()
+            else:
+                g.user_snapshots.pop(int(user_id), None)
+
+
+# Instância compartilhada
+user_lookup = UserLookup()
@@ -5,7 +5,7 @@ Contém as rotas da API relacionadas à autenticação de usuários.
 """
 
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 
 from ...usecases.auth_usecases import (
     RegisterUserUseCase, 
@@ -14,6 +14,8 @@ from ...usecases.auth_usecases import (
     CheckUsernameAvailabilityUseCase,
     CheckEmailAvailabilityUseCase
 )
+from ...infrastructure.db.password_hasher import PasswordHasherBusy
+from src.services.rate_limit_service import rate_limit
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/api/auth')
 
@@ -57,6 +59,11 @@ def register():
                 'message': message
             }), 400
             
+    except PasswordHasherBusy as e:
+        return jsonify({
+            'success': False,
+            'message': 'Servidor ocupado, tente novamente em instantes'
+        }), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -65,6 +72,7 @@ def register():
 
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit()
 def login():
     """Endpoint para login de usuários."""
     try:
@@ -93,6 +101,11 @@ def login():
                 'message': message
             }), 401
             
+    except PasswordHasherBusy as e:
+        return jsonify({
+            'success': False,
+            'message': 'Servidor ocupado, tente novamente em instantes'
+        }), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({
             'success': False,
@@ -105,11 +118,9 @@ def login():
 def logout():
     """Endpoint para logout de usuários."""
     try:
-        user_id = get_jwt_identity()
-        
         # Executar caso de uso
         use_case = LogoutUserUseCase()
-        success, message = use_case.execute(user_id)
+        success, message = use_case.execute(get_jwt())
         
         if success:
             return jsonify({
@@ -130,6 +141,7 @@ def logout():
 
 
 @auth_bp.route('/check-username', methods=['GET'])
+@rate_limit()
 def check_username():
     """Endpoint para verificar disponibilidade de username."""
     try:
@@ -159,6 +171,7 @@ def check_username():
 
 
 @auth_bp.route('/check-email', methods=['GET'])
+@rate_limit()
 def check_email():
     """Endpoint para verificar disponibilidade de email."""
     try:
@@ -10,6 +10,7 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from ...usecases.complaint_usecases import (
     CreateComplaintUseCase,
     UpdateComplaintUseCase,
+    ChangeComplaintStatusUseCase,
     VoteComplaintUseCase,
     GetComplaintsUseCase,
     DeleteComplaintUseCase
@@ -177,6 +178,45 @@ def update_complaint(complaint_id):
         }), 500
 
 
+@complaint_bp.route('/<int:complaint_id>/status', methods=['PATCH'])
+@jwt_required()
+def change_complaint_status(complaint_id):
+    """Endpoint para responder ou resolver uma reclamação."""
+    try:
+        user_id = get_jwt_identity()
+        data = request.get_json() or {}
+        
+        if not data.get('status'):
+            return jsonify({
+                'success': False,
+                'message': 'Campo status é obrigatório'
+            }), 400
+        
+        # Executar caso de uso
+        use_case = ChangeComplaintStatusUseCase()
+        success, message, complaint_data = use_case.execute(
+            user_id, complaint_id, data['status'], data.get('response')
+        )
+        
+        if success:
+            return jsonify({
+                'success': True,
+                'message': message,
+                'data': complaint_data
+            }), 200
+        else:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), 400
+            
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Erro interno: {str(e)}'
+        }), 500
+
+
 @complaint_bp.route('/<int:complaint_id>', methods=['DELETE'])
 @jwt_required()
 def delete_complaint(complaint_id):
@@ -13,6 +13,7 @@ from ...usecases.user_usecases import (
     GetUserProfileUseCase,
     UploadProfilePictureUseCase
 )
+from ...infrastructure.db.password_hasher import PasswordHasherBusy
 
 user_bp = Blueprint('users', __name__, url_prefix='/api/users')
 
@@ -118,6 +119,11 @@ def change_password():
                 'message': message
             }), 400
             
+    except PasswordHasherBusy as e:
+        return jsonify({
+            'success': False,
+            'message': 'Servidor ocupado, tente novamente em instantes'
+        }), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         return jsonify({
             'success': False,
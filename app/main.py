@@ -8,9 +8,11 @@ import os
 from flask import Flask, send_from_directory
 from flask_cors import CORS
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
 
 from .infrastructure.db.database import init_database, create_tables
 from .interfaces.api import auth_bp, complaint_bp, user_bp, notification_bp
+from src.services.rate_limit_service import rate_limit_service
 
 # Carregar variáveis de ambiente
 load_dotenv()
@@ -33,6 +35,22 @@ def create_app():
     app.config['UPLOAD_FOLDER'] = os.getenv('UPLOAD_FOLDER', 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_CONTENT_LENGTH', 16777216))  # 16MB
     
+    # Processos que servem a aplicação (gunicorn: mesmo valor de -w)
+    app.config['WORKER_PROCESSES'] = int(os.getenv('WEB_CONCURRENCY', 1))
+    
+    # Proxies reversos (Nginx) na frente da aplicação: o endereço do cliente vem do X-Forwarded-For
+    app.config['TRUSTED_PROXIES'] = int(os.getenv('TRUSTED_PROXIES', 0))
+    if app.config['TRUSTED_PROXIES']:
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app,
+            x_for=app.config['TRUSTED_PROXIES'],
+            x_proto=app.config['TRUSTED_PROXIES'],
+            x_host=app.config['TRUSTED_PROXIES']
+        )
+    
+    # Limites de requisições (login e verificações de disponibilidade)
+    rate_limit_service.init_app(app)
+    
     # Configurar CORS
     CORS(app, origins="*")
     
@@ -12,7 +12,9 @@ Contém:
 """
 
 from .auth_usecases import RegisterUserUseCase, LoginUserUseCase, LogoutUserUseCase
-from .complaint_usecases import CreateComplaintUseCase, UpdateComplaintUseCase, VoteComplaintUseCase
+from .complaint_usecases import (
+    CreateComplaintUseCase, UpdateComplaintUseCase, ChangeComplaintStatusUseCase, VoteComplaintUseCase
+)
 from .user_usecases import UpdateUserProfileUseCase, ChangePasswordUseCase
 from .notification_usecases import SendNotificationUseCase, MarkNotificationAsReadUseCase
 
@@ -22,6 +24,7 @@ __all__ = [
     'LogoutUserUseCase',
     'CreateComplaintUseCase',
     'UpdateComplaintUseCase',
+    'ChangeComplaintStatusUseCase',
     'VoteComplaintUseCase',
     'UpdateUserProfileUseCase',
     'ChangePasswordUseCase',
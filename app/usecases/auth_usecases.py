@@ -11,7 +11,10 @@ from flask_jwt_extended import create_access_token
 from werkzeug.security import generate_password_hash, check_password_hash
 
 from ..domain.entities.user import User
-from ..infrastructure.db.database import db, bcrypt
+from ..infrastructure.db.database import db
+from ..infrastructure.db.password_hasher import password_hasher, PasswordHasherBusy
+from ..infrastructure.db.availability_filter import availability_filter
+from ..infrastructure.db.token_blocklist import token_blocklist
 from ..infrastructure.db.models import UserModel
 
 
@@ -59,7 +62,7 @@ class RegisterUserUseCase:
                 username=user_entity.username,
                 email=user_entity.email,
                 cpf=user_entity.cpf,
-                password_hash=bcrypt.generate_password_hash(user_data['password']).decode('utf-8'),
+                password_hash=password_hasher.hash_password(user_data['password']),
                 role=user_entity.role,
                 city=user_entity.city,
                 full_name=user_entity.full_name,
@@ -78,22 +81,24 @@ class RegisterUserUseCase:
             
         except ValueError as e:
             return False, str(e), None
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
             db.session.rollback()
             return False, f"Erro interno: {str(e)}", None
     
     def _username_exists(self, username: str) -> bool:
         """Verifica se o username já existe."""
-        return UserModel.query.filter_by(username=username).first() is not None
+        return availability_filter.is_taken('username', username)
     
     def _email_exists(self, email: str) -> bool:
         """Verifica se o email já existe."""
-        return UserModel.query.filter_by(email=email).first() is not None
+        return availability_filter.is_taken('email', email)
     
     def _cpf_exists(self, cpf: str) -> bool:
         """Verifica se o CPF já existe."""
         formatted_cpf = User._format_cpf(cpf)
-        return UserModel.query.filter_by(cpf=formatted_cpf).first() is not None
+        return availability_filter.is_taken('cpf', formatted_cpf)
 
 
 class LoginUserUseCase:
@@ -123,9 +128,15 @@ class LoginUserUseCase:
                 return False, "Conta desativada", None
             
             # Verificar senha
-            if not bcrypt.check_password_hash(user_model.password_hash, password):
+            matches, new_hash = password_hasher.verify(user_model.password_hash, password)
+            if not matches:
                 return False, "Senha incorreta", None
             
+            # Hash gerado com outro custo é substituído pelo custo atual
+            if new_hash:
+                user_model.password_hash = new_hash
+                db.session.commit()
+            
             # Gerar token JWT
             access_token = create_access_token(identity=user_model.id)
             
@@ -139,7 +150,10 @@ class LoginUserUseCase:
             
             return True, "Login realizado com sucesso", response_data
             
+        except PasswordHasherBusy:
+            raise
         except Exception as e:
+            db.session.rollback()
             return False, f"Erro interno: {str(e)}", None
     
     def _find_user_by_identifier(self, identifier: str) -> Optional[UserModel]:
@@ -181,23 +195,22 @@ class LoginUserUseCase:
 class LogoutUserUseCase:
     """Caso de uso para logout de usuários."""
     
-    def execute(self, user_id: int) -> Tuple[bool, str]:
+    def execute(self, jwt_payload: Dict) -> Tuple[bool, str]:
         """
-        Executa o logout de um usuário.
+        Executa o logout de um usuário, revogando o token usado na requisição.
         
         Args:
-            user_id: ID do usuário
+            jwt_payload: Claims do token (``get_jwt()``)
             
         Returns:
             Tupla contendo (sucesso, mensagem)
         """
         try:
-            # Em uma implementação mais robusta, aqui poderíamos
-            # invalidar o token JWT em uma blacklist
-            # Por enquanto, apenas retornamos sucesso
+            token_blocklist.revoke(jwt_payload)
             return True, "Logout realizado com sucesso"
             
         except Exception as e:
+            db.session.rollback()
             return False, f"Erro interno: {str(e)}"
 
 
@@ -215,7 +228,7 @@ class CheckUsernameAvailabilityUseCase:
             Tupla contendo (disponível, mensagem)
         """
         try:
-            exists = UserModel.query.filter_by(username=username).first() is not None
+            exists = availability_filter.is_taken('username', username)
             
             if exists:
                 return False, "Nome de usuário já está em uso"
@@ -244,7 +257,7 @@ class CheckEmailAvailabilityUseCase:
             if not User.is_valid_email(email):
                 return False, "Formato de email inválido"
             
-            exists = UserModel.query.filter_by(email=email).first() is not None
+            exists = availability_filter.is_taken('email', email)
             
             if exists:
                 return False, "Email já está em uso"
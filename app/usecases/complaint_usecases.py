@@ -9,9 +9,12 @@ from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
 from ..domain.entities.complaint import Complaint, ComplaintStatus
+from ..domain.entities.notification import NotificationType
 from ..domain.entities.user import User
 from ..infrastructure.db.database import db
-from ..infrastructure.db.models import ComplaintModel, UserModel, VoteModel
+from ..infrastructure.db.models import ComplaintModel, VoteModel
+from ..infrastructure.db.user_lookup import user_lookup
+from .notification_usecases import CreateComplaintNotificationUseCase
 
 
 class CreateComplaintUseCase:
@@ -30,8 +33,8 @@ class CreateComplaintUseCase:
         """
         try:
             # Verificar se o usuário existe e pode criar reclamações
-            user_model = UserModel.query.get(user_id)
-            if not user_model or not user_model.is_active:
+            user = user_lookup.get(user_id)
+            if not user or not user.is_active:
                 return False, "Usuário não encontrado ou inativo", None
             
             # Criar entidade de domínio para validação
@@ -41,7 +44,7 @@ class CreateComplaintUseCase:
                 description=complaint_data['description'],
                 category=complaint_data['category'],
                 user_id=user_id,
-                city=user_model.city,
+                city=user.city,
                 subcategory=complaint_data.get('subcategory'),
                 address=complaint_data.get('address'),
                 latitude=complaint_data.get('latitude'),
@@ -166,6 +169,80 @@ class UpdateComplaintUseCase:
         )
 
 
+class ChangeComplaintStatusUseCase:
+    """
+    Caso de uso para responder ou resolver reclamações.
+    
+    Depois de gravar o novo status, notifica o autor e os apoiadores da
+    reclamação através de CreateComplaintNotificationUseCase.
+    """
+    
+    NOTIFICATION_TYPES = {
+        ComplaintStatus.RESPONDIDA.value: NotificationType.COMPLAINT_RESPONDED.value,
+        ComplaintStatus.RESOLVIDA.value: NotificationType.COMPLAINT_RESOLVED.value
+    }
+    
+    def execute(self, user_id: int, complaint_id: int, status: str,
+                response: Optional[str] = None) -> Tuple[bool, str, Optional[Dict]]:
+        """
+        Executa a mudança de status de uma reclamação.
+        
+        Args:
+            user_id: ID do responsável que está mudando o status
+            complaint_id: ID da reclamação
+            status: Novo status ('respondida' ou 'resolvida')
+            response: Resposta ao cidadão (obrigatória para 'respondida')
+            
+        Returns:
+            Tupla contendo (sucesso, mensagem, dados_reclamacao)
+        """
+        try:
+            # Apenas responsáveis ativos gerenciam reclamações
+            user = user_lookup.get(user_id)
+            if not user or not user.is_active or user.role != 'responsavel':
+                return False, "Você não tem permissão para gerenciar reclamações", None
+            
+            if status not in self.NOTIFICATION_TYPES:
+                return False, "Status deve ser 'respondida' ou 'resolvida'", None
+            
+            complaint_model = ComplaintModel.query.get(complaint_id)
+            if not complaint_model:
+                return False, "Reclamação não encontrada", None
+            
+            complaint_entity = UpdateComplaintUseCase()._model_to_entity(complaint_model)
+            if not complaint_entity.can_be_managed_by_admin():
+                return False, "Esta reclamação já foi resolvida", None
+            
+            if status == ComplaintStatus.RESPONDIDA.value:
+                complaint_entity.mark_as_responded(user.id, response)
+            else:
+                complaint_entity.mark_as_resolved(user.id)
+            
+            complaint_model.status = complaint_entity.status
+            complaint_model.admin_response = complaint_entity.admin_response
+            complaint_model.admin_user_id = complaint_entity.admin_user_id
+            complaint_model.resolved_at = complaint_entity.resolved_at
+            complaint_model.updated_at = complaint_entity.updated_at
+            db.session.commit()
+            
+            # Notificar autor e apoiadores (transação própria)
+            notified, notification_message = CreateComplaintNotificationUseCase().execute(
+                complaint_id, self.NOTIFICATION_TYPES[status]
+            )
+            message = "Status da reclamação atualizado com sucesso"
+            if not notified:
+                message = f"{message}, mas as notificações falharam: {notification_message}"
+            
+            return True, message, complaint_entity.to_dict()
+            
+        except ValueError as e:
+            db.session.rollback()
+            return False, str(e), None
+        except Exception as e:
+            db.session.rollback()
+            return False, f"Erro interno: {str(e)}", None
+
+
 class VoteComplaintUseCase:
     """Caso de uso para votação em reclamações."""
     
@@ -182,8 +259,8 @@ class VoteComplaintUseCase:
         """
         try:
             # Verificar se o usuário existe
-            user_model = UserModel.query.get(user_id)
-            if not user_model or not user_model.is_active:
+            user = user_lookup.get(user_id)
+            if not user or not user.is_active:
                 return False, "Usuário não encontrado ou inativo", None
             
             # Verificar se a reclamação existe
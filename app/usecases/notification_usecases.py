@@ -8,9 +8,11 @@ incluindo envio, marcação como lida e listagem.
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+from sqlalchemy import case, insert, literal, select
+
 from ..domain.entities.notification import Notification, NotificationType, NotificationChannel
 from ..infrastructure.db.database import db
-from ..infrastructure.db.models import NotificationModel, UserModel
+from ..infrastructure.db.models import NotificationModel, UserModel, VoteModel
 
 
 class SendNotificationUseCase:
@@ -200,16 +202,39 @@ class GetUnreadNotificationsCountUseCase:
 
 
 class CreateComplaintNotificationUseCase:
-    """Caso de uso para criar notificações relacionadas a reclamações."""
+    """
+    Caso de uso para criar notificações relacionadas a reclamações.
+    
+    Respostas e resoluções notificam o autor e todos os apoiadores da
+    reclamação (usuários que votaram nela). Os destinatários são selecionados
+    no banco e as notificações gravadas com INSERT ... SELECT, em uma única
+    transação, sem carregar os usuários na aplicação.
+    """
+    
+    # Tipos que interessam a quem acompanha a reclamação, não só ao autor
+    SUPPORTER_NOTIFICATION_TYPES = (
+        NotificationType.COMPLAINT_RESPONDED.value,
+        NotificationType.COMPLAINT_RESOLVED.value
+    )
     
-    def execute(self, complaint_id: int, notification_type: str, target_users: List[int] = None) -> Tuple[bool, str]:
+    # Destinatários explícitos por INSERT (limite de parâmetros do SQLite)
+    CHUNK_SIZE = 500
+    
+    INSERT_COLUMNS = [
+        'user_id', 'title', 'message', 'notification_type', 'channel',
+        'is_read', 'is_sent', 'related_complaint_id', 'created_at', 'sent_at'
+    ]
+    
+    def execute(self, complaint_id: int, notification_type: str, target_users: List[int] = None,
+                notify_supporters: Optional[bool] = None) -> Tuple[bool, str]:
         """
         Cria notificações para eventos relacionados a reclamações.
         
         Args:
             complaint_id: ID da reclamação
             notification_type: Tipo da notificação
-            target_users: Lista de IDs de usuários (opcional)
+            target_users: Lista de IDs de usuários (opcional; substitui autor e apoiadores)
+            notify_supporters: Notificar quem votou na reclamação (padrão: respostas e resoluções)
             
         Returns:
             Tupla contendo (sucesso, mensagem)
@@ -222,32 +247,102 @@ class CreateComplaintNotificationUseCase:
             if not complaint_model:
                 return False, "Reclamação não encontrada"
             
-            # Definir usuários alvo
-            if target_users is None:
-                target_users = [complaint_model.user_id]
-            
-            # Definir título e mensagem baseado no tipo
-            title, message = self._get_notification_content(notification_type, complaint_model)
-            
-            # Criar notificações para cada usuário
-            for user_id in target_users:
-                notification_data = {
-                    'user_id': user_id,
-                    'title': title,
-                    'message': message,
-                    'notification_type': notification_type,
-                    'channel': NotificationChannel.IN_APP.value,
-                    'related_complaint_id': complaint_id
-                }
+            # Definir título e mensagem do autor e dos apoiadores
+            author_content = self._get_notification_content(notification_type, complaint_model)
+            supporter_content = self._get_supporter_content(notification_type, complaint_model)
+            
+            # Validar o conteúdo uma única vez através da entidade
+            for title, message in (author_content, supporter_content):
+                Notification(
+                    id=None,
+                    user_id=complaint_model.user_id,
+                    title=title,
+                    message=message,
+                    notification_type=notification_type,
+                    channel=NotificationChannel.IN_APP.value,
+                    related_complaint_id=complaint_id
+                )
+            
+            if notify_supporters is None:
+                notify_supporters = notification_type in self.SUPPORTER_NOTIFICATION_TYPES
+            
+            now = datetime.utcnow()
+            created = 0
+            
+            if target_users is not None:
+                target_users = list(dict.fromkeys(target_users))
+                for start in range(0, len(target_users), self.CHUNK_SIZE):
+                    chunk = target_users[start:start + self.CHUNK_SIZE]
+                    created += self._insert_from(
+                        select(UserModel.id).where(UserModel.id.in_(chunk), UserModel.is_active == True),
+                        UserModel.id, complaint_model, notification_type, author_content, supporter_content, now
+                    )
+            else:
+                created += self._insert_from(
+                    select(UserModel.id).where(UserModel.id == complaint_model.user_id),
+                    UserModel.id, complaint_model, notification_type, author_content, supporter_content, now
+                )
                 
-                send_usecase = SendNotificationUseCase()
-                send_usecase.execute(notification_data)
+                if notify_supporters:
+                    # Um voto por usuário (unique_user_complaint_vote): sem duplicatas
+                    created += self._insert_from(
+                        select(VoteModel.user_id).join(
+                            UserModel, UserModel.id == VoteModel.user_id
+                        ).where(
+                            VoteModel.complaint_id == complaint_id,
+                            VoteModel.user_id != complaint_model.user_id,
+                            UserModel.is_active == True
+                        ),
+                        VoteModel.user_id, complaint_model, notification_type, author_content, supporter_content, now
+                    )
             
-            return True, "Notificações criadas com sucesso"
+            db.session.commit()
+            
+            return True, f"{created} notificações criadas com sucesso"
             
+        except ValueError as e:
+            db.session.rollback()
+            return False, str(e)
         except Exception as e:
+            db.session.rollback()
             return False, f"Erro interno: {str(e)}"
     
+    def _insert_from(self, recipients, user_id_column, complaint_model, notification_type: str,
+                     author_content: Tuple[str, str], supporter_content: Tuple[str, str],
+                     now: datetime) -> int:
+        """Grava uma notificação por destinatário selecionado (INSERT ... SELECT)."""
+        is_author = user_id_column == complaint_model.user_id
+        rows = recipients.with_only_columns(
+            user_id_column,
+            case((is_author, literal(author_content[0])), else_=literal(supporter_content[0])),
+            case((is_author, literal(author_content[1])), else_=literal(supporter_content[1])),
+            literal(notification_type),
+            literal(NotificationChannel.IN_APP.value),
+            literal(False, db.Boolean),
+            literal(True, db.Boolean),
+            literal(complaint_model.id),
+            literal(now, db.DateTime),
+            literal(now, db.DateTime)
+        )
+        result = db.session.execute(insert(NotificationModel).from_select(self.INSERT_COLUMNS, rows))
+        return result.rowcount
+    
+    def _get_supporter_content(self, notification_type: str, complaint_model) -> Tuple[str, str]:
+        """Gera título e mensagem para quem apoiou a reclamação."""
+        if notification_type == NotificationType.COMPLAINT_RESPONDED.value:
+            title = "Reclamação Apoiada Respondida"
+            message = f"A reclamação '{complaint_model.title}' que você apoiou foi respondida por um gestor."
+        
+        elif notification_type == NotificationType.COMPLAINT_RESOLVED.value:
+            title = "Reclamação Apoiada Resolvida"
+            message = f"A reclamação '{complaint_model.title}' que você apoiou foi marcada como resolvida."
+        
+        else:
+            title = "Atualização da Reclamação"
+            message = f"Há uma atualização na reclamação '{complaint_model.title}' que você apoiou."
+        
+        return title, message
+    
     def _get_notification_content(self, notification_type: str, complaint_model) -> Tuple[str, str]:
         """Gera título e mensagem baseado no tipo de notificação."""
         if notification_type == NotificationType.COMPLAINT_RESPONDED.value:
@@ -9,7 +9,8 @@ from typing import Dict, Optional, Tuple
 from datetime import datetime
 
 from ..domain.entities.user import User
-from ..infrastructure.db.database import db, bcrypt
+from ..infrastructure.db.database import db
+from ..infrastructure.db.password_hasher import password_hasher, PasswordHasherBusy
 from ..infrastructure.db.models import UserModel
 
 
@@ -115,7 +116,7 @@ class ChangePasswordUseCase:
             new_password = password_data['new_password']
             
             # Verificar senha atual
-            if not bcrypt.check_password_hash(user_model.password_hash, current_password):
+            if not password_hasher.check_password(user_model.password_hash, current_password):
                 return False, "Senha atual incorreta"
             
             # Validar nova senha
@@ -126,7 +127,7 @@ class ChangePasswordUseCase:
                 return False, "A nova senha deve ser diferente da atual"
             
             # Atualizar senha
-            user_model.password_hash = bcrypt.generate_password_hash(new_password).decode('utf-8')
+            user_model.password_hash = password_hasher.hash_password(new_password)
             user_model.updated_at = datetime.utcnow()
             
             # Salvar no banco
@@ -134,6 +135,9 @@ class ChangePasswordUseCase:
             
             return True, "Senha alterada com sucesso"
             
+        except PasswordHasherBusy:
+            db.session.rollback()
+            raise
         except Exception as e:
             db.session.rollback()
             return False, f"Erro interno: {str(e)}"
@@ -0,0 +1,84 @@
+"""Availability checks answered by the Bloom filters vs a unique-index lookup per keystroke.
+
+Seeds a temporary SQLite database with users, builds the filters and probes
+free and taken values, reporting memory, expected and observed false-positive
+rate and per-check latency.
+
+Usage: python benchmarks/availability_filter.py [users] [probes]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import exists, insert, select
+
+from src.database import db
+from src.models.user import User
+from src.services.availability_service import FIELDS, availability_service
+
+
+def timed_us(check, values):
+    timings = []
+    for value in values:
+        started = time.perf_counter()
+        check(value)
+        timings.append((time.perf_counter() - started) * 1e6)
+        db.session.remove()
+    return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95)]
+
+
+def main():
+    user_count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    probes = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        availability_service.init_app(app)
+        for start in range(0, user_count, 10000):
+            db.session.execute(insert(User), [{
+                'username': f'cidadao{i}', 'email': f'cidadao{i}@example.com', 'cpf': f'{i:011d}',
+                'password_hash': 'x', 'role': 'reclamante', 'city': 'cuiaba', 'full_name': f'Cidadão {i}'
+            } for i in range(start, min(start + 10000, user_count))])
+        db.session.commit()
+
+        started = time.perf_counter()
+        availability_service.build()
+        print(f"users={user_count} filters built in {time.perf_counter() - started:.2f} s")
+
+        free = [f'novo{i}@example.com' for i in range(probes)]
+        taken = [f'cidadao{i}@example.com' for i in range(0, user_count, max(1, user_count // 1000))]
+        for value in free:
+            availability_service.is_taken('email', value)
+        assert all(availability_service.is_taken('email', value) for value in taken)
+
+        stats = availability_service.get_stats()['fields']
+        memory = sum(stats[field]['memory_bytes'] for field in FIELDS)
+        email = stats['email']
+        print(f"memory {memory / 1024:.0f} KiB for {len(FIELDS)} fields "
+              f"({email['memory_bytes'] * 8 / email['items']:.1f} bits/user, {email['hash_count']} hashes), "
+              f"capacity {email['capacity']}")
+        print(f"false positives: expected {email['expected_false_positive_rate']:.4%}, "
+              f"observed {email['false_positives']}/{probes} = {email['false_positives'] / probes:.4%}")
+
+        column = User.email
+        query_p50, query_p95 = timed_us(
+            lambda value: db.session.execute(select(exists().where(column == value))).scalar(), free[:2000]
+        )
+        filter_p50, filter_p95 = timed_us(lambda value: availability_service.is_taken('email', value), free[:2000])
+        print(f"free value, index lookup  p50 {query_p50:7.1f} us   p95 {query_p95:7.1f} us")
+        print(f"free value, bloom filter  p50 {filter_p50:7.1f} us   p95 {filter_p95:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Notification table size and inbox latency, rendered messages vs template key + parameters.
+
+Seeds a temporary SQLite database with notifications stored the old way
+(fully rendered email bodies), measures, converts them with
+``migrate_stored_messages`` and measures again.
+
+Usage: python benchmarks/notification_storage.py [notifications] [users]
+"""
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import func, insert, text
+
+from src.database import db
+from src.models.user import User
+from src.models.complaint import Complaint
+from src.models.notification import Notification, NotificationCounter, BroadcastNotification
+from src.services.broadcast_service import broadcast_service
+from src.services.notification_service import notification_service
+from src.services.notification_templates import template_registry
+
+COMPLAINT_TYPES = ('complaint_created', 'status_updated', 'priority_updated', 'complaint_resolved')
+
+
+def storage(label: str) -> None:
+    db.session.remove()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        conn.execute(text('VACUUM'))
+    message_bytes = db.session.query(func.sum(
+        func.length(Notification.message) + func.coalesce(func.length(Notification.template_params), 0)
+    )).scalar()
+    page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+    page_count = db.session.execute(text('PRAGMA page_count')).scalar()
+    rows = Notification.query.count()
+    print(f"{label:<28} message+params {message_bytes / rows:7.1f} B/row   database {page_size * page_count / 1e6:7.2f} MB")
+
+
+def list_latency(label: str, user_ids, rounds: int) -> None:
+    timings = []
+    for user_id in random.Random(7).choices(user_ids, k=rounds):
+        started = time.perf_counter()
+        notification_service.get_user_notifications(user_id, limit=20)
+        timings.append((time.perf_counter() - started) * 1000)
+        db.session.remove()
+    print(f"{label:<28} list 20 p50 {statistics.median(timings):6.2f} ms   "
+          f"p95 {sorted(timings)[int(len(timings) * 0.95)]:6.2f} ms")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    user_count = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        notification_service.init_app(app)
+        broadcast_service.init_app(app)
+
+        db.session.execute(insert(User), [{
+            'username': f'user{i}', 'email': f'user{i}@example.com', 'cpf': f'{i:011d}',
+            'password_hash': 'x', 'role': 'reclamante', 'city': 'cuiaba', 'full_name': f'Cidadão {i}'
+        } for i in range(1, user_count + 1)])
+        db.session.execute(insert(Complaint), [{
+            'title': f'Buraco na rua {i}', 'description': 'Buraco grande na via', 'category': 'infraestrutura',
+            'address': f'Rua {i}, Centro', 'city': 'cuiaba', 'status': 'pendente', 'priority': 'normal',
+            'user_id': (i % user_count) + 1, 'created_at': datetime(2025, 1, 1) + timedelta(hours=i)
+        } for i in range(1, user_count + 1)])
+        db.session.commit()
+
+        users = {user.id: user for user in User.query.all()}
+        complaints = {complaint.id: complaint for complaint in Complaint.query.all()}
+        generator = random.Random(42)
+        rows = []
+        for i in range(count):
+            user_id = generator.randint(1, user_count)
+            created_at = datetime(2025, 2, 1) + timedelta(minutes=i)
+            if generator.random() < 0.1:
+                content = template_registry.render_all('system', 'welcome', user=users[user_id])
+                complaint_id, notification_type = None, 'welcome'
+            else:
+                complaint_id = generator.randint(1, user_count)
+                notification_type = generator.choice(COMPLAINT_TYPES)
+                content = template_registry.render_all(
+                    'complaint', notification_type, now=created_at,
+                    user=users[user_id], complaint=complaints[complaint_id]
+                )
+            rows.append({
+                'user_id': user_id, 'complaint_id': complaint_id, 'type': notification_type,
+                'title': content.subject, 'message': content.email_body, 'is_read': False,
+                'created_at': created_at
+            })
+        db.session.execute(insert(Notification), rows)
+        db.session.commit()
+
+        user_ids = list(users)
+        rounds = 2000
+        print(f"notifications={count} users={user_count}")
+        storage('rendered messages')
+        list_latency('rendered messages', user_ids, rounds)
+
+        started = time.perf_counter()
+        report = notification_service.migrate_stored_messages()
+        print(f"migration: {report['converted']}/{report['scanned']} rows converted "
+              f"in {time.perf_counter() - started:.1f} s, left as text: {report['unconverted'] or 'none'}")
+
+        storage('template key + params')
+        template_registry._stored_cache.clear()
+        list_latency('template, cold render cache', user_ids, rounds)
+        list_latency('template, warm render cache', user_ids, rounds)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""Per-message cost of notification rendering and MIME encoding at bulk scale.
+
+Usage: python benchmarks/notification_templates.py [recipients] [distinct_names]
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.services.notification_service import NotificationService
+from src.services.notification_templates import SYSTEM_TEMPLATES, template_registry
+
+
+def per_message_us(started: float, count: int) -> float:
+    return (time.perf_counter() - started) / count * 1e6
+
+
+def main():
+    recipients = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    distinct_names = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    users = [
+        SimpleNamespace(full_name=f'Cidadão {i % distinct_names}', email=f'user{i}@example.com')
+        for i in range(recipients)
+    ]
+    extra = {'complaints_count': 3, 'votes_count': 12, 'resolved_count': 1, 'xp_gained': 80}
+
+    service = NotificationService()
+    service.init_app(Flask(__name__))
+
+    # Every template of the group rendered per send (previous behaviour)
+    started = time.perf_counter()
+    for user in users:
+        for notification_type in SYSTEM_TEMPLATES:
+            tuple(template_registry.render_all('system', notification_type, user=user, extra=extra))
+    all_types_us = per_message_us(started, recipients)
+
+    # Only the requested type and the parts an email send reads
+    started = time.perf_counter()
+    contents = []
+    for user in users:
+        content = service._generate_system_notification_content('monthly_report', user, extra)
+        contents.append((content.subject, content.email_body))
+    one_type_us = per_message_us(started, recipients)
+
+    # Rendered once per distinct set of user fields (bulk path)
+    started = time.perf_counter()
+    rendered = {}
+    for user in users:
+        if user.full_name not in rendered:
+            rendered[user.full_name] = tuple(
+                service._generate_system_notification_content('monthly_report', user, extra)
+            )
+    bulk_us = per_message_us(started, recipients)
+
+    results = {}
+    for label, cache_size in (('mime_uncached', 0), ('mime_cached', service.mime_cache_size)):
+        service.mime_cache_size = cache_size
+        service._mime_parts.clear()
+        started = time.perf_counter()
+        for user, (subject, body) in zip(users, contents):
+            service._build_email(user.email, subject, body).as_bytes()
+        results[label] = per_message_us(started, recipients)
+
+    print(f"recipients={recipients} distinct_names={distinct_names}")
+    print(f"render all types per send : {all_types_us:8.1f} us/message")
+    print(f"render requested parts    : {one_type_us:8.1f} us/message")
+    print(f"render once per field set : {bulk_us:8.1f} us/message")
+    print(f"build+encode email        : {results['mime_uncached']:8.1f} us/message")
+    print(f"build+encode email cached : {results['mime_cached']:8.1f} us/message")
+
+
+if __name__ == '__main__':
+    main()
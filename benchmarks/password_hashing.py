@@ -0,0 +1,94 @@
+"""Login throughput of the bounded bcrypt pool, per core, and its behaviour past saturation.
+
+Runs verifications straight through ``PasswordService`` (no HTTP, no database):
+first with 1..N pool workers under enough concurrent callers to keep them busy,
+then a burst larger than workers + queue to count 503 rejections.
+
+Usage: python benchmarks/password_hashing.py [rounds] [seconds_per_run]
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from src.services.password_service import PasswordHasherBusy, PasswordService
+
+
+def configured(rounds: int, workers: int, queue_size: int) -> PasswordService:
+    app = Flask(__name__)
+    app.config.update(
+        BCRYPT_LOG_ROUNDS=rounds,
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_QUEUE_SIZE=queue_size,
+        PASSWORD_HASH_TIMEOUT=60
+    )
+    return PasswordService(app)
+
+
+def throughput(service: PasswordService, password_hash: str, callers: int, seconds: float) -> float:
+    deadline = time.perf_counter() + seconds
+    done = [0] * callers
+
+    def caller(index):
+        while time.perf_counter() < deadline:
+            service.check_password(password_hash, 'senha-segura')
+            done[index] += 1
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=caller, args=(i,)) for i in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sum(done) / (time.perf_counter() - started)
+
+
+def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 12
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+    cores = os.cpu_count() or 1
+
+    service = configured(rounds, 1, 4)
+    password_hash = service.hash_password('senha-segura')
+    started = time.perf_counter()
+    service.check_password(password_hash, 'senha-segura')
+    print(f"rounds={rounds} cores={cores} single verification {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    for workers in sorted({1, max(1, cores // 2), cores, cores * 2}):
+        service = configured(rounds, workers, workers * 4)
+        rate = throughput(service, password_hash, callers=workers * 2, seconds=seconds)
+        print(f"workers={workers:<3} logins/s {rate:7.1f}   per core {rate / min(workers, cores):6.1f}")
+        service.shutdown()
+
+    # A burst of 4x what the pool accepts: the excess is rejected at once instead of queued
+    workers, queue_size = cores, cores * 4
+    service = configured(rounds, workers, queue_size)
+    burst = (workers + queue_size) * 4
+    outcomes = {'ok': 0, 'busy': 0}
+    lock = threading.Lock()
+
+    def login(_):
+        try:
+            service.check_password(password_hash, 'senha-segura')
+            key = 'ok'
+        except PasswordHasherBusy:
+            key = 'busy'
+        with lock:
+            outcomes[key] += 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=burst) as callers:
+        list(callers.map(login, range(burst)))
+    print(f"burst of {burst} (pool {workers}+{queue_size}): {outcomes['ok']} served, "
+          f"{outcomes['busy']} answered 503 in {time.perf_counter() - started:.2f} s")
+    print(f"stats {service.get_stats()}")
+    service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
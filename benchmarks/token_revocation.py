@@ -0,0 +1,90 @@
+"""Per-request cost of the revoked-token check on a protected endpoint.
+
+Seeds a temporary SQLite database with revoked tokens and times a no-op
+``@jwt_required()`` route with no blocklist loader, with the in-memory
+revocation set, and with a ``revoked_token`` lookup per request.
+
+Usage: python benchmarks/token_revocation.py [revoked] [requests]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token, jwt_required
+from sqlalchemy import exists, insert, select
+
+from src.database import db
+from src.models.user import RevokedToken
+from src.services.token_revocation_service import token_revocation_service
+
+
+def make_app(path, blocklist):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'benchmark-jwt-secret-key-not-for-production'
+    db.init_app(app)
+    jwt = JWTManager(app)
+    if blocklist is not None:
+        jwt.token_in_blocklist_loader(blocklist)
+
+    @app.route('/ping')
+    @jwt_required()
+    def ping():
+        return '', 204
+
+    return app
+
+
+def timed_us(app, token, requests):
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        response = client.get('/ping', headers=headers)
+        timings.append((time.perf_counter() - started) * 1e6)
+        assert response.status_code == 204, response.status_code
+    return statistics.median(timings), sorted(timings)[int(len(timings) * 0.95)]
+
+
+def main():
+    revoked = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    requests = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    expires_at = datetime.utcnow() + timedelta(hours=1)
+    variants = {
+        'no blocklist': None,
+        'in-memory set': lambda header, payload: token_revocation_service.is_revoked(payload['jti']),
+        'database lookup': lambda header, payload: db.session.execute(
+            select(exists().where(RevokedToken.jti == payload['jti']))
+        ).scalar(),
+    }
+
+    for name, blocklist in variants.items():
+        app = make_app(path, blocklist)
+        with app.app_context():
+            if name == 'no blocklist':
+                db.create_all()
+                for start in range(0, revoked, 10000):
+                    db.session.execute(insert(RevokedToken), [{
+                        'jti': str(uuid.uuid4()), 'expires_at': expires_at, 'revoked_at': datetime.utcnow()
+                    } for _ in range(start, min(start + 10000, revoked))])
+                db.session.commit()
+            token_revocation_service.init_app(app)
+            loaded = token_revocation_service.load()
+            token = create_access_token(identity='1')
+        p50, p95 = timed_us(app, token, requests)
+        print(f"{name:16s} revoked={loaded}  p50 {p50:7.1f} us   p95 {p95:7.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,8 +1,93 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
+from types import SimpleNamespace
+
+from sqlalchemy import func, insert, inspect, literal, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.schema import CreateColumn
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 jwt = JWTManager()
 
+
+def upgrade_schema():
+    """Aplica em bancos já existentes as colunas e índices adicionados aos modelos.
+
+    O ``db.create_all()`` só cria tabelas que ainda não existem; colunas novas
+    (que devem ser nullable ou ter ``server_default``) e índices novos de
+    tabelas antigas são criados aqui.
+    """
+    inspector = inspect(db.engine)
+    with db.engine.begin() as conn:
+        preparer = conn.dialect.identifier_preparer
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+
+            existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing_columns:
+                    column_ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                    conn.execute(text(
+                        f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {column_ddl}"
+                    ))
+
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
+# INSERT ... ON CONFLICT DO UPDATE por dialeto; os demais usam o fallback portável de ``upsert``
+_ON_CONFLICT_INSERT = {
+    'sqlite': sqlite.insert,
+    'postgresql': postgresql.insert,
+}
+
+
+def greatest(*expressions):
+    """Maior de várias expressões: ``max()`` escalar no SQLite, ``GREATEST`` nos demais bancos"""
+    if db.engine.dialect.name == 'sqlite':
+        return func.max(*expressions)
+    return func.greatest(*expressions)
+
+
+def upsert(table, rows, key, updates, connection=None):
+    """Insere ``rows`` em ``table`` ou, nas linhas cuja chave já existe, aplica ``updates``.
+
+    Args:
+        table: Tabela (``Model.__table__``)
+        rows: Lista de dicionários com os valores de cada linha
+        key: Colunas do índice único que identificam a linha
+        updates: Função que recebe os valores novos (``new.coluna``) e devolve
+            o dicionário coluna -> expressão do UPDATE
+        connection: Conexão a usar (ex.: dentro de um hook de flush); padrão ``db.session``
+
+    SQLite e PostgreSQL usam um único INSERT ... ON CONFLICT DO UPDATE. Nos
+    demais bancos cada linha faz um UPDATE e, se nenhuma linha mudou, um
+    INSERT em savepoint; se outra transação inseriu a mesma chave nesse
+    meio tempo, o UPDATE é repetido. Não faz commit.
+    """
+    if not rows:
+        return
+
+    executor = connection or db.session
+    make_insert = _ON_CONFLICT_INSERT.get(db.engine.dialect.name)
+    if make_insert is not None:
+        stmt = make_insert(table)
+        executor.execute(stmt.on_conflict_do_update(index_elements=key, set_=updates(stmt.excluded)), rows)
+        return
+
+    conn = connection or db.session.connection()
+    for row in rows:
+        new = SimpleNamespace(**{name: literal(value, table.c[name].type) for name, value in row.items()})
+        changed = update(table).where(*(table.c[name] == row[name] for name in key)).values(updates(new))
+        if conn.execute(changed).rowcount:
+            continue
+        try:
+            with conn.begin_nested():
+                conn.execute(insert(table).values(**row))
+        except IntegrityError:
+            # Inserida por outra transação depois do UPDATE acima
+            conn.execute(changed)
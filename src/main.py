@@ -6,11 +6,13 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 
 from flask import Flask, send_from_directory
 from flask_cors import CORS
-from src.database import db, bcrypt, jwt
-from src.models.user import User
-from src.models.complaint import Complaint, Vote, Response
-from src.models.notification import Notification
-from src.models.gamification import UserPoints, UserBadge, Badge, PointHistory, CityRanking
+from werkzeug.middleware.proxy_fix import ProxyFix
+from src.database import db, bcrypt, jwt, upgrade_schema
+from src.services.etag_service import conditional
+from src.models.user import User, RevokedToken
+from src.models.complaint import Complaint, Vote, Response, ComplaintVersion
+from src.models.notification import Notification, BroadcastNotification, NotificationArchive, NotificationCounter, NotificationDelivery
+from src.models.gamification import UserPoints, UserBadge, Badge, PointHistory, PointMonthly, PointHistoryArchive, CityRanking
 
 # Importar blueprints
 from src.routes.auth import auth_bp
@@ -33,6 +35,20 @@ app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 # Configurações de upload
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
 
+# Processos que servem a aplicação: um no servidor de desenvolvimento; sob o gunicorn
+# o valor de WEB_CONCURRENCY (INSTALL.md) ou, sem ele, o -w 4 documentado
+app.config['WORKER_PROCESSES'] = int(os.environ.get('WEB_CONCURRENCY', 1 if __name__ == '__main__' else 4))
+
+# Proxies reversos (Nginx) na frente da aplicação: o endereço do cliente vem do X-Forwarded-For
+app.config['TRUSTED_PROXIES'] = int(os.environ.get('TRUSTED_PROXIES', 0))
+if app.config['TRUSTED_PROXIES']:
+    app.wsgi_app = ProxyFix(
+        app.wsgi_app,
+        x_for=app.config['TRUSTED_PROXIES'],
+        x_proto=app.config['TRUSTED_PROXIES'],
+        x_host=app.config['TRUSTED_PROXIES']
+    )
+
 # Inicializar extensões
 db.init_app(app)
 bcrypt.init_app(app)
@@ -55,13 +71,58 @@ app.register_blueprint(maps_bp)
 # Criar tabelas e dados iniciais
 with app.app_context():
     db.create_all()
+    upgrade_schema()
     
     # Inicializar serviços
     from src.services.notification_service import notification_service
     from src.services.maps_service import maps_service
+    from src.services.ranking_service import ranking_service
+    from src.services.leaderboard_service import leaderboard_service
+    from src.services.badge_service import badge_service
+    from src.services.point_rollup_service import point_rollup_service
+    from src.services.delivery_service import delivery_service
+    from src.services.unread_counter_service import unread_counter_service
+    from src.services.notification_stream_service import notification_stream_service
+    from src.services.notification_retention_service import notification_retention_service
+    from src.services.broadcast_service import broadcast_service
+    from src.services.password_service import password_service
+    from src.services.user_lookup_service import user_lookup_service
+    from src.services.availability_service import availability_service
+    from src.services.token_revocation_service import token_revocation_service
+    from src.services.rate_limit_service import rate_limit_service
+    from src.services.admission_service import admission_service
+    from src.services.deadline_service import deadline_service
+    from src.services.etag_service import etag_service
+    from src.services.response_cache_service import response_cache_service
+    from src.services.single_flight_service import single_flight_service
     
     notification_service.init_app(app)
     maps_service.init_app(app)
+    ranking_service.init_app(app)
+    leaderboard_service.init_app(app)
+    badge_service.init_app(app)
+    point_rollup_service.init_app(app)
+    delivery_service.init_app(app)
+    delivery_service.start()
+    unread_counter_service.init_app(app)
+    unread_counter_service.ensure_initialized()
+    notification_stream_service.init_app(app)
+    notification_stream_service.start()
+    notification_retention_service.init_app(app)
+    broadcast_service.init_app(app)
+    password_service.init_app(app)
+    user_lookup_service.init_app(app)
+    availability_service.init_app(app)
+    availability_service.build()
+    token_revocation_service.init_app(app)
+    token_revocation_service.load()
+    token_revocation_service.start()
+    rate_limit_service.init_app(app)
+    admission_service.init_app(app)
+    deadline_service.init_app(app)
+    etag_service.init_app(app)
+    response_cache_service.init_app(app)
+    single_flight_service.init_app(app)
     
     # Criar badges padrão se não existirem
     default_badges = [
@@ -177,6 +238,26 @@ def invalid_token_callback(error):
 def missing_token_callback(error):
     return {'message': 'Token de acesso necessário'}, 401
 
+# Usuário do token (current_user): snapshot em cache, sem consulta na maioria das requisições
+@jwt.user_lookup_loader
+def user_lookup_callback(jwt_header, jwt_payload):
+    from src.services.user_lookup_service import user_lookup_service
+    return user_lookup_service.get(jwt_payload['sub'])
+
+# Tokens revogados no logout: consulta em memória, sem acesso ao banco
+@jwt.token_in_blocklist_loader
+def token_in_blocklist_callback(jwt_header, jwt_payload):
+    from src.services.token_revocation_service import token_revocation_service
+    return token_revocation_service.is_revoked(jwt_payload['jti'])
+
+@jwt.revoked_token_loader
+def revoked_token_callback(jwt_header, jwt_payload):
+    return {'message': 'Token revogado'}, 401
+
+@jwt.user_lookup_error_loader
+def user_lookup_error_callback(jwt_header, jwt_payload):
+    return {'message': 'Usuário não encontrado'}, 404
+
 # Rota de health check
 @app.route('/api/health')
 def health_check():
@@ -184,6 +265,7 @@ def health_check():
 
 # Rota para informações da API
 @app.route('/api/info')
+@conditional('static')
 def api_info():
     return {
         'name': 'deuruimcidadao API',
@@ -112,3 +112,18 @@ class Response(db.Model):
             } if self.admin_user else None
         }
 
+
+
+class ComplaintVersion(db.Model):
+    """Versão dos dados de reclamações por cidade, incrementada na mesma transação de cada alteração.
+
+    A linha com ``city = '*'`` muda quando dados de usuário exibidos nas
+    reclamações (nome, username) mudam. Usada para ETags das rotas de leitura.
+    """
+    __tablename__ = 'complaint_version'
+
+    city = db.Column(db.String(100), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<ComplaintVersion {self.city}: {self.version}>'
@@ -21,15 +21,24 @@ class UserPoints(db.Model):
         
         # Calcular novo nível (a cada 100 pontos = 1 nível)
         new_level = (self.total_points // 100) + 1
-        if new_level > self.level:
+        leveled_up = new_level > self.level
+        if leveled_up:
             self.level = new_level
-            # Criar badge de nível se necessário
-            Badge.award_level_badge(self.user_id, new_level)
         
         # Registrar histórico
-        PointHistory.create_record(self.user_id, points, action)
+        record = PointHistory.create_record(self.user_id, points, action)
         
         db.session.commit()
+        
+        # Atualizar ranking ao vivo da cidade
+        from src.services.leaderboard_service import leaderboard_service
+        leaderboard_service.record_points(record, self.user.city)
+        
+        # Avaliar badges de atividade e de nível
+        from src.services.badge_service import badge_service
+        badge_service.handle_event(
+            self.user_id, action, level=self.level if leveled_up else None, record_id=record.id
+        )
         return self.points
 
     def get_level_progress(self):
@@ -64,6 +73,12 @@ class PointHistory(db.Model):
     # Relacionamento
     user = db.relationship('User', backref='point_history')
 
+    # Índices para filtros por intervalo de datas (ranking mensal) e histórico do usuário
+    __table_args__ = (
+        db.Index('idx_point_history_created_at', 'created_at'),
+        db.Index('idx_point_history_user_created', 'user_id', 'created_at'),
+    )
+
     @staticmethod
     def create_record(user_id, points, action):
         record = PointHistory(
@@ -83,6 +98,46 @@ class PointHistory(db.Model):
         }
 
 
+class PointHistoryArchive(db.Model):
+    """Registros brutos de pontos de meses antigos, já consolidados em PointMonthly"""
+    __tablename__ = 'point_history_archive'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    points = db.Column(db.Integer, nullable=False)
+    action = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class PointMonthly(db.Model):
+    """Consolidação mensal de PointHistory por usuário e cidade"""
+    __tablename__ = 'point_monthly'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    city = db.Column(db.String(100), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    month = db.Column(db.Integer, nullable=False)
+    points = db.Column(db.Integer, default=0)
+    actions = db.Column(db.JSON, default=dict)  # Histograma {ação: quantidade}
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'city', 'year', 'month', name='unique_point_monthly'),
+        db.Index('idx_point_monthly_city_period', 'city', 'year', 'month'),
+    )
+
+    def to_dict(self):
+        return {
+            'city': self.city,
+            'year': self.year,
+            'month': self.month,
+            'points': self.points,
+            'actions': self.actions or {}
+        }
+
+
 class Badge(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -96,19 +151,8 @@ class Badge(db.Model):
     @staticmethod
     def award_level_badge(user_id, level):
         """Concede badge de nível"""
-        level_badges = {
-            5: {'name': 'Cidadão Iniciante', 'icon': 'star'},
-            10: {'name': 'Cidadão Ativo', 'icon': 'star-fill'},
-            25: {'name': 'Cidadão Engajado', 'icon': 'award'},
-            50: {'name': 'Cidadão Exemplar', 'icon': 'trophy'},
-            100: {'name': 'Guardião da Cidade', 'icon': 'crown'}
-        }
-        
-        if level in level_badges:
-            badge_info = level_badges[level]
-            badge = Badge.query.filter_by(name=badge_info['name']).first()
-            if badge:
-                UserBadge.award_badge(user_id, badge.id)
+        from src.services.badge_service import badge_service
+        return badge_service.handle_event(user_id, 'level_up', level=level)
 
     def to_dict(self):
         return {
@@ -173,45 +217,8 @@ class CityRanking(db.Model):
     @staticmethod
     def update_monthly_ranking(city):
         """Atualiza o ranking mensal de uma cidade"""
-        from datetime import datetime
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        
-        # Buscar usuários da cidade com mais pontos no mês
-        users_points = db.session.query(
-            User.id,
-            func.sum(PointHistory.points).label('total_points')
-        ).join(PointHistory).filter(
-            User.city == city.lower(),
-            func.extract('month', PointHistory.created_at) == current_month,
-            func.extract('year', PointHistory.created_at) == current_year
-        ).group_by(User.id).order_by(desc('total_points')).all()
-        
-        # Atualizar ranking
-        for position, (user_id, points) in enumerate(users_points, 1):
-            ranking = CityRanking.query.filter_by(
-                city=city.lower(),
-                user_id=user_id,
-                month=current_month,
-                year=current_year
-            ).first()
-            
-            if ranking:
-                ranking.points = points
-                ranking.rank_position = position
-                ranking.updated_at = datetime.utcnow()
-            else:
-                ranking = CityRanking(
-                    city=city.lower(),
-                    user_id=user_id,
-                    points=points,
-                    rank_position=position,
-                    month=current_month,
-                    year=current_year
-                )
-                db.session.add(ranking)
-        
-        db.session.commit()
+        from src.services.ranking_service import ranking_service
+        return ranking_service.recompute_city(city)
 
     def to_dict(self):
         return {
@@ -245,18 +252,20 @@ def get_user_badges(self):
 
 def get_user_ranking(self, city=None):
     """Retorna posição no ranking da cidade"""
+    from src.services.leaderboard_service import leaderboard_service
+    
     target_city = city or self.city
-    current_month = datetime.now().month
-    current_year = datetime.now().year
+    ranking = leaderboard_service.get_user_rank(self.id, target_city)
     
-    ranking = CityRanking.query.filter_by(
-        city=target_city.lower(),
-        user_id=self.id,
-        month=current_month,
-        year=current_year
-    ).first()
+    if not ranking:
+        return None
     
-    return ranking.to_dict() if ranking else None
+    ranking['user'] = {
+        'id': self.id,
+        'username': self.username,
+        'full_name': self.full_name
+    }
+    return ranking
 
 # Adicionar métodos ao modelo User
 from src.models.user import User
@@ -1,14 +1,28 @@
 from src.database import db
+from src.services.notification_templates import template_registry
 from datetime import datetime
+import json
+import zlib
 
 class Notification(db.Model):
+    # Índices das consultas frequentes: caixa de entrada, não lidas, estatísticas e retenção
+    __table_args__ = (
+        db.Index('idx_notification_user_created', 'user_id', 'created_at'),
+        db.Index('idx_notification_user_unread', 'user_id', 'is_read'),
+        db.Index('idx_notification_created', 'created_at'),
+        db.Index('idx_notification_retention', 'type', 'is_read', 'created_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     complaint_id = db.Column(db.Integer, db.ForeignKey('complaint.id'), nullable=True)
     type = db.Column(db.String(50), nullable=False)  # 'complaint_created', 'status_updated', 'response_added'
     title = db.Column(db.String(200), nullable=False)
-    message = db.Column(db.Text, nullable=False)
+    message = db.Column(db.Text, nullable=False)  # vazio quando a mensagem é gerada pelo template
+    template_key = db.Column(db.String(80), nullable=True)  # 'grupo:tipo' em notification_templates
+    template_params = db.Column(db.Text, nullable=True)  # JSON com os valores lidos pelo template
     is_read = db.Column(db.Boolean, default=False)
+    read_at = db.Column(db.DateTime, nullable=True)
     sent_email = db.Column(db.Boolean, default=False)
     sent_whatsapp = db.Column(db.Boolean, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -24,15 +38,25 @@ class Notification(db.Model):
             'complaint_id': self.complaint_id,
             'type': self.type,
             'title': self.title,
-            'message': self.message,
+            'message': self.get_message(),
             'is_read': self.is_read,
             'sent_email': self.sent_email,
             'sent_whatsapp': self.sent_whatsapp,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+    def get_message(self):
+        if self.template_key and not self.message:
+            # Sem o texto original, o título é o que resta se o template não renderizar mais
+            return template_registry.render_stored(self.template_key, self.template_params, fallback=self.title)
+        return self.message
+
     def mark_as_read(self):
-        self.is_read = True
+        if not self.is_read:
+            from src.services.unread_counter_service import unread_counter_service
+            self.is_read = True
+            self.read_at = datetime.utcnow()
+            unread_counter_service.increment(self.user_id, -1)
         db.session.commit()
 
     @staticmethod
@@ -45,9 +69,144 @@ class Notification(db.Model):
             message=message
         )
         db.session.add(notification)
+        
+        from src.services.unread_counter_service import unread_counter_service
+        unread_counter_service.increment(user_id)
         db.session.commit()
         return notification
 
     def __repr__(self):
         return f'<Notification {self.id}: {self.type} for User {self.user_id}>'
 
+
+class BroadcastNotification(db.Model):
+    """Aviso gravado uma única vez para um público (todos, uma cidade ou um papel)"""
+    __tablename__ = 'broadcast_notification'
+    __table_args__ = (
+        db.Index('idx_broadcast_notification_audience', 'audience', 'audience_value', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    audience = db.Column(db.String(20), nullable=False)  # 'all', 'city', 'role'
+    audience_value = db.Column(db.String(100), nullable=True)  # cidade ou papel
+    type = db.Column(db.String(50), nullable=False, default='system_announcement')
+    title = db.Column(db.String(200), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'broadcast': True,
+            'audience': self.audience,
+            'audience_value': self.audience_value,
+            'complaint_id': None,
+            'type': self.type,
+            'title': self.title,
+            'message': self.message,
+            'sent_email': False,
+            'sent_whatsapp': False,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+    def __repr__(self):
+        return f'<BroadcastNotification {self.id}: {self.audience}={self.audience_value}>'
+
+
+class NotificationArchive(db.Model):
+    """Notificações lidas que passaram do prazo de retenção, com o conteúdo comprimido"""
+    __tablename__ = 'notification_archive'
+
+    id = db.Column(db.Integer, primary_key=True)  # mesmo id da notificação original
+    user_id = db.Column(db.Integer, nullable=False, index=True)
+    type = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime)
+    read_at = db.Column(db.DateTime, nullable=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payload = db.Column(db.LargeBinary, nullable=False)  # JSON comprimido com zlib
+
+    @staticmethod
+    def pack(data):
+        return zlib.compress(json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+    def to_dict(self):
+        data = json.loads(zlib.decompress(self.payload).decode('utf-8'))
+        template_key = data.pop('template_key', None)
+        template_params = data.pop('template_params', None)
+        if template_key and not data.get('message'):
+            data['message'] = template_registry.render_stored(
+                template_key, template_params, fallback=data.get('title', '')
+            )
+        data.update({
+            'id': self.id,
+            'user_id': self.user_id,
+            'type': self.type,
+            'is_read': True,
+            'read_at': self.read_at.isoformat() if self.read_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'archived_at': self.archived_at.isoformat() if self.archived_at else None
+        })
+        return data
+
+
+class NotificationCounter(db.Model):
+    """Contador de notificações não lidas por usuário, mantido na mesma transação"""
+    __tablename__ = 'notification_counter'
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    unread_count = db.Column(db.Integer, nullable=False, default=0)
+    # Maior id de BroadcastNotification já lido pelo usuário
+    broadcast_read_id = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<NotificationCounter user={self.user_id}: {self.unread_count}>'
+
+
+class NotificationDelivery(db.Model):
+    """Envio pendente de uma notificação por um canal externo (outbox transacional)"""
+    __tablename__ = 'notification_delivery'
+    __table_args__ = (
+        db.Index('idx_notification_delivery_claim', 'status', 'priority', 'next_attempt_at'),
+        db.Index('idx_notification_delivery_recipient', 'user_id', 'channel', 'created_at'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    notification_id = db.Column(db.Integer, db.ForeignKey('notification.id'), nullable=False, index=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    channel = db.Column(db.String(20), nullable=False)  # 'email', 'whatsapp'
+    recipient = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=True)
+    # Vazio: corpo do email gerado no envio pela mensagem da notificação; também esvaziado após o envio
+    body = db.Column(db.Text, nullable=False)
+    priority = db.Column(db.Integer, nullable=False, default=5)  # 1 = mais urgente
+    status = db.Column(db.String(20), nullable=False, default='pending')  # pending, sending, sent, dead
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    lease_owner = db.Column(db.String(64), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    # Relacionamentos
+    notification = db.relationship('Notification', backref='deliveries')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'notification_id': self.notification_id,
+            'user_id': self.user_id,
+            'channel': self.channel,
+            'priority': self.priority,
+            'status': self.status,
+            'attempts': self.attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+    def __repr__(self):
+        return f'<NotificationDelivery {self.id}: {self.channel} {self.status}>'
+
@@ -1,4 +1,5 @@
-from src.database import db, bcrypt
+from src.database import db
+from src.services.password_service import password_service
 from datetime import datetime
 import re
 
@@ -9,30 +10,36 @@ class User(db.Model):
     cpf = db.Column(db.String(14), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='reclamante')  # 'reclamante' or 'responsavel'
-    city = db.Column(db.String(100), nullable=False)  # cidade do usuário
+    city = db.Column(db.String(100), nullable=False, index=True)  # cidade do usuário
     full_name = db.Column(db.String(200), nullable=False)
     phone = db.Column(db.String(20), nullable=True)
     profile_picture = db.Column(db.String(255), nullable=True)
     bio = db.Column(db.Text, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
+    # Preferências de notificação (lidas pelo NotificationService)
+    email_notifications = db.Column(db.Boolean, nullable=False, default=True, server_default='1')
+    whatsapp_notifications = db.Column(db.Boolean, nullable=False, default=False, server_default='0')
+    push_notifications = db.Column(db.Boolean, nullable=False, default=True, server_default='1')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Indexado para a atualização incremental dos filtros de disponibilidade
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
 
     def __init__(self, username, email, cpf, password, role='reclamante', city='cuiaba', full_name='', phone=None):
         self.username = username
         self.email = email
         self.cpf = self.format_cpf(cpf)
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_service.hash_password(password)
         self.role = role
         self.city = city.lower()
         self.full_name = full_name
         self.phone = phone
 
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password_hash, password)
+        # Hash gerado com outro custo é refeito aqui; quem chama faz o commit
+        return password_service.verify_and_upgrade(self, password)
 
     def set_password(self, password):
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_service.hash_password(password)
 
     @staticmethod
     def format_cpf(cpf):
@@ -101,3 +108,18 @@ class User(db.Model):
     def __repr__(self):
         return f'<User {self.username} - {self.city}>'
 
+
+
+class RevokedToken(db.Model):
+    """Token JWT revogado (logout); mantido até o token expirar"""
+    __tablename__ = 'revoked_token'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    token_type = db.Column(db.String(10), nullable=False, default='access')
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti} até {self.expires_at}>'
@@ -1,10 +1,20 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 from src.database import db
 from src.models.user import User
 from src.models.complaint import Complaint, Vote, Response
-from src.models.notification import Notification
-from src.models.gamification import CityRanking, UserPoints, Badge
+from src.models.gamification import UserPoints, Badge
+from src.services.ranking_service import ranking_service
+from src.services.badge_service import badge_service
+from src.services.point_rollup_service import point_rollup_service
+from src.services.notification_service import notification_service
+from src.services.password_service import password_service
+from src.services.availability_service import availability_service
+from src.services.rate_limit_service import rate_limit_service
+from src.services.admission_service import admission_exempt, admission_service
+from src.services.deadline_service import deadline_service
+from src.services.response_cache_service import response_cache_service
+from src.services.single_flight_service import single_flight, single_flight_service
 from sqlalchemy import func, desc, and_, or_
 from datetime import datetime, timedelta
 import calendar
@@ -15,8 +25,8 @@ def require_admin():
     """Decorator para verificar se o usuário é administrador"""
     def decorator(f):
         def wrapper(*args, **kwargs):
-            current_user_id = get_jwt_identity()
-            user = User.query.get(current_user_id)
+            # Snapshot do usuário do token, em cache (sem consulta ao banco)
+            user = get_current_user()
             
             if not user or user.role != 'responsavel':
                 return jsonify({'message': 'Acesso negado. Apenas administradores.'}), 403
@@ -26,13 +36,27 @@ def require_admin():
         return wrapper
     return decorator
 
+def _int_field(data, name, minimum, maximum):
+    """Inteiro opcional do corpo JSON; ValueError com a mensagem para o cliente se for inválido"""
+    value = data.get(name)
+    if value is None:
+        return None
+    # bool é subclasse de int e 2.5 viraria 2: só inteiros ou textos de dígitos
+    if isinstance(value, bool) or not isinstance(value, (int, str)) or not str(value).strip().lstrip('-').isdigit():
+        raise ValueError(f"{name} deve ser um número inteiro")
+    value = int(value)
+    if not minimum <= value <= maximum:
+        raise ValueError(f"{name} deve estar entre {minimum} e {maximum}")
+    return value
+
 @admin_bp.route('/admin/dashboard', methods=['GET'])
 @jwt_required()
 @require_admin()
+# O painel depende só da cidade do administrador
+@single_flight(key=lambda: get_current_user().city)
 def get_dashboard():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         city = user.city
         
         # Estatísticas gerais
@@ -157,8 +181,7 @@ def get_dashboard():
 @require_admin()
 def get_admin_complaints():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         city = user.city
         
         # Parâmetros de filtro
@@ -301,7 +324,7 @@ def respond_to_complaint(complaint_id):
         
         complaint.updated_at = datetime.utcnow()
         
-        # Criar notificação para o usuário
+        # Notificar o autor e os apoiadores da reclamação
         status_messages = {
             'respondida': 'Sua reclamação foi respondida pela administração.',
             'resolvido': 'Sua reclamação foi marcada como resolvida!'
@@ -309,12 +332,14 @@ def respond_to_complaint(complaint_id):
         
         notification_message = status_messages.get(new_status, 'Nova resposta em sua reclamação.')
         
-        Notification.create_notification(
-            user_id=complaint.user_id,
+        notification_service.queue_complaint_notifications(
             complaint_id=complaint_id,
-            type='response_added',
-            title='Nova Resposta',
-            message=f'{notification_message}\n\nResposta: {message}'
+            notification_type='complaint_resolved' if new_status == 'resolvido' else 'new_response',
+            extra_data={
+                'responder_name': user.full_name,
+                'response_message': message,
+                'resolution_message': f'{notification_message}\n\nResposta: {message}'
+            }
         )
         
         db.session.commit()
@@ -334,8 +359,7 @@ def respond_to_complaint(complaint_id):
 @require_admin()
 def update_complaint_priority(complaint_id):
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         complaint = Complaint.query.get_or_404(complaint_id)
         
         if complaint.city != user.city:
@@ -351,18 +375,16 @@ def update_complaint_priority(complaint_id):
         complaint.priority = new_priority
         complaint.updated_at = datetime.utcnow()
         
-        db.session.commit()
-        
         # Notificar usuário se prioridade aumentou
         if new_priority in ['alta', 'urgente'] and old_priority in ['baixa', 'normal']:
-            Notification.create_notification(
+            notification_service.queue_complaint_notification(
                 user_id=complaint.user_id,
                 complaint_id=complaint_id,
-                type='priority_updated',
-                title='Prioridade Atualizada',
-                message=f'Sua reclamação foi marcada como prioridade {new_priority}.'
+                notification_type='priority_updated'
             )
         
+        db.session.commit()
+        
         return jsonify({
             'message': 'Prioridade atualizada com sucesso',
             'complaint': complaint.to_dict()
@@ -378,8 +400,7 @@ def update_complaint_priority(complaint_id):
 @require_admin()
 def get_admin_users():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         city = user.city
         
         # Parâmetros
@@ -460,8 +481,7 @@ def get_admin_users():
 @require_admin()
 def export_reports():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         city = user.city
         
         # Parâmetros
@@ -523,16 +543,115 @@ def export_reports():
 @require_admin()
 def update_city_ranking():
     try:
-        current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         city = user.city
         
         # Atualizar ranking da cidade
-        CityRanking.update_monthly_ranking(city)
+        report = ranking_service.recompute_city(city)
         
-        return jsonify({'message': 'Ranking atualizado com sucesso'}), 200
+        return jsonify({'message': 'Ranking atualizado com sucesso', 'report': report}), 200
         
     except Exception as e:
         current_app.logger.error(f"Erro ao atualizar ranking: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
+@admin_bp.route('/admin/ranking/update-all', methods=['POST'])
+@jwt_required()
+@require_admin()
+def update_all_rankings():
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'message': 'Corpo da requisição inválido'}), 400
+        
+        try:
+            year = _int_field(data, 'year', 2000, datetime.utcnow().year)
+            month = _int_field(data, 'month', 1, 12)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # Recalcular o ranking de todas as cidades em paralelo
+        report = ranking_service.recompute_all_cities(year=year, month=month)
+        
+        return jsonify({'message': 'Rankings atualizados com sucesso', 'report': report}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao atualizar rankings: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
+@admin_bp.route('/admin/badges/backfill', methods=['POST'])
+@jwt_required()
+@require_admin()
+def backfill_badges():
+    try:
+        # Conceder badges já conquistadas pelo histórico de atividades
+        awarded = badge_service.backfill()
+        
+        return jsonify({
+            'message': 'Badges concedidas com sucesso',
+            'awarded': awarded,
+            'total_awarded': sum(awarded.values())
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao conceder badges: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
+@admin_bp.route('/admin/points/compact', methods=['POST'])
+@jwt_required()
+@require_admin()
+def compact_point_history():
+    try:
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({'message': 'Corpo da requisição inválido'}), 400
+        
+        try:
+            archive_after_months = _int_field(data, 'archive_after_months', 1, 1200)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+        
+        # Consolidar meses fechados e, opcionalmente, arquivar registros antigos
+        result = point_rollup_service.compact()
+        result['archived_rows'] = point_rollup_service.archive(archive_after_months)
+        
+        return jsonify({'message': 'Histórico de pontos consolidado com sucesso', 'result': result}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao consolidar histórico de pontos: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
+# Estatísticas dos serviços, todas no mesmo formato: caminho -> (chave da resposta, serviço, nome no log)
+STATS_ENDPOINTS = {
+    # Fila de hashing de senhas: jobs em andamento, rejeições (503) e custo atual
+    'password-hashing': ('password_hashing', password_service, 'de hashing'),
+    # Filtros de disponibilidade: memória, taxa de falso positivo esperada e observada
+    'availability-filters': ('availability_filters', availability_service, 'dos filtros'),
+    # Limites por rota: requisições aceitas e rejeitadas (429) por endpoint
+    'rate-limits': ('rate_limits', rate_limit_service, 'de limite de requisições'),
+    # Controle de admissão: estado de descarte, pressão e latência por classe de rota
+    'admission': ('admission', admission_service, 'do controle de admissão'),
+    # Prazos por rota: requisições que estouraram o prazo e as consultas interrompidas
+    'deadlines': ('deadlines', deadline_service, 'de prazos'),
+    # Cache de respostas: taxa de acerto por endpoint, entradas e invalidações
+    'response-cache': ('response_cache', response_cache_service, 'do cache de respostas'),
+    # Requisições idênticas simultâneas atendidas por uma única computação
+    'single-flight': ('single_flight', single_flight_service, 'de single-flight'),
+}
+
+def _stats_view(key, service, label):
+    def view():
+        try:
+            return jsonify({key: service.get_stats()}), 200
+            
+        except Exception as e:
+            current_app.logger.error(f"Erro ao buscar estatísticas {label}: {str(e)}")
+            return jsonify({'message': 'Erro interno do servidor'}), 500
+    view.__name__ = f"{key}_stats"
+    return view
+
+# Endpoints 'admin.<chave>_stats' (isentos do controle de admissão)
+for path, (key, service, label) in STATS_ENDPOINTS.items():
+    admin_bp.route(f'/admin/{path}', methods=['GET'])(
+        admission_exempt()(jwt_required()(require_admin()(_stats_view(key, service, label))))
+    )
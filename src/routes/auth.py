@@ -1,8 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token
+from flask_jwt_extended import create_access_token, jwt_required, get_jwt_identity, create_refresh_token, get_jwt, decode_token
 from src.database import db
 from src.models.user import User
-from src.models.notification import Notification
+from src.services.notification_service import notification_service
+from src.services.password_service import PasswordHasherBusy
+from src.services.availability_service import availability_service
+from src.services.token_revocation_service import token_revocation_service
+from src.services.rate_limit_service import rate_limit
+from sqlalchemy.exc import IntegrityError
 import re
 
 auth_bp = Blueprint('auth', __name__)
@@ -43,14 +48,14 @@ def register():
         if role not in ['reclamante', 'responsavel']:
             return jsonify({'message': 'Tipo de usuário inválido'}), 400
         
-        # Verificar se usuário já existe
-        if User.query.filter_by(username=username).first():
+        # Verificar se usuário já existe (filtros em memória; só possíveis duplicados vão ao banco)
+        if availability_service.is_taken('username', username):
             return jsonify({'message': 'Nome de usuário já existe'}), 409
         
-        if User.query.filter_by(email=email).first():
+        if availability_service.is_taken('email', email):
             return jsonify({'message': 'Email já cadastrado'}), 409
         
-        if User.query.filter_by(cpf=User.format_cpf(cpf)).first():
+        if availability_service.is_taken('cpf', cpf):
             return jsonify({'message': 'CPF já cadastrado'}), 409
         
         # Criar novo usuário
@@ -66,16 +71,14 @@ def register():
         )
         
         db.session.add(new_user)
-        db.session.commit()
+        db.session.flush()
         
-        # Criar notificação de boas-vindas
-        welcome_message = f"Bem-vindo(a) ao deuruim{city}, {full_name}! Sua conta foi criada com sucesso."
-        Notification.create_notification(
+        # Criar notificação de boas-vindas (email/WhatsApp saem pela fila de entregas)
+        notification_service.queue_system_notification(
             user_id=new_user.id,
-            type='welcome',
-            title='Bem-vindo!',
-            message=welcome_message
+            notification_type='welcome'
         )
+        db.session.commit()
         
         # Gerar tokens
         access_token = create_access_token(identity=new_user.id)
@@ -88,12 +91,20 @@ def register():
             'refresh_token': refresh_token
         }), 201
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'message': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': str(e.retry_after)}
+    except IntegrityError:
+        # Cadastrado em paralelo (outro worker) depois da verificação acima
+        db.session.rollback()
+        return jsonify({'message': 'Nome de usuário, email ou CPF já cadastrado'}), 409
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro no registro: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/login', methods=['POST'])
+@rate_limit()
 def login():
     try:
         data = request.get_json()
@@ -119,6 +130,10 @@ def login():
         if not user.is_active:
             return jsonify({'message': 'Conta desativada'}), 401
         
+        # Salvar o hash refeito com o custo atual (BCRYPT_LOG_ROUNDS)
+        if db.session.is_modified(user):
+            db.session.commit()
+        
         # Gerar tokens
         access_token = create_access_token(identity=user.id)
         refresh_token = create_refresh_token(identity=user.id)
@@ -130,7 +145,10 @@ def login():
             'refresh_token': refresh_token
         }), 200
         
+    except PasswordHasherBusy as e:
+        return jsonify({'message': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
+        db.session.rollback()
         current_app.logger.error(f"Erro no login: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
@@ -155,6 +173,30 @@ def refresh():
         current_app.logger.error(f"Erro no refresh: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    try:
+        token_revocation_service.revoke_token(get_jwt())
+        
+        # Revogar também o refresh token, se enviado
+        data = request.get_json(silent=True) or {}
+        refresh_token = data.get('refresh_token')
+        if refresh_token:
+            try:
+                refresh_payload = decode_token(refresh_token)
+            except Exception:
+                return jsonify({'message': 'Refresh token inválido'}), 400
+            if refresh_payload.get('sub') != get_jwt_identity():
+                return jsonify({'message': 'Refresh token inválido'}), 400
+            token_revocation_service.revoke_token(refresh_payload)
+        
+        return jsonify({'message': 'Logout realizado com sucesso'}), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro no logout: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
@@ -172,6 +214,7 @@ def get_current_user():
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @auth_bp.route('/validate-field', methods=['POST'])
+@rate_limit()
 def validate_field():
     """Endpoint para validar campos em tempo real durante o registro"""
     try:
@@ -182,21 +225,21 @@ def validate_field():
         if field == 'username':
             if len(value) < 3:
                 return jsonify({'valid': False, 'message': 'Nome de usuário deve ter pelo menos 3 caracteres'}), 200
-            if User.query.filter_by(username=value).first():
+            if availability_service.is_taken('username', value):
                 return jsonify({'valid': False, 'message': 'Nome de usuário já existe'}), 200
             return jsonify({'valid': True}), 200
             
         elif field == 'email':
             if not User.validate_email(value):
                 return jsonify({'valid': False, 'message': 'Email inválido'}), 200
-            if User.query.filter_by(email=value.lower()).first():
+            if availability_service.is_taken('email', value):
                 return jsonify({'valid': False, 'message': 'Email já cadastrado'}), 200
             return jsonify({'valid': True}), 200
             
         elif field == 'cpf':
             if not User.validate_cpf(value):
                 return jsonify({'valid': False, 'message': 'CPF inválido'}), 200
-            if User.query.filter_by(cpf=User.format_cpf(value)).first():
+            if availability_service.is_taken('cpf', value):
                 return jsonify({'valid': False, 'message': 'CPF já cadastrado'}), 200
             return jsonify({'valid': True}), 200
         
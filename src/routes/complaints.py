@@ -1,9 +1,13 @@
 from flask import Blueprint, request, jsonify, current_app
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 from src.database import db
 from src.models.user import User
 from src.models.complaint import Complaint, Vote, Response
-from src.models.notification import Notification
+from src.services.notification_service import notification_service
+from src.services.rate_limit_service import rate_limit
+from src.services.deadline_service import DeadlineExceeded, deadline_service
+from src.services.etag_service import conditional, etag_service
+from src.services.response_cache_service import USERS_TAG, cached, city_tag
 from sqlalchemy import or_, and_, func, desc
 from datetime import datetime, timedelta
 import os
@@ -104,16 +108,15 @@ def create_complaint():
         )
         
         db.session.add(complaint)
-        db.session.commit()
+        db.session.flush()
         
-        # Criar notificação para o usuário
-        Notification.create_notification(
+        # Criar notificação para o usuário (envios externos saem pela fila de entregas)
+        notification_service.queue_complaint_notification(
             user_id=current_user_id,
             complaint_id=complaint.id,
-            type='complaint_created',
-            title='Reclamação Registrada',
-            message=f'Sua reclamação "{title}" foi registrada com sucesso e está sendo analisada.'
+            notification_type='complaint_created'
         )
+        db.session.commit()
         
         # Adicionar pontos de gamificação
         user.add_points(10, 'complaint_created')
@@ -129,6 +132,14 @@ def create_complaint():
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @complaints_bp.route('/complaints', methods=['GET'])
+@conditional('collection', etag=lambda: etag_service.collection_etag(request.args.get('city', 'cuiaba')))
+@cached(
+    tags=lambda: [city_tag(request.args.get('city', 'cuiaba')), USERS_TAG],
+    # Buscas textuais e por proximidade variam demais para valer a pena guardar
+    when=lambda: not request.args.get('search') and not request.args.get('latitude'),
+    # O ETag vem das versões no banco: a chave acompanha as escritas dos outros workers
+    version=lambda: etag_service.versions((request.args.get('city') or 'cuiaba').lower())
+)
 def get_complaints():
     try:
         # Parâmetros de filtro
@@ -252,11 +263,14 @@ def get_complaints():
             }
         }), 200
         
+    except DeadlineExceeded as e:
+        return deadline_service.error_response(e)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar reclamações: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @complaints_bp.route('/complaints/<int:complaint_id>', methods=['GET'])
+@conditional('item', etag=etag_service.complaint_etag)
 def get_complaint(complaint_id):
     try:
         complaint = Complaint.query.get_or_404(complaint_id)
@@ -324,7 +338,7 @@ def vote_complaint(complaint_id):
 def update_complaint(complaint_id):
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         complaint = Complaint.query.get_or_404(complaint_id)
         
         # Verificar permissões
@@ -358,7 +372,7 @@ def update_complaint(complaint_id):
                 old_status = complaint.status
                 complaint.status = data['status']
                 
-                # Criar notificação se status mudou
+                # Notificar autor e apoiadores se status mudou
                 if old_status != complaint.status:
                     status_messages = {
                         'respondida': 'Sua reclamação foi respondida pela administração.',
@@ -366,12 +380,10 @@ def update_complaint(complaint_id):
                     }
                     
                     if complaint.status in status_messages:
-                        Notification.create_notification(
-                            user_id=complaint.user_id,
+                        notification_service.queue_complaint_notifications(
                             complaint_id=complaint.id,
-                            type='status_updated',
-                            title='Status Atualizado',
-                            message=status_messages[complaint.status]
+                            notification_type='complaint_resolved' if complaint.status == 'resolvido' else 'status_updated',
+                            extra_data={'admin_message': status_messages[complaint.status]}
                         )
                     
                     if complaint.status == 'resolvido':
@@ -404,7 +416,7 @@ def update_complaint(complaint_id):
 def delete_complaint(complaint_id):
     try:
         current_user_id = get_jwt_identity()
-        user = User.query.get(current_user_id)
+        user = get_current_user()
         complaint = Complaint.query.get_or_404(complaint_id)
         
         # Verificar permissões
@@ -431,6 +443,7 @@ def delete_complaint(complaint_id):
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @complaints_bp.route('/complaints/similar', methods=['POST'])
+@rate_limit()
 def find_similar_complaints():
     try:
         data = request.get_json()
@@ -487,11 +500,14 @@ def find_similar_complaints():
         
         return jsonify({'similar_complaints': complaints_data}), 200
         
+    except DeadlineExceeded as e:
+        return deadline_service.error_response(e)
     except Exception as e:
         current_app.logger.error(f"Erro ao buscar reclamações similares: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
 @complaints_bp.route('/complaints/categories', methods=['GET'])
+@conditional('static')
 def get_categories():
     """Retorna categorias e subcategorias disponíveis"""
     categories = {
@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended import jwt_required, get_current_user, verify_jwt_in_request
 from src.services.maps_service import maps_service
+from src.services.rate_limit_service import rate_limit
+from src.services.deadline_service import DeadlineExceeded, deadline_service
+from src.services.etag_service import conditional
+from src.services.response_cache_service import cached, city_tag
+from src.services.single_flight_service import single_flight
 import logging
 
 logger = logging.getLogger(__name__)
@@ -22,6 +27,7 @@ def jwt_required_optional():
 
 @maps_bp.route('/geocode', methods=['POST'])
 @jwt_required_optional()
+@rate_limit()
 def geocode_address():
     """Convert address to coordinates"""
     try:
@@ -147,6 +153,8 @@ def get_nearby_complaints():
 
 @maps_bp.route('/heatmap', methods=['GET'])
 @jwt_required_optional()
+@cached(tags=lambda: [city_tag(request.args.get('city', 'cuiaba'))])
+@single_flight()
 def get_heatmap_data():
     """Get complaint data for heatmap visualization"""
     try:
@@ -172,6 +180,8 @@ def get_heatmap_data():
             }
         }), 200
         
+    except DeadlineExceeded as e:
+        return deadline_service.error_response(e)
     except Exception as e:
         logger.error(f"Error getting heatmap data: {str(e)}")
         return jsonify({
@@ -181,6 +191,8 @@ def get_heatmap_data():
 
 @maps_bp.route('/city-stats', methods=['GET'])
 @jwt_required_optional()
+@cached(tags=lambda: [city_tag(request.args.get('city', 'cuiaba'))])
+@single_flight()
 def get_city_statistics():
     """Get geographical statistics for a city"""
     try:
@@ -194,6 +206,8 @@ def get_city_statistics():
             'statistics': stats
         }), 200
         
+    except DeadlineExceeded as e:
+        return deadline_service.error_response(e)
     except Exception as e:
         logger.error(f"Error getting city statistics: {str(e)}")
         return jsonify({
@@ -241,6 +255,7 @@ def get_route_to_complaint(complaint_id):
 
 @maps_bp.route('/validate-coordinates', methods=['POST'])
 @jwt_required_optional()
+@rate_limit()
 def validate_coordinates():
     """Validate if coordinates are reasonable for the city"""
     try:
@@ -285,6 +300,7 @@ def validate_coordinates():
 
 @maps_bp.route('/popular-locations', methods=['GET'])
 @jwt_required_optional()
+@cached(tags=lambda: [city_tag(request.args.get('city', 'cuiaba'))])
 def get_popular_locations():
     """Get most popular locations for complaints"""
     try:
@@ -311,6 +327,7 @@ def get_popular_locations():
 
 @maps_bp.route('/city-bounds', methods=['GET'])
 @jwt_required_optional()
+@conditional('static')
 def get_city_bounds():
     """Get city boundaries and center"""
     try:
@@ -345,11 +362,8 @@ def get_city_bounds():
 def get_hotspots():
     """Get complaint hotspots (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        # Check if user is admin
-        from src.models.user import User
-        current_user = User.query.get(current_user_id)
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
         
         if not current_user or current_user.role != 'gestor_publico':
             return jsonify({
@@ -381,11 +395,8 @@ def get_hotspots():
 def get_coverage_analysis():
     """Get geographical coverage analysis (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        # Check if user is admin
-        from src.models.user import User
-        current_user = User.query.get(current_user_id)
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
         
         if not current_user or current_user.role != 'gestor_publico':
             return jsonify({
@@ -1,6 +1,11 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_current_user
 from src.services.notification_service import notification_service
+from src.services.delivery_service import delivery_service
+from src.services.broadcast_service import AUDIENCES, broadcast_service
+from src.services.notification_stream_service import notification_stream_service
+from src.services.notification_retention_service import notification_retention_service
+from src.services.admission_service import admission_exempt
 from src.database import db
 import logging
 
@@ -77,6 +82,28 @@ def mark_as_read(notification_id):
             'message': 'Erro ao marcar notificação como lida'
         }), 500
 
+@notifications_bp.route('/broadcasts/<int:broadcast_id>/read', methods=['POST'])
+@jwt_required()
+def mark_broadcast_as_read(broadcast_id):
+    """Mark a broadcast (and every older one) as read"""
+    try:
+        user_id = get_jwt_identity()
+        
+        marked = broadcast_service.mark_as_read(user_id, broadcast_id)
+        
+        return jsonify({
+            'success': True,
+            'message': 'Aviso marcado como lido',
+            'marked': marked
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error marking broadcast as read: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao marcar aviso como lido'
+        }), 500
+
 @notifications_bp.route('/mark-all-read', methods=['POST'])
 @jwt_required()
 def mark_all_as_read():
@@ -84,19 +111,8 @@ def mark_all_as_read():
     try:
         user_id = get_jwt_identity()
         
-        from src.models.notification import Notification
-        from datetime import datetime
-        
-        # Update all unread notifications
-        Notification.query.filter_by(
-            user_id=user_id,
-            read=False
-        ).update({
-            'read': True,
-            'read_at': datetime.utcnow()
-        })
-        
-        db.session.commit()
+        # Update all unread notifications (and the user's unread counter)
+        notification_service.mark_all_as_read(user_id)
         
         return jsonify({
             'success': True,
@@ -132,6 +148,76 @@ def get_unread_count():
             'message': 'Erro ao buscar contagem de notificações'
         }), 500
 
+@notifications_bp.route('/archive', methods=['GET'])
+@jwt_required()
+def get_archived_notifications():
+    """Get read notifications moved to the archive by the retention policy"""
+    try:
+        user_id = get_jwt_identity()
+        
+        page = request.args.get('page', 1, type=int)
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        
+        notifications = notification_retention_service.get_user_archive(
+            user_id=user_id,
+            limit=per_page,
+            offset=(page - 1) * per_page
+        )
+        
+        return jsonify({
+            'success': True,
+            'notifications': notifications,
+            'page': page,
+            'per_page': per_page,
+            'has_more': len(notifications) == per_page
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting archived notifications: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao buscar notificações arquivadas'
+        }), 500
+
+@notifications_bp.route('/stream', methods=['GET'])
+@admission_exempt()
+@jwt_required(locations=['headers', 'query_string'])
+def stream_notifications():
+    """Server-Sent Events stream of new notifications and unread count changes"""
+    try:
+        user_id = int(get_jwt_identity())
+        
+        # EventSource sends Last-Event-ID when it reconnects
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        subscriber = notification_stream_service.subscribe(user_id)
+        if subscriber is None:
+            response = jsonify({
+                'success': False,
+                'message': 'Limite de conexões atingido, tente novamente'
+            })
+            response.headers['Retry-After'] = str(notification_stream_service.heartbeat_seconds)
+            return response, 503
+        
+        response = Response(
+            stream_with_context(notification_stream_service.stream(subscriber, last_event_id)),
+            mimetype='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        return response
+        
+    except Exception as e:
+        logger.error(f"Error opening notification stream: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao abrir fluxo de notificações'
+        }), 500
+
 @notifications_bp.route('/preferences', methods=['GET'])
 @jwt_required()
 def get_notification_preferences():
@@ -252,11 +338,8 @@ def send_test_notification():
 def send_bulk_notification():
     """Send bulk notification to multiple users (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        # Check if user is admin
-        from src.models.user import User
-        current_user = User.query.get(current_user_id)
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
         
         if not current_user or current_user.role != 'gestor_publico':
             return jsonify({
@@ -276,7 +359,7 @@ def send_bulk_notification():
                 'message': 'Lista de usuários é obrigatória'
             }), 400
         
-        results = notification_service.send_bulk_notifications(
+        job = notification_service.send_bulk_notifications(
             user_ids=user_ids,
             notification_type=notification_type,
             extra_data=extra_data
@@ -284,9 +367,9 @@ def send_bulk_notification():
         
         return jsonify({
             'success': True,
-            'message': f'Notificações enviadas: {results["sent"]} sucesso, {results["failed"]} falhas',
-            'results': results
-        }), 200
+            'message': f'Envio em lote iniciado para {job.total} usuários',
+            'job': job.to_dict()
+        }), 202
         
     except Exception as e:
         logger.error(f"Error sending bulk notification: {str(e)}")
@@ -295,16 +378,270 @@ def send_bulk_notification():
             'message': 'Erro ao enviar notificações em lote'
         }), 500
 
+@notifications_bp.route('/admin/broadcast', methods=['POST'])
+@jwt_required()
+def send_broadcast_notification():
+    """Send an announcement to everyone, a city or a role, stored once (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        data = request.get_json() or {}
+        
+        audience = data.get('audience', 'all')
+        audience_value = data.get('audience_value')
+        
+        if audience not in AUDIENCES:
+            return jsonify({
+                'success': False,
+                'message': 'Público deve ser all, city ou role'
+            }), 400
+        
+        if audience != 'all' and not audience_value:
+            return jsonify({
+                'success': False,
+                'message': 'Informe a cidade ou o papel do público'
+            }), 400
+        
+        broadcast = broadcast_service.send(
+            audience=audience,
+            audience_value=audience_value,
+            notification_type=data.get('type', 'system_announcement'),
+            title=data.get('title'),
+            message=data.get('message'),
+            extra_data=data.get('extra_data', {}),
+            created_by=current_user.id
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': 'Aviso enviado',
+            'broadcast': broadcast.to_dict()
+        }), 201
+        
+    except Exception as e:
+        logger.error(f"Error sending broadcast notification: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao enviar aviso'
+        }), 500
+
+@notifications_bp.route('/admin/send-bulk/<job_id>', methods=['GET'])
+@jwt_required()
+def get_bulk_notification_job(job_id):
+    """Get progress of a bulk notification send (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        job = notification_service.get_bulk_job(job_id)
+        if not job:
+            return jsonify({
+                'success': False,
+                'message': 'Envio em lote não encontrado'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting bulk notification job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao buscar envio em lote'
+        }), 500
+
+@notifications_bp.route('/admin/deliveries', methods=['GET'])
+@jwt_required()
+def get_delivery_stats():
+    """Get outbox delivery counts per channel and status (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        return jsonify({
+            'success': True,
+            'deliveries': delivery_service.get_stats(),
+            'digests': delivery_service.get_digest_stats(),
+            'transports': notification_service.get_transport_stats(),
+            'streams': notification_stream_service.get_stats()
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error getting delivery stats: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao buscar entregas de notificações'
+        }), 500
+
+@notifications_bp.route('/admin/deliveries/retry-dead', methods=['POST'])
+@jwt_required()
+def retry_dead_deliveries():
+    """Requeue deliveries that exhausted their retries (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        requeued = delivery_service.retry_dead()
+        
+        return jsonify({
+            'success': True,
+            'message': f'{requeued} entregas recolocadas na fila',
+            'requeued': requeued
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error requeueing dead deliveries: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao recolocar entregas na fila'
+        }), 500
+
+@notifications_bp.route('/admin/retention', methods=['POST'])
+@jwt_required()
+def apply_notification_retention():
+    """Archive or delete read notifications past their retention period (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'message': 'Corpo da requisição inválido'
+            }), 400
+        
+        mode = data.get('mode')
+        if mode and mode not in ('archive', 'delete'):
+            return jsonify({
+                'success': False,
+                'message': 'Modo deve ser archive ou delete'
+            }), 400
+        
+        # Inteiro positivo (bool e 2.5 não valem); sem valor, processa todos os lotes
+        max_batches = data.get('max_batches')
+        if max_batches is not None:
+            if isinstance(max_batches, bool) or not str(max_batches).strip().lstrip('-').isdigit():
+                return jsonify({
+                    'success': False,
+                    'message': 'max_batches deve ser um número inteiro'
+                }), 400
+            max_batches = int(max_batches)
+            if not 1 <= max_batches <= 10000:
+                return jsonify({
+                    'success': False,
+                    'message': 'max_batches deve estar entre 1 e 10000'
+                }), 400
+        
+        report = notification_retention_service.apply(
+            mode=mode,
+            vacuum=bool(data.get('vacuum', False)),
+            max_batches=max_batches
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f"{report['removed']} notificações removidas",
+            'report': report
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error applying notification retention: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao aplicar retenção de notificações'
+        }), 500
+
+@notifications_bp.route('/admin/migrate-messages', methods=['POST'])
+@jwt_required()
+def migrate_notification_messages():
+    """Convert stored rendered messages to template key + parameters (admin only)"""
+    try:
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
+        
+        if not current_user or current_user.role != 'gestor_publico':
+            return jsonify({
+                'success': False,
+                'message': 'Acesso negado'
+            }), 403
+        
+        data = request.get_json(silent=True) or {}
+        if not isinstance(data, dict):
+            return jsonify({
+                'success': False,
+                'message': 'Corpo da requisição inválido'
+            }), 400
+        
+        batch_size = data.get('batch_size', 500)
+        if isinstance(batch_size, bool) or not str(batch_size).strip().lstrip('-').isdigit():
+            return jsonify({
+                'success': False,
+                'message': 'batch_size deve ser um número inteiro'
+            }), 400
+        batch_size = int(batch_size)
+        if not 1 <= batch_size <= 5000:
+            return jsonify({
+                'success': False,
+                'message': 'batch_size deve estar entre 1 e 5000'
+            }), 400
+        
+        report = notification_service.migrate_stored_messages(batch_size=batch_size)
+        
+        return jsonify({
+            'success': True,
+            'message': f"{report['converted']} notificações convertidas, "
+                       f"{report['scanned'] - report['converted']} mantidas como texto",
+            'report': report
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error migrating notification messages: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': 'Erro ao converter mensagens de notificações'
+        }), 500
+
 @notifications_bp.route('/admin/stats', methods=['GET'])
 @jwt_required()
 def get_notification_stats():
     """Get notification statistics (admin only)"""
     try:
-        current_user_id = get_jwt_identity()
-        
-        # Check if user is admin
-        from src.models.user import User
-        current_user = User.query.get(current_user_id)
+        # Check if user is admin (identity snapshot loaded with the token)
+        current_user = get_current_user()
         
         if not current_user or current_user.role != 'gestor_publico':
             return jsonify({
@@ -327,13 +664,13 @@ def get_notification_stats():
         # Email success rate
         email_sent = Notification.query.filter(
             Notification.created_at >= thirty_days_ago,
-            Notification.email_sent == True
+            Notification.sent_email == True
         ).count()
         
         # WhatsApp success rate
         whatsapp_sent = Notification.query.filter(
             Notification.created_at >= thirty_days_ago,
-            Notification.whatsapp_sent == True
+            Notification.sent_whatsapp == True
         ).count()
         
         # Notifications by type
@@ -5,9 +5,16 @@ from src.models.user import User
 from src.models.complaint import Complaint
 from src.models.notification import Notification
 from src.models.gamification import UserPoints, UserBadge, PointHistory
+from src.services.leaderboard_service import leaderboard_service
+from src.services.point_rollup_service import point_rollup_service
+from src.services.notification_service import notification_service
+from src.services.password_service import PasswordHasherBusy
+from src.services.availability_service import availability_service
 from sqlalchemy import func, desc
+from sqlalchemy.exc import IntegrityError
 import os
 import uuid
+from datetime import datetime
 from werkzeug.utils import secure_filename
 from PIL import Image
 
@@ -75,10 +82,13 @@ def get_profile():
         # Buscar ranking
         ranking = user.get_ranking()
         
-        # Buscar histórico de pontos recente
+        # Buscar histórico de pontos recente (índice user_id, created_at)
         recent_points = PointHistory.query.filter_by(user_id=current_user_id)\
             .order_by(desc(PointHistory.created_at)).limit(10).all()
         
+        # Pontos por mês: meses fechados vêm da consolidação mensal
+        monthly_points = point_rollup_service.get_user_monthly_points(user.id)
+        
         profile_data = user.to_dict()
         profile_data.update({
             'statistics': {
@@ -90,7 +100,8 @@ def get_profile():
                 'points': user_points.to_dict(),
                 'badges': badges,
                 'ranking': ranking,
-                'recent_activity': [rp.to_dict() for rp in recent_points]
+                'recent_activity': [rp.to_dict() for rp in recent_points],
+                'monthly_points': monthly_points
             }
         })
         
@@ -129,8 +140,7 @@ def update_profile():
                 if not User.validate_email(new_email):
                     return jsonify({'message': 'Email inválido'}), 400
                 
-                existing_user = User.query.filter_by(email=new_email).first()
-                if existing_user:
+                if availability_service.is_taken('email', new_email):
                     return jsonify({'message': 'Email já está em uso'}), 409
                 
                 user.email = new_email
@@ -143,6 +153,10 @@ def update_profile():
             'profile': user.to_dict()
         }), 200
         
+    except IntegrityError:
+        # Email cadastrado em paralelo (outro worker) depois da verificação acima
+        db.session.rollback()
+        return jsonify({'message': 'Email já está em uso'}), 409
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao atualizar perfil: {str(e)}")
@@ -240,6 +254,9 @@ def change_password():
         
         return jsonify({'message': 'Senha alterada com sucesso'}), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'message': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao alterar senha: {str(e)}")
@@ -310,41 +327,44 @@ def get_user_notifications():
         per_page = int(request.args.get('per_page', 20))
         unread_only = request.args.get('unread_only', 'false').lower() == 'true'
         
-        # Query base
-        query = Notification.query.filter_by(user_id=current_user_id)
-        
-        if unread_only:
-            query = query.filter_by(is_read=False)
-        
-        # Ordenar por data (mais recentes primeiro)
-        query = query.order_by(desc(Notification.created_at))
-        
-        # Paginação
-        notifications = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
+        # Notificações pessoais e avisos (broadcasts) do público do usuário
+        notifications_data = notification_service.get_user_notifications(
+            user.id,
+            limit=per_page,
+            offset=(page - 1) * per_page,
+            unread_only=unread_only
         )
         
-        notifications_data = [notification.to_dict() for notification in notifications.items]
+        # Contador de não lidas mantido por usuário (sem COUNT(*))
+        unread_count = notification_service.get_unread_count(user.id)
         
-        # Contar notificações não lidas
-        unread_count = Notification.query.filter_by(
-            user_id=current_user_id,
-            is_read=False
-        ).count()
+        if unread_only:
+            # O total das não lidas é o próprio contador
+            total = unread_count
+            pages = (total + per_page - 1) // per_page if per_page > 0 else 0
+            pagination = {
+                'page': page,
+                'pages': pages,
+                'per_page': per_page,
+                'total': total,
+                'has_next': page < pages,
+                'has_prev': page > 1
+            }
+        else:
+            # Sem contar o histórico inteiro: há mais se a página veio cheia, como em /api/notifications
+            has_more = len(notifications_data) == per_page
+            pagination = {
+                'page': page,
+                'per_page': per_page,
+                'has_more': has_more,
+                'has_next': has_more,
+                'has_prev': page > 1
+            }
         
         return jsonify({
             'notifications': notifications_data,
             'unread_count': unread_count,
-            'pagination': {
-                'page': notifications.page,
-                'pages': notifications.pages,
-                'per_page': notifications.per_page,
-                'total': notifications.total,
-                'has_next': notifications.has_next,
-                'has_prev': notifications.has_prev
-            }
+            'pagination': pagination
         }), 200
         
     except Exception as e:
@@ -379,12 +399,7 @@ def mark_all_notifications_read():
     try:
         current_user_id = get_jwt_identity()
         
-        Notification.query.filter_by(
-            user_id=current_user_id,
-            is_read=False
-        ).update({'is_read': True})
-        
-        db.session.commit()
+        notification_service.mark_all_as_read(current_user_id)
         
         return jsonify({'message': 'Todas as notificações foram marcadas como lidas'}), 200
         
@@ -393,6 +408,75 @@ def mark_all_notifications_read():
         current_app.logger.error(f"Erro ao marcar todas as notificações como lidas: {str(e)}")
         return jsonify({'message': 'Erro interno do servidor'}), 500
 
+@profile_bp.route('/ranking', methods=['GET'])
+@jwt_required()
+def get_city_ranking():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
+        
+        city = request.args.get('city', user.city).lower()
+        limit = min(int(request.args.get('limit', 10)), 100)
+        
+        # Ranking ao vivo do mês atual
+        top = leaderboard_service.get_top(city, limit)
+        users = {u.id: u for u in User.query.filter(User.id.in_([entry['user_id'] for entry in top])).all()}
+        
+        for entry in top:
+            ranked_user = users.get(entry['user_id'])
+            entry['user'] = {
+                'id': ranked_user.id,
+                'username': ranked_user.username,
+                'full_name': ranked_user.full_name
+            } if ranked_user else None
+        
+        return jsonify({
+            'city': city,
+            'ranking': top,
+            'me': leaderboard_service.get_user_rank(user.id, city)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar ranking: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
+@profile_bp.route('/profile/ranking', methods=['GET'])
+@jwt_required()
+def get_ranking_around_user():
+    try:
+        current_user_id = get_jwt_identity()
+        user = User.query.get(current_user_id)
+        
+        if not user:
+            return jsonify({'message': 'Usuário não encontrado'}), 404
+        
+        radius = min(int(request.args.get('radius', 5)), 50)
+        
+        # Usuários próximos da posição do usuário no ranking
+        around = leaderboard_service.get_around(user.id, user.city, radius)
+        users = {u.id: u for u in User.query.filter(User.id.in_([entry['user_id'] for entry in around])).all()}
+        
+        for entry in around:
+            ranked_user = users.get(entry['user_id'])
+            entry['user'] = {
+                'id': ranked_user.id,
+                'username': ranked_user.username,
+                'full_name': ranked_user.full_name
+            } if ranked_user else None
+        
+        return jsonify({
+            'city': user.city,
+            'ranking': around,
+            'me': leaderboard_service.get_user_rank(user.id, user.city)
+        }), 200
+        
+    except Exception as e:
+        current_app.logger.error(f"Erro ao buscar ranking do usuário: {str(e)}")
+        return jsonify({'message': 'Erro interno do servidor'}), 500
+
 @profile_bp.route('/profile/deactivate', methods=['PUT'])
 @jwt_required()
 def deactivate_account():
@@ -418,6 +502,9 @@ def deactivate_account():
         
         return jsonify({'message': 'Conta desativada com sucesso'}), 200
         
+    except PasswordHasherBusy as e:
+        db.session.rollback()
+        return jsonify({'message': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': str(e.retry_after)}
     except Exception as e:
         db.session.rollback()
         current_app.logger.error(f"Erro ao desativar conta: {str(e)}")
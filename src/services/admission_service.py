@@ -0,0 +1,254 @@
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from flask import current_app, g, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+ROUTE_CLASSES = ('read', 'write', 'geo', 'auth')
+LEVELS = ('normal', 'shedding_low_priority', 'shedding_non_critical')
+
+# Shed first when the latency objectives are breached
+LOW_PRIORITY = {
+    'maps.get_heatmap_data',
+    'maps.get_city_statistics',
+    'complaints.find_similar_complaints',
+}
+# Never shed
+CRITICAL = {
+    'auth.login',
+    'auth.refresh',
+    'complaints.create_complaint',
+}
+DEFAULT_LATENCY_SLO_MS = {'read': 300, 'write': 1000, 'geo': 1500, 'auth': 1500}
+DEFAULT_MAX_IN_FLIGHT = {'read': 32, 'write': 16, 'geo': 8, 'auth': 16}
+
+
+class AdmissionService:
+    """Admission control in front of every ``/api`` request.
+
+    Requests are grouped into route classes (read, write, geo, auth) and
+    each class tracks its in-flight requests, an EWMA of its latency and,
+    when the proxy sends ``X-Request-Start``, of its queue time. Pressure
+    is the largest ratio of any of those to its limit: at 1 low-priority
+    endpoints are answered 503, at 2 everything but the critical endpoints
+    (login, complaint creation) is. The level rises at once and only falls
+    after ``cooldown`` seconds below it; samples older than ``window``
+    seconds are ignored so a class that was shed recovers.
+
+    All of this is per worker process. The in-flight limits only come into
+    play with threaded workers (``gunicorn --threads``); a sync worker never
+    has more than one request in flight, so there the queue time is the
+    early signal and needs the ``X-Request-Start`` header from Nginx
+    (INSTALL.md).
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.latency_slo_ms = dict(DEFAULT_LATENCY_SLO_MS)
+        self.queue_slo_ms = 100
+        self.max_in_flight = dict(DEFAULT_MAX_IN_FLIGHT)
+        self.window = 10
+        self.cooldown = 5
+        self.retry_after = 5
+        self.alpha = 0.2
+        self._lock = threading.Lock()
+        self._level = 0
+        self._level_since = time.monotonic()
+        self._calm_since: Optional[float] = None
+        self._classes = self._empty_classes()
+        self._shed = {'low': 0, 'normal': 0}
+        if app:
+            self.init_app(app)
+
+    @staticmethod
+    def _empty_classes() -> Dict[str, Dict]:
+        return {
+            route_class: {
+                'in_flight': 0, 'admitted': 0, 'completed': 0, 'shed': 0,
+                'latency_ms': 0.0, 'queue_ms': 0.0, 'last_sample': None, 'last_queue_sample': None
+            }
+            for route_class in ROUTE_CLASSES
+        }
+
+    def init_app(self, app):
+        """Initialize admission service with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('ADMISSION_CONTROL_ENABLED', True)
+        self.latency_slo_ms.update(app.config.get('ADMISSION_LATENCY_SLO_MS', {}))
+        self.queue_slo_ms = app.config.get('ADMISSION_QUEUE_SLO_MS', 100)
+        self.max_in_flight.update(app.config.get('ADMISSION_MAX_IN_FLIGHT', {}))
+        self.window = app.config.get('ADMISSION_WINDOW', 10)
+        self.cooldown = app.config.get('ADMISSION_COOLDOWN', 5)
+        self.retry_after = app.config.get('ADMISSION_RETRY_AFTER', 5)
+
+        if 'admission_control' not in app.extensions:
+            app.before_request(self._before_request)
+            app.teardown_request(self._teardown_request)
+            app.extensions['admission_control'] = self
+
+    # Classification
+
+    @staticmethod
+    def route_class(endpoint: str, method: str) -> str:
+        blueprint = endpoint.split('.', 1)[0]
+        if blueprint == 'auth':
+            return 'auth'
+        if blueprint == 'maps':
+            return 'geo'
+        return 'read' if method in ('GET', 'HEAD', 'OPTIONS') else 'write'
+
+    @staticmethod
+    def priority(endpoint: str) -> str:
+        if endpoint in CRITICAL:
+            return 'critical'
+        if endpoint in LOW_PRIORITY:
+            return 'low'
+        return 'normal'
+
+    @staticmethod
+    def exempt(endpoint: str) -> bool:
+        """Views marked with ``@admission_exempt()`` are neither counted nor shed"""
+        view = current_app.view_functions.get(endpoint)
+        return getattr(view, 'admission_exempt', False)
+
+    @staticmethod
+    def _queue_ms() -> Optional[float]:
+        """Time spent queued before this worker picked the request up, from ``X-Request-Start``"""
+        header = request.headers.get('X-Request-Start', '')
+        try:
+            start = float(header[2:] if header.startswith('t=') else header)
+        except ValueError:
+            return None
+        # nginx sends seconds with milliseconds, other proxies micro- or milliseconds
+        if start > 1e14:
+            start /= 1e6
+        elif start > 1e11:
+            start /= 1e3
+        return max(0.0, (time.time() - start) * 1000)
+
+    # Pressure
+
+    def _pressure(self, now: float) -> float:
+        pressure = 0.0
+        for route_class, stats in self._classes.items():
+            ratios = [stats['in_flight'] / self.max_in_flight[route_class]]
+            if stats['last_sample'] is not None and now - stats['last_sample'] < self.window:
+                ratios.append(stats['latency_ms'] / self.latency_slo_ms[route_class])
+            if stats['last_queue_sample'] is not None and now - stats['last_queue_sample'] < self.window:
+                ratios.append(stats['queue_ms'] / self.queue_slo_ms)
+            pressure = max(pressure, *ratios)
+        return pressure
+
+    def _update_level(self, now: float) -> int:
+        target = min(int(self._pressure(now)), len(LEVELS) - 1)
+        if target > self._level:
+            logger.warning(f"Admission control: {LEVELS[self._level]} -> {LEVELS[target]}")
+            self._level, self._level_since, self._calm_since = target, now, None
+        elif target < self._level:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif now - self._calm_since >= self.cooldown:
+                logger.info(f"Admission control: {LEVELS[self._level]} -> {LEVELS[target]}")
+                self._level, self._level_since, self._calm_since = target, now, None
+        else:
+            self._calm_since = None
+        return self._level
+
+    # Request hooks
+
+    def _before_request(self):
+        endpoint = request.endpoint
+        if not self.enabled or not endpoint or not request.path.startswith('/api/') or self.exempt(endpoint):
+            return None
+
+        route_class = self.route_class(endpoint, request.method)
+        priority = self.priority(endpoint)
+        queue_ms = self._queue_ms()
+        now = time.monotonic()
+
+        with self._lock:
+            stats = self._classes[route_class]
+            if queue_ms is not None:
+                stats['queue_ms'] += self.alpha * (queue_ms - stats['queue_ms'])
+                stats['last_queue_sample'] = now
+            level = self._update_level(now)
+            if (level >= 1 and priority == 'low') or (level >= 2 and priority == 'normal'):
+                stats['shed'] += 1
+                self._shed[priority] += 1
+                shed = True
+            else:
+                stats['in_flight'] += 1
+                stats['admitted'] += 1
+                shed = False
+
+        if shed:
+            return jsonify({'message': 'Servidor sobrecarregado, tente novamente em instantes'}), 503, {
+                'Retry-After': str(self.retry_after)
+            }
+        g.admission = (route_class, now)
+        return None
+
+    def _teardown_request(self, exc=None):
+        admission: Optional[Tuple[str, float]] = g.pop('admission', None)
+        if admission is None:
+            return
+        route_class, started = admission
+        now = time.monotonic()
+        latency_ms = (now - started) * 1000
+        with self._lock:
+            stats = self._classes[route_class]
+            stats['in_flight'] -= 1
+            stats['completed'] += 1
+            stats['latency_ms'] += self.alpha * (latency_ms - stats['latency_ms'])
+            stats['last_sample'] = now
+
+    def get_stats(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            level = self._update_level(now)
+            pressure = self._pressure(now)
+            classes = {
+                route_class: {
+                    'in_flight': stats['in_flight'],
+                    'max_in_flight': self.max_in_flight[route_class],
+                    'admitted': stats['admitted'],
+                    'completed': stats['completed'],
+                    'shed': stats['shed'],
+                    'latency_ms': round(stats['latency_ms'], 1),
+                    'latency_slo_ms': self.latency_slo_ms[route_class],
+                    'queue_ms': round(stats['queue_ms'], 1) if stats['last_queue_sample'] is not None else None
+                }
+                for route_class, stats in self._classes.items()
+            }
+            shed = dict(self._shed)
+            since = now - self._level_since
+        return {
+            'enabled': self.enabled,
+            'state': LEVELS[level],
+            'level': level,
+            'pressure': round(pressure, 2),
+            'state_seconds': round(since, 1),
+            'queue_slo_ms': self.queue_slo_ms,
+            'shed': shed,
+            'classes': classes
+        }
+
+
+# Global admission service instance
+admission_service = AdmissionService()
+
+
+def admission_exempt():
+    """Decorator keeping a view out of admission control.
+
+    For long-lived streams, which would read as one very slow request, and
+    for the admin stats, which are needed most while the API is shedding.
+    """
+    def decorator(f):
+        f.admission_exempt = True
+        return f
+    return decorator
@@ -0,0 +1,261 @@
+import hashlib
+import logging
+import math
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, exists, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+AVAILABILITY_SESSION_KEY = 'availability_filter_values'
+FIELDS = ('username', 'email', 'cpf')
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter: ``value in bloom`` is never False for a value that was added"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(64, int(math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _positions(self, value: str) -> List[int]:
+        # Double hashing over one 128-bit digest gives all k positions
+        digest = hashlib.blake2b(value.encode('utf-8'), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        step = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + i * step) % self.size for i in range(self.hash_count)]
+
+    def add(self, value: str) -> None:
+        positions = self._positions(value)
+        # Setting a bit is a read-modify-write of its byte; concurrent adds must not lose bits
+        with self._lock:
+            for position in positions:
+                self.bits[position >> 3] |= 1 << (position & 7)
+            self.count += 1
+
+    def __contains__(self, value: str) -> bool:
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+    @property
+    def memory_bytes(self) -> int:
+        return len(self.bits)
+
+    def expected_false_positive_rate(self) -> float:
+        return (1 - math.exp(-self.hash_count * self.count / self.size)) ** self.hash_count
+
+
+class AvailabilityService:
+    """Username, email and CPF availability answered from in-memory Bloom filters.
+
+    A value missing from its field's filter is certainly free and is
+    answered without touching the database; only possible hits go on to the
+    unique-index lookup. Values committed by this process are added at
+    commit; users created or changed by other worker processes are read in
+    one incremental query every ``refresh_interval`` seconds. Until then
+    another worker's new value can be reported free, which the unique
+    constraints still reject at registration.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._filters: Optional[Dict[str, BloomFilter]] = None
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._listening = False
+        self._max_id = 0
+        self._refreshed_at: Optional[datetime] = None
+        self._next_refresh = 0.0
+        self._stats = {field: {'filtered': 0, 'queried': 0, 'false_positives': 0} for field in FIELDS}
+        self.error_rate = 0.01
+        self.min_capacity = 100000
+        self.refresh_interval = 30
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize availability service with Flask app"""
+        self.app = app
+        self.error_rate = app.config.get('AVAILABILITY_FILTER_ERROR_RATE', 0.01)
+        self.min_capacity = app.config.get('AVAILABILITY_FILTER_CAPACITY', 100000)
+        self.refresh_interval = app.config.get('AVAILABILITY_FILTER_REFRESH', 30)
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    @staticmethod
+    def normalize(field: str, value: str) -> str:
+        """The value as stored in the users table"""
+        from src.models.user import User
+
+        value = (value or '').strip()
+        if field == 'email':
+            return value.lower()
+        if field == 'cpf':
+            return User.format_cpf(value)
+        return value
+
+    # Filters
+
+    def _add_row(self, filters: Dict[str, BloomFilter], row) -> None:
+        for field in FIELDS:
+            value = getattr(row, field)
+            if value:
+                filters[field].add(value)
+
+    def build(self) -> Dict:
+        """Build the filters from the users table (startup, or when they outgrow their capacity)"""
+        from src.models.user import User
+
+        started = time.perf_counter()
+        refreshed_at = datetime.utcnow()
+        total = db.session.execute(select(func.count(User.id))).scalar() or 0
+        capacity = max(self.min_capacity, total * 2)
+        filters = {field: BloomFilter(capacity, self.error_rate) for field in FIELDS}
+
+        max_id = 0
+        rows = db.session.execute(
+            select(User.id, User.username, User.email, User.cpf).execution_options(yield_per=5000)
+        )
+        for row in rows:
+            self._add_row(filters, row)
+            max_id = max(max_id, row.id)
+
+        with self._lock:
+            self._filters = filters
+            self._max_id = max_id
+            self._refreshed_at = refreshed_at
+            self._next_refresh = time.monotonic() + self.refresh_interval
+
+        logger.info(f"Availability filters built for {total} users in {time.perf_counter() - started:.2f}s")
+        return self.get_stats()
+
+    def _refresh(self) -> None:
+        """Add users created or changed since the last refresh (by any worker process)"""
+        from src.models.user import User
+
+        if time.monotonic() < self._next_refresh or not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._next_refresh = time.monotonic() + self.refresh_interval
+            refreshed_at = datetime.utcnow()
+            # Margin for writers whose clocks or transactions lag slightly behind ours
+            since = self._refreshed_at - timedelta(seconds=5)
+            rows = db.session.execute(
+                select(User.id, User.username, User.email, User.cpf).where(
+                    or_(User.id > self._max_id, User.updated_at >= since)
+                )
+            ).all()
+            for row in rows:
+                self._add_row(self._filters, row)
+                self._max_id = max(self._max_id, row.id)
+            self._refreshed_at = refreshed_at
+            outgrown = self._filters['email'].count > self._filters['email'].capacity
+        finally:
+            self._lock.release()
+
+        if outgrown:
+            self.build()
+
+    def _after_flush(self, session, flush_context) -> None:
+        from src.models.user import User
+
+        if self._filters is None:
+            return
+        users = [obj for obj in session.new if isinstance(obj, User)]
+        users.extend(
+            obj for obj in session.dirty if isinstance(obj, User)
+            and any(inspect(obj).attrs[field].history.has_changes() for field in FIELDS)
+        )
+        if users:
+            session.info.setdefault(AVAILABILITY_SESSION_KEY, []).extend(
+                {field: getattr(user, field) for field in FIELDS} for user in users
+            )
+
+    def _after_commit(self, session) -> None:
+        values = session.info.pop(AVAILABILITY_SESSION_KEY, None)
+        filters = self._filters
+        if not values or filters is None:
+            return
+        for row in values:
+            for field in FIELDS:
+                if row[field]:
+                    filters[field].add(row[field])
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(AVAILABILITY_SESSION_KEY, None)
+
+    # Checks
+
+    def _count(self, field: str, key: str) -> None:
+        with self._stats_lock:
+            self._stats[field][key] += 1
+
+    def is_taken(self, field: str, value: str) -> bool:
+        """Whether a user already has this value, as far as this process knows.
+
+        A ``False`` answered from the filter costs no query and is exact for
+        values committed by this process or seen at the last refresh; a value
+        another worker committed less than ``refresh_interval`` seconds ago can
+        still be reported free. Only the unique constraints guarantee
+        uniqueness, so callers must also handle ``IntegrityError`` on commit.
+        ``True`` answers are always confirmed against the database.
+        """
+        from src.models.user import User
+
+        if field not in FIELDS:
+            raise ValueError(f"Unknown availability field {field}")
+        value = self.normalize(field, value)
+
+        filters = self._filters
+        if filters is not None:
+            self._refresh()
+            filters = self._filters
+            if value not in filters[field]:
+                self._count(field, 'filtered')
+                return False
+
+        column = getattr(User, field)
+        taken = db.session.execute(select(exists().where(column == value))).scalar()
+        self._count(field, 'queried')
+        if filters is not None and not taken:
+            self._count(field, 'false_positives')
+        return bool(taken)
+
+    def get_stats(self) -> Dict:
+        filters = self._filters
+        with self._stats_lock:
+            stats = {field: dict(counters) for field, counters in self._stats.items()}
+        for field, counters in stats.items():
+            free_checks = counters['filtered'] + counters['false_positives']
+            counters['observed_false_positive_rate'] = (
+                round(counters['false_positives'] / free_checks, 4) if free_checks else None
+            )
+            if filters is not None:
+                bloom = filters[field]
+                counters.update({
+                    'items': bloom.count,
+                    'capacity': bloom.capacity,
+                    'hash_count': bloom.hash_count,
+                    'memory_bytes': bloom.memory_bytes,
+                    'expected_false_positive_rate': round(bloom.expected_false_positive_rate(), 6)
+                })
+        return {'built': filters is not None, 'fields': stats}
+
+
+# Global availability service instance
+availability_service = AvailabilityService()
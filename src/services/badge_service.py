@@ -0,0 +1,266 @@
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from sqlalchemy import func, literal, select
+from sqlalchemy.exc import IntegrityError
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+# Counter changed by each gamification action (see UserPoints.add_points)
+EVENT_COUNTERS = {
+    'complaint_created': ('complaints', 1),
+    'vote_added': ('votes', 1),
+    'vote_removed': ('votes', -1),
+    'complaint_resolved': ('resolved', 1)
+}
+
+# Activity badges seeded in src/main.py: name -> (event, counter, default threshold)
+ACTIVITY_RULES = {
+    'Primeiro Passo': ('complaint_created', 'complaints', 1),
+    'Engajado': ('complaint_created', 'complaints', 5),
+    'Colaborador': ('vote_added', 'votes', 10),
+    'Persistente': ('complaint_resolved', 'resolved', 3)
+}
+
+LEVEL_UP_EVENT = 'level_up'
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    badge_id: int
+    name: str
+    event: str
+    counter: str
+    threshold: int
+
+
+@dataclass(frozen=True)
+class BadgeCatalog:
+    """Immutable index of the active badges, grouped by the event that can award them"""
+    rules_by_event: Mapping[str, Tuple[BadgeRule, ...]]
+    rules_by_name: Mapping[str, BadgeRule]
+
+    @classmethod
+    def load(cls) -> 'BadgeCatalog':
+        from src.models.gamification import Badge
+
+        rules = []
+        for badge in Badge.query.filter_by(is_active=True).all():
+            if badge.category == 'level' and badge.requirement:
+                rules.append(BadgeRule(badge.id, badge.name, LEVEL_UP_EVENT, 'level', badge.requirement))
+            elif badge.name in ACTIVITY_RULES:
+                event, counter, default_threshold = ACTIVITY_RULES[badge.name]
+                threshold = badge.requirement or default_threshold
+                rules.append(BadgeRule(badge.id, badge.name, event, counter, threshold))
+
+        by_event: Dict[str, list] = {}
+        for rule in rules:
+            by_event.setdefault(rule.event, []).append(rule)
+
+        return cls(
+            rules_by_event=MappingProxyType({
+                event: tuple(sorted(event_rules, key=lambda rule: rule.threshold))
+                for event, event_rules in by_event.items()
+            }),
+            rules_by_name=MappingProxyType({rule.name: rule for rule in rules})
+        )
+
+
+class _UserBadgeState:
+    """Cached counters of a user, valid up to the point history row ``version``"""
+    __slots__ = ('counters', 'owned', 'version')
+
+    def __init__(self, counters: Dict[str, int], owned: set, version: int):
+        self.counters = counters
+        self.owned = owned
+        self.version = version
+
+
+class BadgeService:
+    def __init__(self, app=None):
+        self.app = app
+        self._catalog: Optional[BadgeCatalog] = None
+        self._states: 'OrderedDict[int, _UserBadgeState]' = OrderedDict()
+        self._lock = threading.RLock()
+        self.cache_size = 10000
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize badge service with Flask app"""
+        self.app = app
+        self.cache_size = app.config.get('BADGE_COUNTER_CACHE_SIZE', 10000)
+
+    @property
+    def catalog(self) -> BadgeCatalog:
+        """Badge catalog, loaded from the database on first use"""
+        if self._catalog is None:
+            with self._lock:
+                if self._catalog is None:
+                    self._catalog = BadgeCatalog.load()
+        return self._catalog
+
+    def reload_catalog(self) -> None:
+        with self._lock:
+            self._catalog = None
+            self._states.clear()
+
+    def _load_state(self, user_id: int) -> _UserBadgeState:
+        """Read the counters of a user in one query (they already include the current event)"""
+        from src.models.complaint import Complaint, Vote
+        from src.models.gamification import UserPoints, UserBadge, PointHistory
+
+        row = db.session.execute(select(
+            select(func.count(Complaint.id)).where(Complaint.user_id == user_id).scalar_subquery(),
+            select(func.count(Vote.id)).where(Vote.user_id == user_id).scalar_subquery(),
+            select(func.count(Complaint.id)).where(
+                Complaint.user_id == user_id, Complaint.status == 'resolvido'
+            ).scalar_subquery(),
+            select(UserPoints.level).where(UserPoints.user_id == user_id).limit(1).scalar_subquery(),
+            select(func.max(PointHistory.id)).where(PointHistory.user_id == user_id).scalar_subquery()
+        )).one()
+
+        owned = {badge_id for (badge_id,) in db.session.query(UserBadge.badge_id).filter_by(user_id=user_id)}
+        return _UserBadgeState(
+            counters={'complaints': row[0], 'votes': row[1], 'resolved': row[2], 'level': row[3] or 1},
+            owned=owned,
+            version=row[4] or 0
+        )
+
+    def _previous_record_id(self, user_id: int, record_id: int) -> int:
+        from src.models.gamification import PointHistory
+
+        return db.session.execute(
+            select(func.max(PointHistory.id)).where(PointHistory.user_id == user_id, PointHistory.id < record_id)
+        ).scalar() or 0
+
+    def _state_for_event(self, user_id: int, counter: Optional[str], delta: int,
+                         record_id: Optional[int]) -> _UserBadgeState:
+        """Cached state of a user with the current event applied.
+
+        The cache is only advanced by ``delta`` when the user's previous point
+        history row is the one it already reflects; otherwise another worker
+        (or a compaction) changed the user in between and the counters are
+        read again from the database.
+        """
+        with self._lock:
+            state = self._states.get(user_id)
+        if state is not None and record_id is not None:
+            if self._previous_record_id(user_id, record_id) != state.version:
+                state = None
+
+        with self._lock:
+            if state is not None and self._states.get(user_id) is state:
+                self._states.move_to_end(user_id)
+                if record_id is not None:
+                    if counter:
+                        state.counters[counter] += delta
+                    state.version = record_id
+                return state
+            self._states.pop(user_id, None)
+
+        state = self._load_state(user_id)
+        with self._lock:
+            state = self._states.setdefault(user_id, state)
+            if len(self._states) > self.cache_size:
+                self._states.popitem(last=False)
+        return state
+
+    def handle_event(self, user_id: int, action: str, level: Optional[int] = None,
+                     record_id: Optional[int] = None) -> list:
+        """Update the counters of a user after a committed action and award earned badges.
+
+        ``record_id`` is the point history row of the action; it lets the
+        cached counters notice actions committed by other workers. Only the
+        rules subscribed to ``action`` (and to level ups, when ``level`` is
+        given) are evaluated. Returns the names of new badges.
+        """
+        from src.models.gamification import UserBadge
+
+        counter, delta = EVENT_COUNTERS.get(action, (None, 0))
+        events = [action] if level is None else [action, LEVEL_UP_EVENT]
+        awarded = []
+        try:
+            catalog = self.catalog
+            state = self._state_for_event(user_id, counter, delta, record_id)
+            with self._lock:
+                if level is not None:
+                    state.counters['level'] = level
+                for event in events:
+                    for rule in catalog.rules_by_event.get(event, ()):
+                        if state.counters[rule.counter] >= rule.threshold and rule.badge_id not in state.owned:
+                            state.owned.add(rule.badge_id)
+                            awarded.append(rule)
+
+            if awarded:
+                db.session.add_all([UserBadge(user_id=user_id, badge_id=rule.badge_id) for rule in awarded])
+                db.session.commit()
+        except Exception as e:
+            # A conflict means another process awarded the badge: reload the user state
+            db.session.rollback()
+            with self._lock:
+                self._states.pop(user_id, None)
+            if not isinstance(e, IntegrityError):
+                logger.error(f"Error evaluating badges for user {user_id}: {str(e)}")
+            return []
+
+        return [rule.name for rule in awarded]
+
+    def backfill(self) -> Dict[str, int]:
+        """Award every badge already earned by historical activity.
+
+        Runs one INSERT ... SELECT per badge rule; returns the number of
+        badges awarded per badge name.
+        """
+        from src.models.complaint import Complaint, Vote
+        from src.models.gamification import UserPoints, UserBadge
+
+        now = datetime.utcnow()
+        sources = {
+            'complaints': (Complaint.user_id, Complaint.id, ()),
+            'votes': (Vote.user_id, Vote.id, ()),
+            'resolved': (Complaint.user_id, Complaint.id, (Complaint.status == 'resolvido',))
+        }
+
+        results = {}
+        try:
+            for rule in self.catalog.rules_by_name.values():
+                already_owned = select(UserBadge.user_id).where(UserBadge.badge_id == rule.badge_id)
+                if rule.counter == 'level':
+                    earners = select(
+                        UserPoints.user_id, literal(rule.badge_id), literal(now, db.DateTime)
+                    ).where(
+                        UserPoints.level >= rule.threshold,
+                        UserPoints.user_id.not_in(already_owned)
+                    ).distinct()
+                else:
+                    user_column, id_column, conditions = sources[rule.counter]
+                    earners = select(
+                        user_column, literal(rule.badge_id), literal(now, db.DateTime)
+                    ).where(
+                        user_column.not_in(already_owned), *conditions
+                    ).group_by(user_column).having(func.count(id_column) >= rule.threshold)
+
+                result = db.session.execute(
+                    UserBadge.__table__.insert().from_select(['user_id', 'badge_id', 'earned_at'], earners)
+                )
+                results[rule.name] = result.rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        with self._lock:
+            self._states.clear()
+        return results
+
+
+# Global badge service instance
+badge_service = BadgeService()
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from typing import Dict, List, Optional, Tuple
+
+from src.database import db, greatest, upsert
+from src.services.unread_counter_service import unread_counter_service
+
+logger = logging.getLogger(__name__)
+
+AUDIENCES = ('all', 'city', 'role')
+
+# Stand-in recipient for system templates rendered once for a whole audience
+BROADCAST_RECIPIENT = SimpleNamespace(full_name='Cidadão')
+
+
+class BroadcastService:
+    """Announcements stored once per audience and merged into inboxes at read time.
+
+    A broadcast applies to users of its audience who signed up before it was
+    sent. Whether a user has seen it is a single per-user watermark, the
+    highest broadcast id read, kept in ``notification_counter`` and cached
+    with the unread counter. Recent broadcasts are cached in process; the
+    TTL bounds how long other worker processes take to see a new one.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._lock = threading.Lock()
+        self._recent: Optional[Tuple[float, List[Dict]]] = None
+        self.visible_days = 90
+        self.cache_ttl = 5
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize broadcast service with Flask app"""
+        self.app = app
+        self.visible_days = app.config.get('NOTIFICATION_BROADCAST_DAYS', 90)
+        self.cache_ttl = app.config.get('NOTIFICATION_BROADCAST_CACHE_TTL', 5)
+
+    def _recent_broadcasts(self) -> List[Dict]:
+        """Broadcasts still shown in inboxes, newest first"""
+        from src.models.notification import BroadcastNotification
+
+        now = time.monotonic()
+        with self._lock:
+            if self._recent is not None and now - self._recent[0] < self.cache_ttl:
+                return self._recent[1]
+
+        since = datetime.utcnow() - timedelta(days=self.visible_days)
+        broadcasts = [
+            {**broadcast.to_dict(), '_created_at': broadcast.created_at}
+            for broadcast in BroadcastNotification.query.filter(
+                BroadcastNotification.created_at >= since
+            ).order_by(BroadcastNotification.id.desc()).all()
+        ]
+        with self._lock:
+            self._recent = (now, broadcasts)
+        return broadcasts
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._recent = None
+
+    @staticmethod
+    def _applies(broadcast: Dict, recipient) -> bool:
+        if recipient.created_at and broadcast['_created_at'] and broadcast['_created_at'] < recipient.created_at:
+            return False
+        if broadcast['audience'] == 'city':
+            return broadcast['audience_value'] == recipient.city
+        if broadcast['audience'] == 'role':
+            return broadcast['audience_value'] == recipient.role
+        return True
+
+    def for_user(self, user_id: int, unread_only: bool = False) -> List[Dict]:
+        """Broadcasts shown to a user, newest first, with ``is_read`` from the watermark"""
+        # Cached next to the unread counter: no query while the badge is polled
+        recipient = unread_counter_service.recipient(user_id)
+        if recipient is None:
+            return []
+
+        broadcasts = []
+        for broadcast in self._recent_broadcasts():
+            if not self._applies(broadcast, recipient):
+                continue
+            is_read = broadcast['id'] <= recipient.watermark
+            if unread_only and is_read:
+                continue
+            data = {key: value for key, value in broadcast.items() if key != '_created_at'}
+            data.update({'user_id': int(user_id), 'is_read': is_read})
+            broadcasts.append(data)
+        return broadcasts
+
+    def unseen_count(self, user_id: int) -> int:
+        return len(self.for_user(user_id, unread_only=True))
+
+    def send(self, audience: str, notification_type: str = 'system_announcement',
+             audience_value: Optional[str] = None, title: Optional[str] = None,
+             message: Optional[str] = None, extra_data: Dict = None,
+             created_by: Optional[int] = None):
+        """Store one broadcast for a whole audience (a single INSERT).
+
+        Without ``title``/``message`` the system template of the type is
+        rendered once for a generic recipient.
+        """
+        from src.models.notification import BroadcastNotification
+        from src.services.notification_templates import template_registry
+
+        if audience not in AUDIENCES:
+            raise ValueError(f"Unknown broadcast audience {audience}")
+        if audience != 'all' and not audience_value:
+            raise ValueError(f"Broadcast audience {audience} requires a value")
+        if audience == 'city':
+            audience_value = audience_value.lower()
+
+        if not title or not message:
+            content = template_registry.render_all(
+                'system', notification_type, user=BROADCAST_RECIPIENT, extra=extra_data or {}
+            )
+            title = title or content.subject
+            message = message or content.email_body
+
+        broadcast = BroadcastNotification(
+            audience=audience,
+            audience_value=audience_value if audience != 'all' else None,
+            type=notification_type,
+            title=title,
+            message=message,
+            created_by=created_by
+        )
+        try:
+            db.session.add(broadcast)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self.invalidate()
+        self._notify_streams()
+        logger.info(f"Broadcast {broadcast.id} sent to {audience}={audience_value}")
+        return broadcast
+
+    def _notify_streams(self) -> None:
+        from src.services.notification_stream_service import notification_stream_service
+
+        notification_stream_service.publish_all('unread', None)
+
+    def _advance_watermark(self, user_id: int, broadcast_id: int) -> None:
+        """Move a user's watermark forward (never back) in the current transaction"""
+        from src.models.notification import NotificationCounter
+
+        table = NotificationCounter.__table__
+        upsert(
+            table, [{'user_id': user_id, 'unread_count': 0, 'broadcast_read_id': broadcast_id}], key=['user_id'],
+            updates=lambda new: {'broadcast_read_id': greatest(table.c.broadcast_read_id, new.broadcast_read_id)}
+        )
+        # Drops the cached recipient and tells the user's streams on commit
+        unread_counter_service.touch(user_id)
+
+    def mark_as_read(self, user_id: int, broadcast_id: Optional[int] = None) -> int:
+        """Mark broadcasts read up to ``broadcast_id`` (all shown ones when None); returns how many"""
+        unseen = self.for_user(user_id, unread_only=True)
+        if broadcast_id is not None:
+            unseen = [broadcast for broadcast in unseen if broadcast['id'] <= broadcast_id]
+        if not unseen:
+            return 0
+
+        try:
+            self._advance_watermark(int(user_id), max(broadcast['id'] for broadcast in unseen))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return len(unseen)
+
+
+# Global broadcast service instance
+broadcast_service = BroadcastService()
@@ -0,0 +1,261 @@
+import logging
+import smtplib
+import socket
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Errors that leave an SMTP connection unusable (the message may be retried on a new one).
+# Listed one by one: SMTPException subclasses OSError, so OSError would also take in
+# recipient and data rejections, which must not be resent
+SMTP_CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class TransportStats:
+    """Send counters and a sliding window of per-message latencies"""
+
+    def __init__(self, name: str, window: int = 1000):
+        self.name = name
+        self.sent = 0
+        self.errors = 0
+        self.connects = 0
+        self.reconnects = 0
+        self._latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, elapsed_ms: float, ok: bool = True) -> None:
+        with self._lock:
+            self._latencies.append(elapsed_ms)
+            if ok:
+                self.sent += 1
+            else:
+                self.errors += 1
+
+    def record_connect(self, reconnect: bool = False) -> None:
+        with self._lock:
+            self.connects += 1
+            if reconnect:
+                self.reconnects += 1
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            sent, errors, connects, reconnects = self.sent, self.errors, self.connects, self.reconnects
+
+        def percentile(fraction: float) -> Optional[float]:
+            if not latencies:
+                return None
+            return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 2)
+
+        return {
+            'transport': self.name,
+            'sent': sent,
+            'errors': errors,
+            'connects': connects,
+            'reconnects': reconnects,
+            'avg_ms': round(sum(latencies) / len(latencies), 2) if latencies else None,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(latencies[-1], 2) if latencies else None
+        }
+
+
+class _PooledSMTP:
+    __slots__ = ('server', 'last_used', 'messages')
+
+    def __init__(self, server: smtplib.SMTP):
+        self.server = server
+        self.last_used = time.monotonic()
+        self.messages = 0
+
+    def close(self) -> None:
+        try:
+            self.server.quit()
+        except Exception:
+            try:
+                self.server.close()
+            except Exception:
+                pass
+
+
+class SMTPConnectionPool:
+    """Bounded pool of connected and authenticated SMTP sessions.
+
+    Idle connections are checked with NOOP before reuse and replaced when
+    the server dropped them; a connection is recycled after
+    ``max_messages_per_connection`` messages.
+    """
+
+    def __init__(self, host: str, port: int, username: str = '', password: str = '', use_tls: bool = True,
+                 timeout: float = 10, max_size: int = 4, max_idle_seconds: float = 30,
+                 max_messages_per_connection: int = 100, acquire_timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.max_messages_per_connection = max_messages_per_connection
+        self.acquire_timeout = acquire_timeout
+        self.stats = TransportStats('smtp')
+        self._idle: deque = deque()
+        self._created = 0
+        self._cond = threading.Condition()
+
+    def _connect(self, reconnect: bool = False) -> _PooledSMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.use_tls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self.stats.record_connect(reconnect)
+        return _PooledSMTP(server)
+
+    def _is_healthy(self, conn: _PooledSMTP) -> bool:
+        if time.monotonic() - conn.last_used < self.max_idle_seconds:
+            return True
+        try:
+            return conn.server.noop()[0] == 250
+        except Exception:
+            return False
+
+    def _acquire(self) -> _PooledSMTP:
+        deadline = time.monotonic() + self.acquire_timeout
+        with self._cond:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._created < self.max_size:
+                    self._created += 1
+                    conn = None
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self._cond.wait(remaining):
+                    raise TimeoutError('No SMTP connection available')
+
+        try:
+            if conn is None:
+                return self._connect()
+            if not self._is_healthy(conn):
+                conn.close()
+                return self._connect(reconnect=True)
+            return conn
+        except Exception:
+            with self._cond:
+                self._created -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: Optional[_PooledSMTP]) -> None:
+        with self._cond:
+            if conn is None or conn.messages >= self.max_messages_per_connection:
+                if conn is not None:
+                    conn.close()
+                self._created -= 1
+            else:
+                conn.last_used = time.monotonic()
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def send_messages(self, messages: List) -> List[Optional[str]]:
+        """Send several email messages over one pooled connection.
+
+        Returns one entry per message: ``None`` when it was accepted, or the
+        error text. A dropped connection is replaced once per message.
+        """
+        results: List[Optional[str]] = []
+        conn = self._acquire()
+        try:
+            for msg in messages:
+                for attempt in range(2):
+                    started = time.perf_counter()
+                    try:
+                        conn.server.send_message(msg)
+                        conn.messages += 1
+                        self.stats.record((time.perf_counter() - started) * 1000)
+                        results.append(None)
+                        break
+                    except SMTP_CONNECTION_ERRORS as e:
+                        self.stats.record((time.perf_counter() - started) * 1000, ok=False)
+                        conn.close()
+                        try:
+                            conn = self._connect(reconnect=True)
+                        except Exception as connect_error:
+                            conn = None
+                            results.extend([str(connect_error)] * (len(messages) - len(results)))
+                            return results
+                        if attempt:
+                            results.append(str(e))
+                    except smtplib.SMTPException as e:
+                        self.stats.record((time.perf_counter() - started) * 1000, ok=False)
+                        results.append(str(e))
+                        break
+            return results
+        except Exception:
+            # Unexpected error mid-conversation: the connection is not put back in the pool
+            if conn is not None:
+                conn.close()
+                conn = None
+            raise
+        finally:
+            self._release(conn)
+
+    def send_message(self, msg) -> None:
+        error = self.send_messages([msg])[0]
+        if error:
+            raise smtplib.SMTPException(error)
+
+    def close(self) -> None:
+        with self._cond:
+            while self._idle:
+                self._idle.pop().close()
+                self._created -= 1
+
+
+class HTTPTransport:
+    """JSON POSTs over a keep-alive ``requests.Session`` with a bounded connection pool"""
+
+    def __init__(self, url: str, name: str = 'http', pool_size: int = 10, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.stats = TransportStats(name)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def post(self, payload: Dict) -> None:
+        """POST one payload, raising when the API does not answer 200"""
+        error = self.post_many([payload])[0]
+        if error:
+            raise RuntimeError(error)
+
+    def post_many(self, payloads: List[Dict]) -> List[Optional[str]]:
+        """POST several payloads back to back on the pooled connections"""
+        results: List[Optional[str]] = []
+        for payload in payloads:
+            started = time.perf_counter()
+            try:
+                response = self.session.post(self.url, json=payload, timeout=self.timeout)
+                error = None if response.status_code == 200 else f"API returned {response.status_code}"
+            except requests.RequestException as e:
+                error = str(e)
+            self.stats.record((time.perf_counter() - started) * 1000, ok=error is None)
+            results.append(error)
+        return results
+
+    def close(self) -> None:
+        self.session.close()
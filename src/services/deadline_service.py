@@ -0,0 +1,189 @@
+import logging
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Optional
+
+from flask import g, has_request_context, jsonify, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Time budget in seconds per endpoint; everything else gets REQUEST_DEADLINE_DEFAULT
+DEFAULT_DEADLINES = {
+    'complaints.get_complaints': 3.0,
+    'complaints.find_similar_complaints': 2.0,
+    'maps.get_heatmap_data': 3.0,
+    'maps.get_city_statistics': 3.0,
+}
+# Long-lived streams run their queries after the request has returned
+EXEMPT = {
+    'notifications.stream_notifications',
+}
+
+# SQLite VM instructions between deadline checks
+PROGRESS_HANDLER_STEPS = 1000
+
+
+class DeadlineExceeded(Exception):
+    """The request ran out of time budget; ``interrupted`` when a running statement was cut off"""
+
+    def __init__(self, statement: str, budget: float, interrupted: bool):
+        super().__init__(f"Request deadline of {budget:g}s exceeded")
+        self.statement = statement
+        self.budget = budget
+        self.interrupted = interrupted
+
+
+class DeadlineService:
+    """Per-request time budgets propagated into SQL execution.
+
+    Each request gets a deadline from its endpoint's budget. Before every
+    statement the remaining budget is checked; on SQLite a progress handler
+    interrupts the statement once the deadline passes, on PostgreSQL the
+    remaining budget is set as ``statement_timeout``. Either way the
+    request fails with ``DeadlineExceeded`` (504 when a statement was cut
+    off, 503 when the budget was gone before it started) and the statement
+    is recorded.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.default_deadline = 30.0
+        self.deadlines: Dict[str, float] = dict(DEFAULT_DEADLINES)
+        self._recent = deque(maxlen=50)
+        self._stats: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._engines = set()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize deadline service with Flask app (inside an app context)"""
+        from src.database import db
+
+        self.app = app
+        self.enabled = app.config.get('REQUEST_DEADLINES_ENABLED', True)
+        self.default_deadline = app.config.get('REQUEST_DEADLINE_DEFAULT', 30.0)
+        self.deadlines.update(app.config.get('REQUEST_DEADLINES', {}))
+
+        if 'request_deadlines' not in app.extensions:
+            app.before_request(self._start)
+            app.register_error_handler(DeadlineExceeded, self.error_response)
+            app.extensions['request_deadlines'] = self
+
+        engine = db.engine
+        if engine not in self._engines:
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'handle_error', self._handle_error)
+            event.listen(engine, 'checkin', self._checkin)
+            self._engines.add(engine)
+
+    def _start(self):
+        endpoint = request.endpoint
+        if not self.enabled or not endpoint or endpoint in EXEMPT:
+            return None
+        budget = self.deadlines.get(endpoint, self.default_deadline)
+        if budget:
+            g.deadline = (time.monotonic() + budget, budget)
+        return None
+
+    @staticmethod
+    def current() -> Optional[tuple]:
+        """(deadline, budget) of the current request, or None outside requests"""
+        if has_request_context():
+            return g.get('deadline')
+        return None
+
+    # Engine events
+
+    @staticmethod
+    def _holder(conn) -> list:
+        """Per-connection cell read by the SQLite progress handler, installed once per DBAPI connection"""
+        info = conn.connection.info
+        holder = info.get('deadline_holder')
+        if holder is None:
+            holder = info['deadline_holder'] = [None]
+            conn.connection.driver_connection.set_progress_handler(
+                lambda: 1 if holder[0] is not None and time.monotonic() > holder[0] else 0,
+                PROGRESS_HANDLER_STEPS
+            )
+        return holder
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        deadline = self.current()
+        if conn.dialect.name == 'sqlite' and (deadline is not None or 'deadline_holder' in conn.connection.info):
+            # Left armed after execute: SQLite keeps running the statement while its rows are fetched.
+            # The next statement on this connection re-arms or disarms it
+            self._holder(conn)[0] = deadline[0] if deadline is not None else None
+        if deadline is None:
+            return
+
+        remaining = deadline[0] - time.monotonic()
+        if remaining <= 0:
+            self._record(statement, deadline[1], interrupted=False)
+            raise DeadlineExceeded(statement, deadline[1], interrupted=False)
+        if conn.dialect.name == 'postgresql':
+            # SET LOCAL lasts until the end of the transaction; every statement resets it
+            cursor.execute(f"SET LOCAL statement_timeout = {max(1, int(remaining * 1000))}")
+
+    @staticmethod
+    def _checkin(dbapi_connection, connection_record):
+        holder = connection_record.info.get('deadline_holder')
+        if holder is not None:
+            holder[0] = None
+
+    def _handle_error(self, context):
+        error = context.original_exception
+        interrupted = (
+            (isinstance(error, sqlite3.OperationalError) and 'interrupted' in str(error))
+            or getattr(error, 'pgcode', None) == '57014'
+        )
+        deadline = self.current()
+        if interrupted and deadline is not None:
+            # Errors while fetching rows only carry the statement on the execution context
+            statement = context.statement or getattr(context.execution_context, 'statement', None)
+            self._record(statement, deadline[1], interrupted=True)
+            raise DeadlineExceeded(statement, deadline[1], interrupted=True) from error
+
+    # Reporting
+
+    def _record(self, statement: str, budget: float, interrupted: bool) -> None:
+        endpoint = request.endpoint if has_request_context() else None
+        logger.warning(
+            f"Deadline of {budget:g}s exceeded on {endpoint} "
+            f"({'interrupted' if interrupted else 'not started'}): {(statement or '')[:200]}"
+        )
+        with self._lock:
+            self._stats[endpoint] = self._stats.get(endpoint, 0) + 1
+            self._recent.append({
+                'endpoint': endpoint,
+                'path': request.full_path if has_request_context() else None,
+                'statement': (statement or '')[:500],
+                'budget_s': budget,
+                'interrupted': interrupted,
+                'at': datetime.utcnow().isoformat()
+            })
+
+    def error_response(self, error: DeadlineExceeded):
+        """504 when a statement was cut off, 503 when the budget ran out before it started"""
+        if error.interrupted:
+            return jsonify({'message': 'Tempo limite da requisição excedido'}), 504
+        return jsonify({'message': 'Servidor ocupado, tente novamente em instantes'}), 503, {'Retry-After': '1'}
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'default_deadline_s': self.default_deadline,
+                'deadlines_s': dict(self.deadlines),
+                'exceeded': dict(self._stats),
+                'recent': list(self._recent)
+            }
+
+
+# Global deadline service instance
+deadline_service = DeadlineService()
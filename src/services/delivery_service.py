@@ -0,0 +1,455 @@
+import logging
+import os
+import random
+import threading
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, event, func, or_, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+# Notification types of this app mapped to the domain types used for prioritisation
+DOMAIN_NOTIFICATION_TYPES = {
+    'complaint_created': 'complaint_created',
+    'status_updated': 'complaint_responded',
+    'new_response': 'complaint_responded',
+    'response_added': 'complaint_responded',
+    'priority_updated': 'complaint_responded',
+    'complaint_resolved': 'complaint_resolved',
+    'complaint_voted': 'complaint_voted',
+    'welcome': 'system_announcement',
+    'monthly_report': 'system_announcement',
+    'system_announcement': 'system_announcement'
+}
+
+OUTBOX_SESSION_FLAG = 'notification_outbox_pending'
+
+
+def delivery_priority(notification_type: str, channel: str, title: str, message: str) -> int:
+    """Priority of a delivery (1 = most urgent), as defined by the domain entity"""
+    from app.domain.entities.notification import Notification as NotificationEntity
+
+    try:
+        entity = NotificationEntity(
+            id=None,
+            user_id=0,
+            title=title[:100],
+            message=message[:500],
+            notification_type=DOMAIN_NOTIFICATION_TYPES.get(notification_type, 'complaint_created'),
+            channel=channel
+        )
+    except ValueError:
+        return 5
+    return entity.get_priority_score()
+
+
+class DeliveryService:
+    """Transactional outbox for email and WhatsApp notifications.
+
+    Deliveries are written in the same transaction as their notification and
+    sent later by background workers, which claim batches with a lease, retry
+    failures with exponential backoff and move exhausted deliveries to the
+    ``dead`` state.
+
+    Deliveries to the same recipient and channel that arrive within
+    ``NOTIFICATION_DIGEST_WINDOW`` seconds of the previous one are held until
+    the window ends and sent together as one digest message.
+
+    An email body is the notification's own stored message, so it is not
+    copied into the outbox: it is rendered from the notification's template
+    key and parameters when sent. Other bodies are emptied once sent.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+        self._listening = False
+        self._stats_lock = threading.Lock()
+        self.digests_sent = 0
+        self.deliveries_coalesced = 0
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize delivery service with Flask app"""
+        self.app = app
+        self.worker_count = app.config.get('NOTIFICATION_WORKERS', 2)
+        self.priority_worker_count = app.config.get('NOTIFICATION_PRIORITY_WORKERS', 1)
+        self.priority_lane_max = app.config.get('NOTIFICATION_PRIORITY_LANE_MAX', 2)
+        self.batch_size = app.config.get('NOTIFICATION_CLAIM_BATCH_SIZE', 20)
+        self.lease_seconds = app.config.get('NOTIFICATION_LEASE_SECONDS', 60)
+        self.poll_interval = app.config.get('NOTIFICATION_POLL_INTERVAL', 5)
+        self.max_attempts = app.config.get('NOTIFICATION_MAX_ATTEMPTS', 6)
+        self.retry_base_seconds = app.config.get('NOTIFICATION_RETRY_BASE_SECONDS', 30)
+        self.retry_max_seconds = app.config.get('NOTIFICATION_RETRY_MAX_SECONDS', 3600)
+        self.digest_window = app.config.get('NOTIFICATION_DIGEST_WINDOW', 120)
+
+        if not self._listening:
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_commit(self, session) -> None:
+        if session.info.pop(OUTBOX_SESSION_FLAG, False):
+            self._wake.set()
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(OUTBOX_SESSION_FLAG, None)
+
+    def enqueue(self, notification, user, content) -> List:
+        """Add the pending deliveries of a notification to the current session.
+
+        ``content`` provides ``subject``, ``email_body`` and ``whatsapp``.
+        Nothing is committed: the deliveries become visible to the workers
+        together with the caller's transaction.
+        """
+        return self.enqueue_many([(notification, user, content)])
+
+    def enqueue_many(self, items: List[tuple]) -> List:
+        """``enqueue`` for several (notification, user, content) triples, with one digest lookup for all"""
+        from src.models.notification import NotificationDelivery
+
+        planned = []
+        for notification, user, content in items:
+            if user.email_notifications and user.email:
+                # The stored part of the template is the email body: re-rendered from the notification when sent
+                body = '' if notification.template_key and not notification.message else content.email_body
+                planned.append((notification, content, user.id, 'email', user.email, content.subject, body))
+            if user.whatsapp_notifications and user.phone:
+                planned.append((notification, content, user.id, 'whatsapp', user.phone, None, content.whatsapp))
+        if not planned:
+            return []
+
+        now = datetime.utcnow()
+        releases = self._release_times({(user_id, channel) for _, _, user_id, channel, _, _, _ in planned}, now)
+        deliveries = [
+            NotificationDelivery(
+                notification=notification,
+                user_id=user_id,
+                channel=channel,
+                recipient=recipient,
+                subject=delivery_subject,
+                body=body,
+                priority=delivery_priority(
+                    notification.type, channel, content.subject, body or content.email_body
+                ),
+                status='pending',
+                attempts=0,
+                next_attempt_at=releases[(user_id, channel)]
+            )
+            for notification, content, user_id, channel, recipient, delivery_subject, body in planned
+        ]
+        db.session.add_all(deliveries)
+        db.session.info[OUTBOX_SESSION_FLAG] = True
+        return deliveries
+
+    def _release_times(self, keys, now: datetime) -> Dict[tuple, datetime]:
+        """When new deliveries to (user_id, channel) become due, holding them to join a digest during a burst.
+
+        The first delivery of a window goes out at once; later ones wait for
+        the release time of the deliveries already held (at most one window).
+        """
+        from src.models.notification import NotificationDelivery as Delivery
+
+        if not self.digest_window:
+            return {key: now for key in keys}
+        window = timedelta(seconds=self.digest_window)
+        recent = {
+            (user_id, channel): (count, latest_release)
+            for user_id, channel, count, latest_release in db.session.query(
+                Delivery.user_id, Delivery.channel, func.count(Delivery.id), func.max(Delivery.next_attempt_at)
+            ).filter(
+                Delivery.user_id.in_({user_id for user_id, _ in keys}),
+                Delivery.created_at >= now - window
+            ).group_by(Delivery.user_id, Delivery.channel)
+        }
+
+        releases = {}
+        for key in keys:
+            count, latest_release = recent.get(key, (0, None))
+            if not count:
+                releases[key] = now
+            elif latest_release and latest_release > now:
+                releases[key] = min(latest_release, now + window)
+            else:
+                releases[key] = now + window
+        return releases
+
+    def start(self) -> None:
+        """Start the delivery workers (general lane plus high priority lane)"""
+        if self._workers:
+            return
+        lanes = [(None, self.worker_count), (self.priority_lane_max, self.priority_worker_count)]
+        for max_priority, count in lanes:
+            for index in range(count):
+                lane = 'all' if max_priority is None else f'p{max_priority}'
+                worker = threading.Thread(
+                    target=self._worker_loop,
+                    args=(max_priority,),
+                    name=f'notification-delivery-{lane}-{index}',
+                    daemon=True
+                )
+                worker.start()
+                self._workers.append(worker)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+        self._stop.clear()
+
+    def _worker_loop(self, max_priority: Optional[int]) -> None:
+        owner = f"{os.getpid()}-{threading.get_ident()}-{uuid.uuid4().hex[:8]}"
+        while not self._stop.is_set():
+            processed = 0
+            try:
+                with self.app.app_context():
+                    processed = self.process_batch(owner, max_priority)
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error in notification delivery worker: {str(e)}")
+
+            if not processed:
+                self._wake.wait(self.poll_interval)
+                self._wake.clear()
+
+    def _claim(self, owner: str, max_priority: Optional[int]) -> List:
+        """Lease a batch of due deliveries, most urgent first"""
+        from src.models.notification import NotificationDelivery as Delivery
+
+        now = datetime.utcnow()
+        claimable = or_(
+            and_(Delivery.status == 'pending', Delivery.next_attempt_at <= now),
+            and_(Delivery.status == 'sending', Delivery.lease_expires_at < now)
+        )
+        lane = [Delivery.priority <= max_priority] if max_priority is not None else []
+
+        candidates = select(Delivery.id).where(claimable, *lane).order_by(
+            Delivery.priority, Delivery.next_attempt_at, Delivery.id
+        ).limit(self.batch_size)
+
+        lease = {
+            'status': 'sending',
+            'lease_owner': owner,
+            'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+            'attempts': Delivery.attempts + 1
+        }
+
+        try:
+            db.session.execute(
+                update(Delivery).where(Delivery.id.in_(candidates), claimable).values(**lease)
+                .execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        claimed = self._leased(owner)
+        if not claimed or not self.digest_window:
+            return claimed
+
+        # Deliveries still held for the same recipients go out in the same digest. Only never
+        # attempted ones (held by the window, not backing off after a failure) in this lane
+        recipients = {(delivery.user_id, delivery.channel) for delivery in claimed}
+        try:
+            result = db.session.execute(
+                update(Delivery).where(
+                    Delivery.status == 'pending',
+                    Delivery.attempts == 0,
+                    Delivery.next_attempt_at <= now + timedelta(seconds=self.digest_window),
+                    *lane,
+                    or_(*[
+                        and_(Delivery.user_id == user_id, Delivery.channel == channel)
+                        for user_id, channel in recipients
+                    ])
+                ).values(**lease).execution_options(synchronize_session=False)
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if not result.rowcount:
+            return claimed
+
+        return self._leased(owner)
+
+    @staticmethod
+    def _leased(owner: str) -> List:
+        from src.models.notification import NotificationDelivery as Delivery
+
+        # With their notifications: email bodies are rendered from them
+        return Delivery.query.options(joinedload(Delivery.notification)).filter_by(
+            status='sending', lease_owner=owner
+        ).order_by(Delivery.priority, Delivery.id).all()
+
+    @staticmethod
+    def _body(delivery) -> str:
+        return delivery.body or delivery.notification.get_message()
+
+    def _digest_message(self, deliveries: List) -> tuple:
+        """(recipient, subject, body) of one delivery, or of a digest of several"""
+        from src.services.notification_templates import template_registry
+
+        first = deliveries[0]
+        if len(deliveries) == 1:
+            return first.recipient, first.subject, self._body(first)
+
+        ordered = sorted(deliveries, key=lambda delivery: delivery.id)
+        content = template_registry.render_all('digest', 'digest', items=[
+            {'subject': delivery.subject or '', 'body': self._body(delivery)} for delivery in ordered
+        ])
+        body = content.email_body if first.channel == 'email' else content.whatsapp
+        return first.recipient, content.subject, body
+
+    def _send_all(self, deliveries: List) -> Dict[int, Optional[str]]:
+        """Send a claimed batch, one multi-message call per channel; returns errors by delivery id.
+
+        Deliveries to the same recipient are merged into one digest message
+        and share its result.
+        """
+        from src.services.notification_service import notification_service
+
+        groups: Dict[tuple, List] = {}
+        for delivery in deliveries:
+            groups.setdefault((delivery.channel, delivery.user_id, delivery.recipient), []).append(delivery)
+
+        senders = {
+            'email': (notification_service.deliver_emails,
+                      lambda recipient, subject, body: (recipient, subject, body)),
+            'whatsapp': (notification_service.deliver_whatsapp_messages,
+                         lambda recipient, subject, body: (recipient, body))
+        }
+
+        errors: Dict[int, Optional[str]] = {}
+        for channel, (send, as_message) in senders.items():
+            batch = [members for key, members in groups.items() if key[0] == channel]
+            if not batch:
+                continue
+            try:
+                results = send([as_message(*self._digest_message(members)) for members in batch])
+            except Exception as e:
+                results = [str(e) or e.__class__.__name__] * len(batch)
+            for members, error in zip(batch, results):
+                errors.update({delivery.id: error for delivery in members})
+
+            digests = [members for members in batch if len(members) > 1]
+            if digests:
+                with self._stats_lock:
+                    self.digests_sent += len(digests)
+                    self.deliveries_coalesced += sum(len(members) for members in digests)
+
+        for delivery in deliveries:
+            errors.setdefault(delivery.id, f"Unknown notification channel {delivery.channel}")
+        return errors
+
+    def _backoff(self, attempts: int) -> timedelta:
+        delay = min(self.retry_base_seconds * 2 ** (attempts - 1), self.retry_max_seconds)
+        return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+    def process_batch(self, owner: str, max_priority: Optional[int] = None) -> int:
+        """Claim and send one batch of deliveries; returns how many were processed"""
+        from src.models.notification import Notification, NotificationDelivery as Delivery
+
+        deliveries = self._claim(owner, max_priority)
+        errors = self._send_all(deliveries)
+        for delivery in deliveries:
+            error = errors[delivery.id]
+            now = datetime.utcnow()
+            if error is None:
+                # The text is no longer needed once sent
+                values = {'status': 'sent', 'sent_at': now, 'last_error': None, 'body': ''}
+            elif delivery.attempts >= self.max_attempts:
+                values = {'status': 'dead', 'last_error': error}
+                logger.error(f"Notification delivery {delivery.id} moved to dead letter: {error}")
+            else:
+                values = {
+                    'status': 'pending',
+                    'next_attempt_at': now + self._backoff(delivery.attempts),
+                    'last_error': error
+                }
+
+            try:
+                # Only the current lease holder may settle the delivery
+                result = db.session.execute(
+                    update(Delivery).where(
+                        Delivery.id == delivery.id,
+                        Delivery.lease_owner == owner
+                    ).values(lease_owner=None, lease_expires_at=None, **values)
+                    .execution_options(synchronize_session=False)
+                )
+                if error is None and result.rowcount:
+                    flag = 'sent_email' if delivery.channel == 'email' else 'sent_whatsapp'
+                    Notification.query.filter_by(id=delivery.notification_id).update(
+                        {flag: True}, synchronize_session=False
+                    )
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Error settling notification delivery {delivery.id}: {str(e)}")
+
+        return len(deliveries)
+
+    def drain(self, max_batches: int = 100) -> int:
+        """Process due deliveries on the calling thread (maintenance and scripts)"""
+        owner = f"drain-{uuid.uuid4().hex[:8]}"
+        total = 0
+        for _ in range(max_batches):
+            processed = self.process_batch(owner)
+            if not processed:
+                break
+            total += processed
+        return total
+
+    def retry_dead(self) -> int:
+        """Move dead deliveries back to the queue; returns how many were requeued"""
+        from src.models.notification import NotificationDelivery as Delivery
+
+        try:
+            requeued = Delivery.query.filter_by(status='dead').update({
+                'status': 'pending',
+                'attempts': 0,
+                'next_attempt_at': datetime.utcnow()
+            }, synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        if requeued:
+            self._wake.set()
+        return requeued
+
+    def get_stats(self) -> Dict:
+        """Delivery counts per channel and status"""
+        from sqlalchemy import func
+        from src.models.notification import NotificationDelivery as Delivery
+
+        stats: Dict[str, Dict[str, int]] = {}
+        for channel, status, count in db.session.query(
+            Delivery.channel, Delivery.status, func.count(Delivery.id)
+        ).group_by(Delivery.channel, Delivery.status).all():
+            stats.setdefault(channel, {})[status] = count
+        return stats
+
+    def get_digest_stats(self) -> Dict:
+        """Digest messages sent by this process and the deliveries merged into them"""
+        with self._stats_lock:
+            return {
+                'window_seconds': self.digest_window,
+                'digests_sent': self.digests_sent,
+                'deliveries_coalesced': self.deliveries_coalesced,
+                'sends_saved': self.deliveries_coalesced - self.digests_sent
+            }
+
+
+# Global delivery service instance
+delivery_service = DeliveryService()
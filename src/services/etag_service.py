@@ -0,0 +1,208 @@
+import hashlib
+import logging
+from typing import Callable, Dict, Iterable, NamedTuple, Optional, Set
+
+from flask import current_app, make_response, request
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from src.database import db, upsert
+
+logger = logging.getLogger(__name__)
+
+# Version row bumped when user data shown inside complaints changes
+GLOBAL_VERSION = '*'
+USER_FIELDS = ('username', 'full_name')
+
+# Cache-Control per endpoint class; 'no-cache' means "revalidate with the ETag before reusing"
+DEFAULT_CACHE_CONTROL = {
+    'static': 'public, max-age=3600',
+    'collection': 'public, no-cache',
+    'item': 'public, no-cache',
+}
+
+
+CHANGES_SESSION_KEY = 'complaint_changes'
+
+
+def _digest(value: str) -> str:
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=8).hexdigest()
+
+
+class ComplaintChanges(NamedTuple):
+    cities: Set[str]
+    complaint_ids: Set[int]
+    users: bool
+
+
+def complaint_changes(session, flush_context) -> ComplaintChanges:
+    """Cities and complaints touched by a flush, and whether shown user names changed.
+
+    Shared by the ETag and response cache hooks: it is computed once per
+    flush, so the city lookup for votes and responses runs a single time.
+    """
+    memo = session.info.get(CHANGES_SESSION_KEY)
+    if memo is not None and memo[0] is flush_context:
+        return memo[1]
+
+    from src.models.complaint import Complaint, Response, Vote
+    from src.models.user import User
+
+    cities = set()
+    complaint_ids = set()
+    related_ids = set()
+    users = False
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, Complaint):
+            if obj in session.dirty and not session.is_modified(obj):
+                continue
+            cities.add(obj.city)
+            # A complaint moved to another city changes both lists
+            cities.update(inspect(obj).attrs.city.history.deleted or ())
+            if obj.id is not None:
+                complaint_ids.add(obj.id)
+        elif isinstance(obj, (Vote, Response)):
+            related_ids.add(obj.complaint_id)
+        elif isinstance(obj, User) and obj in session.dirty:
+            if any(inspect(obj).attrs[field].history.has_changes() for field in USER_FIELDS):
+                users = True
+
+    related_ids.discard(None)
+    if related_ids:
+        complaint_ids.update(related_ids)
+        cities.update(session.connection().execute(
+            select(Complaint.city).where(Complaint.id.in_(related_ids)).distinct()
+        ).scalars())
+
+    changes = ComplaintChanges({city for city in cities if city}, complaint_ids, users)
+    session.info[CHANGES_SESSION_KEY] = (flush_context, changes)
+    return changes
+
+
+class ETagService:
+    """Weak ETags for read endpoints, computed before the heavy query runs.
+
+    Complaint data is versioned per city in ``complaint_version``: any flush
+    that adds, changes or deletes a complaint, vote or response bumps its
+    city's version in the same transaction, so every worker process sees the
+    new ETag as soon as the change commits. A request whose
+    ``If-None-Match`` matches gets a 304 without the list query or the
+    serialization.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.cache_control: Dict[str, str] = dict(DEFAULT_CACHE_CONTROL)
+        self._listening = False
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize ETag service with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('ETAGS_ENABLED', True)
+        self.cache_control.update(app.config.get('ETAG_CACHE_CONTROL', {}))
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_flush_postexec', self._after_flush_postexec)
+            self._listening = True
+
+    # Versions
+
+    def _after_flush(self, session, flush_context) -> None:
+        changes = complaint_changes(session, flush_context)
+        cities = set(changes.cities)
+        if changes.users:
+            cities.add(GLOBAL_VERSION)
+        if cities:
+            self.bump(cities, connection=session.connection())
+
+    def _after_flush_postexec(self, session, flush_context) -> None:
+        session.info.pop(CHANGES_SESSION_KEY, None)
+
+    def bump(self, cities: Iterable[str], connection=None) -> None:
+        """Increment the versions of ``cities`` in the current transaction"""
+        from src.models.complaint import ComplaintVersion
+
+        table = ComplaintVersion.__table__
+        upsert(
+            table, [{'city': city, 'version': 1} for city in sorted(cities)], key=['city'],
+            updates=lambda new: {'version': table.c.version + 1}, connection=connection
+        )
+
+    def versions(self, city: str) -> str:
+        """'<city version>.<global version>' in one primary key read"""
+        from src.models.complaint import ComplaintVersion
+
+        rows = dict(db.session.execute(
+            select(ComplaintVersion.city, ComplaintVersion.version).where(
+                ComplaintVersion.city.in_((city, GLOBAL_VERSION))
+            )
+        ).all())
+        return f"{rows.get(city, 0)}.{rows.get(GLOBAL_VERSION, 0)}"
+
+    # ETags
+
+    def collection_etag(self, city: str) -> str:
+        """ETag of a complaint list page: city versions plus the query string"""
+        city = (city or 'cuiaba').lower()
+        return f"{city}-{self.versions(city)}-{_digest(request.query_string.decode('utf-8'))}"
+
+    def complaint_etag(self, complaint_id: int) -> Optional[str]:
+        """ETag of one complaint: its ``updated_at`` and its city's versions (votes, responses)"""
+        from src.models.complaint import Complaint
+
+        row = db.session.execute(
+            select(Complaint.city, Complaint.updated_at).where(Complaint.id == complaint_id)
+        ).first()
+        if row is None:
+            return None
+        updated = row.updated_at.timestamp() if row.updated_at else 0
+        return f"c{complaint_id}-{updated:.6f}-{self.versions(row.city)}"
+
+    def apply(self, response, endpoint_class: str, etag: Optional[str] = None):
+        """Set ``ETag`` and ``Cache-Control`` on a 200 response; 304 when the client already has it"""
+        if response.status_code != 200:
+            return response
+        if etag is None:
+            # Small static payloads: the body is the version
+            etag = _digest(response.get_data(as_text=True))
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = self.cache_control[endpoint_class]
+        return response.make_conditional(request)
+
+
+# Global ETag service instance
+etag_service = ETagService()
+
+
+def conditional(endpoint_class: str, etag: Optional[Callable[..., Optional[str]]] = None):
+    """Decorator answering ``If-None-Match`` with 304.
+
+    ``etag`` receives the view arguments and runs before the view, so a
+    matching request never reaches the query; without it the ETag is
+    derived from the response body.
+    """
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            if not etag_service.enabled or request.method not in ('GET', 'HEAD'):
+                return f(*args, **kwargs)
+
+            tag = None
+            if etag is not None:
+                try:
+                    tag = etag(**kwargs)
+                except Exception as e:
+                    current_app.logger.warning(f"Erro ao calcular ETag: {str(e)}")
+                if tag is not None and request.if_none_match.contains_weak(tag):
+                    response = make_response('', 304)
+                    response.set_etag(tag, weak=True)
+                    response.headers['Cache-Control'] = etag_service.cache_control[endpoint_class]
+                    return response
+
+            return etag_service.apply(make_response(f(*args, **kwargs)), endpoint_class, tag)
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
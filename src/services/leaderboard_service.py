@@ -0,0 +1,482 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left, insort
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single process serves the app
+    fcntl = None
+
+from src.database import db
+from src.services.point_rollup_service import month_bounds, point_rollup_service
+from src.services.ranking_service import upsert_city_rankings
+
+logger = logging.getLogger(__name__)
+
+
+class _ScoreFenwick:
+    """Fenwick tree counting users per integer score bucket.
+
+    The covered score range grows on demand (doubling), so negative and
+    arbitrarily large monthly scores are supported.
+    """
+
+    def __init__(self, offset: int = 0, size: int = 1024):
+        self.offset = offset
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+
+    def _index(self, score: int) -> int:
+        return score - self.offset + 1
+
+    def _ensure(self, score: int, counts: Dict[int, int]) -> None:
+        if self.offset <= score < self.offset + self.size:
+            return
+        low = min(score, self.offset)
+        high = max(score, self.offset + self.size - 1)
+        size = self.size
+        while size < high - low + 1:
+            size *= 2
+        self.offset = low
+        self.size = size
+        self.tree = [0] * (size + 1)
+        self.total = 0
+        for bucket_score, count in counts.items():
+            self._add(bucket_score, count)
+
+    def _add(self, score: int, delta: int) -> None:
+        i = self._index(score)
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+        self.total += delta
+
+    def add(self, score: int, delta: int, counts: Dict[int, int]) -> None:
+        self._ensure(score, counts)
+        self._add(score, delta)
+
+    def prefix(self, score: int) -> int:
+        """Number of users with a score <= ``score``"""
+        i = min(self._index(score), self.size)
+        result = 0
+        while i > 0:
+            result += self.tree[i]
+            i -= i & -i
+        return result
+
+    def count_greater(self, score: int) -> int:
+        return self.total - self.prefix(score)
+
+    def kth_largest(self, k: int) -> int:
+        """Score of the k-th best user (1-based)"""
+        target = self.total - k + 1
+        position = 0
+        step = 1 << self.size.bit_length()
+        while step:
+            nxt = position + step
+            if nxt <= self.size and self.tree[nxt] < target:
+                position = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return position + self.offset
+
+
+class Leaderboard:
+    """Live ranking of one city in one month.
+
+    Rank follows ``RANK()`` semantics (ties share a position); users with
+    the same score are listed by user id. Every PointHistory row up to
+    ``last_history_id`` is counted, plus the newer rows in ``applied``.
+    """
+
+    def __init__(self, city: str, year: int, month: int):
+        self.city = city
+        self.year = year
+        self.month = month
+        self.scores: Dict[int, int] = {}
+        self.buckets: Dict[int, List[int]] = {}
+        self.counts: Dict[int, int] = {}
+        self.fenwick = _ScoreFenwick()
+        self.last_history_id = 0
+        self.applied: Set[int] = set()
+        self.synced_at = 0.0
+        self.closed = False
+
+    def __len__(self):
+        return len(self.scores)
+
+    def _remove(self, user_id: int, score: int) -> None:
+        members = self.buckets[score]
+        members.pop(bisect_left(members, user_id))
+        if not members:
+            del self.buckets[score]
+        self.counts[score] -= 1
+        if not self.counts[score]:
+            del self.counts[score]
+        self.fenwick.add(score, -1, self.counts)
+
+    def _insert(self, user_id: int, score: int) -> None:
+        self.fenwick.add(score, 1, self.counts)
+        insort(self.buckets.setdefault(score, []), user_id)
+        self.counts[score] = self.counts.get(score, 0) + 1
+
+    def add_points(self, user_id: int, points: int) -> int:
+        current = self.scores.get(user_id)
+        if current is not None:
+            self._remove(user_id, current)
+        new_score = (current or 0) + points
+        self.scores[user_id] = new_score
+        self._insert(user_id, new_score)
+        return new_score
+
+    def rank(self, user_id: int) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.fenwick.count_greater(score) + 1
+
+    def slice(self, first: int, last: int) -> List[Dict]:
+        """Entries between two 1-based positions (inclusive)"""
+        first = max(first, 1)
+        last = min(last, len(self.scores))
+        entries = []
+        position = first
+        while position <= last:
+            score = self.fenwick.kth_largest(position)
+            members = self.buckets[score]
+            greater = self.fenwick.count_greater(score)
+            for user_id in members[position - greater - 1:last - greater]:
+                entries.append({
+                    'user_id': user_id,
+                    'points': score,
+                    'rank_position': greater + 1
+                })
+            position = greater + len(members) + 1
+        return entries
+
+    def position_of(self, user_id: int) -> Optional[int]:
+        score = self.scores.get(user_id)
+        if score is None:
+            return None
+        return self.fenwick.count_greater(score) + bisect_left(self.buckets[score], user_id) + 1
+
+    def to_snapshot(self) -> Dict:
+        return {
+            'city': self.city,
+            'year': self.year,
+            'month': self.month,
+            'last_history_id': self.last_history_id,
+            'applied_ids': sorted(self.applied),
+            'scores': {str(user_id): score for user_id, score in self.scores.items()}
+        }
+
+
+class LeaderboardService:
+    """Live boards per city and month.
+
+    ``_lock`` only guards the board maps. Each board has its own lock, held
+    while it is loaded, synced with the database, updated or read, so a
+    cold load of one city never holds up the others.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.sync_interval = 5
+        self.settle_seconds = 60
+        self._boards: Dict[Tuple[str, int, int], Leaderboard] = {}
+        self._board_locks: Dict[Tuple[str, int, int], threading.RLock] = {}
+        self._lock = threading.Lock()
+        self._flusher = None
+        self._persist_lock_fd: Optional[int] = None
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize leaderboard service with Flask app"""
+        self.app = app
+        self.snapshot_dir = app.config.get(
+            'LEADERBOARD_SNAPSHOT_DIR', os.path.join(app.instance_path, 'leaderboards')
+        )
+        self.snapshot_interval = app.config.get('LEADERBOARD_SNAPSHOT_INTERVAL', 300)
+        # Only the worker process holding the lock file writes CityRanking back
+        self.persist_rankings = app.config.get('LEADERBOARD_PERSIST_RANKINGS', True)
+        # Points awarded by other workers are read from PointHistory this often
+        self.sync_interval = app.config.get('LEADERBOARD_SYNC_INTERVAL', 5)
+        # Rows younger than this are tracked one by one: an older transaction may still commit a lower id
+        self.settle_seconds = app.config.get('LEADERBOARD_SETTLE_SECONDS', 60)
+
+        if self.snapshot_interval and self._flusher is None:
+            self._flusher = threading.Thread(target=self._flush_loop, name='leaderboard-flush', daemon=True)
+            self._flusher.start()
+            atexit.register(self.snapshot_all)
+
+    @staticmethod
+    def _current_period() -> Tuple[int, int]:
+        now = datetime.utcnow()
+        return now.year, now.month
+
+    def _snapshot_path(self, city: str, year: int, month: int) -> str:
+        return os.path.join(self.snapshot_dir, f"{city}-{year:04d}-{month:02d}.json")
+
+    def _load(self, city: str, year: int, month: int) -> Leaderboard:
+        """Build a board from its disk snapshot plus newer PointHistory rows.
+
+        Compacted closed months are read straight from point_monthly.
+        """
+        board = Leaderboard(city, year, month)
+        if point_rollup_service.is_rolled_up(year, month):
+            # Closed, compacted months no longer receive points
+            for user_id, points in db.session.execute(point_rollup_service.monthly_totals(city, year, month)):
+                board.add_points(user_id, points)
+            board.closed = True
+            return board
+
+        path = self._snapshot_path(city, year, month)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as snapshot_file:
+                    snapshot = json.load(snapshot_file)
+                for user_id, score in snapshot['scores'].items():
+                    board.add_points(int(user_id), score)
+                board.last_history_id = snapshot['last_history_id']
+                board.applied = set(snapshot.get('applied_ids', ()))
+            except Exception as e:
+                logger.error(f"Error reading leaderboard snapshot {path}: {str(e)}")
+                board = Leaderboard(city, year, month)
+
+        self._catch_up(board)
+        return board
+
+    def _catch_up(self, board: Leaderboard) -> None:
+        """Fold the PointHistory rows the board has not counted yet.
+
+        Rows older than ``settle_seconds`` are summed in SQL and advance
+        ``last_history_id``. Newer ones are applied one by one and kept in
+        ``board.applied``, because a transaction that started earlier can
+        still commit a lower id; a single max-id watermark would skip it.
+        This also brings in points committed by other worker processes.
+        """
+        from src.models.user import User
+        from src.models.gamification import PointHistory
+
+        start, end = month_bounds(board.year, board.month)
+        cutoff = min(max(datetime.utcnow() - timedelta(seconds=self.settle_seconds), start), end)
+        filters = [
+            User.city == board.city,
+            PointHistory.created_at >= start,
+            PointHistory.created_at < end,
+            PointHistory.id > board.last_history_id
+        ]
+
+        settled = db.session.query(
+            PointHistory.user_id,
+            func.sum(PointHistory.points)
+        ).join(User, User.id == PointHistory.user_id).filter(*filters, PointHistory.created_at < cutoff)
+        if board.applied:
+            settled = settled.filter(PointHistory.id.notin_(board.applied))
+        for user_id, points in settled.group_by(PointHistory.user_id).all():
+            board.add_points(user_id, points)
+        # Settled rows counted earlier through ``applied`` move the watermark too
+        settled_max = db.session.query(func.max(PointHistory.id)).join(
+            User, User.id == PointHistory.user_id
+        ).filter(*filters, PointHistory.created_at < cutoff).scalar()
+        watermark = max(board.last_history_id, settled_max or 0)
+
+        recent = db.session.query(
+            PointHistory.id,
+            PointHistory.user_id,
+            PointHistory.points
+        ).join(User, User.id == PointHistory.user_id).filter(*filters, PointHistory.created_at >= cutoff)
+        for history_id, user_id, points in recent.all():
+            if history_id not in board.applied:
+                board.add_points(user_id, points)
+                board.applied.add(history_id)
+
+        board.last_history_id = watermark
+        board.applied = {history_id for history_id in board.applied if history_id > watermark}
+        board.synced_at = time.monotonic()
+
+    def _board_lock(self, key: Tuple[str, int, int]) -> threading.RLock:
+        with self._lock:
+            return self._board_locks.setdefault(key, threading.RLock())
+
+    def _locked(self, board: Leaderboard) -> threading.RLock:
+        return self._board_lock((board.city, board.year, board.month))
+
+    def get_board(self, city: str, year: Optional[int] = None, month: Optional[int] = None) -> Leaderboard:
+        """Return the live board of a city/month, loading it on first use.
+
+        The database is read under the board's lock only; a new board is
+        swapped in under the service lock once it is built.
+        """
+        if year is None or month is None:
+            year, month = self._current_period()
+        key = (city.lower(), year, month)
+        with self._board_lock(key):
+            with self._lock:
+                board = self._boards.get(key)
+            if board is None:
+                board = self._load(*key)
+                with self._lock:
+                    self._boards[key] = board
+            elif not board.closed and time.monotonic() - board.synced_at >= self.sync_interval:
+                try:
+                    self._catch_up(board)
+                except Exception as e:
+                    logger.error(f"Error syncing leaderboard {key}: {str(e)}")
+            return board
+
+    def record_points(self, history, city: str) -> None:
+        """Apply a committed PointHistory record to the matching board.
+
+        Boards that are not loaded yet are skipped: they will read the
+        record from the database when first used. Records already counted
+        (by an earlier sync) are skipped by id.
+        """
+        try:
+            created_at = history.created_at or datetime.utcnow()
+            key = (city.lower(), created_at.year, created_at.month)
+            with self._board_lock(key):
+                with self._lock:
+                    board = self._boards.get(key)
+                if board is None or history.id <= board.last_history_id or history.id in board.applied:
+                    return
+                board.add_points(history.user_id, history.points)
+                board.applied.add(history.id)
+        except Exception as e:
+            logger.error(f"Error updating leaderboard: {str(e)}")
+
+    def get_user_rank(self, user_id: int, city: str) -> Optional[Dict]:
+        board = self.get_board(city)
+        with self._locked(board):
+            rank = board.rank(user_id)
+            if rank is None:
+                return None
+            return {
+                'city': board.city,
+                'points': board.scores[user_id],
+                'rank_position': rank,
+                'total_users': len(board),
+                'month': board.month,
+                'year': board.year
+            }
+
+    def get_top(self, city: str, limit: int = 10) -> List[Dict]:
+        board = self.get_board(city)
+        with self._locked(board):
+            return board.slice(1, limit)
+
+    def get_around(self, user_id: int, city: str, radius: int = 5) -> List[Dict]:
+        board = self.get_board(city)
+        with self._locked(board):
+            position = board.position_of(user_id)
+            if position is None:
+                return []
+            return board.slice(position - radius, position + radius)
+
+    def snapshot_all(self) -> int:
+        """Write every loaded board to disk; returns the number of files written"""
+        with self._lock:
+            boards = list(self._boards.values())
+        snapshots = []
+        for board in boards:
+            with self._locked(board):
+                snapshots.append(board.to_snapshot())
+        if not snapshots:
+            return 0
+
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        for snapshot in snapshots:
+            path = self._snapshot_path(snapshot['city'], snapshot['year'], snapshot['month'])
+            # Every worker process flushes its own boards
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+            with open(tmp_path, 'w', encoding='utf-8') as snapshot_file:
+                json.dump(snapshot, snapshot_file)
+            os.replace(tmp_path, path)
+        return len(snapshots)
+
+    def _is_persist_writer(self) -> bool:
+        """Whether this process writes CityRanking: the first to lock the file keeps it until it exits"""
+        if fcntl is None:
+            return True
+        if self._persist_lock_fd is None:
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            fd = os.open(os.path.join(self.snapshot_dir, 'persist.lock'), os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                os.close(fd)
+                return False
+            self._persist_lock_fd = fd
+        return True
+
+    def persist_all(self) -> int:
+        """Write the live boards back to CityRanking; returns rows written.
+
+        Open boards are synced with PointHistory first, so points committed
+        by the other workers are written too.
+        """
+        now = datetime.utcnow()
+        rows = []
+        with self._lock:
+            boards = list(self._boards.values())
+        for board in boards:
+            with self._locked(board):
+                if not board.closed:
+                    self._catch_up(board)
+                for entry in board.slice(1, len(board)):
+                    rows.append({
+                        'city': board.city,
+                        'user_id': entry['user_id'],
+                        'points': entry['points'],
+                        'rank_position': entry['rank_position'],
+                        'month': board.month,
+                        'year': board.year,
+                        'created_at': now,
+                        'updated_at': now
+                    })
+        try:
+            upsert_city_rankings(rows)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return len(rows)
+
+    def _evict_closed_months(self) -> None:
+        current = self._current_period()
+        with self._lock:
+            for key in [key for key in self._boards if key[1:] < current]:
+                del self._boards[key]
+            for key in [key for key in self._board_locks if key[1:] < current]:
+                del self._board_locks[key]
+
+    def flush(self) -> None:
+        """Snapshot boards, persist them to CityRanking (one worker only) and drop closed months"""
+        self.snapshot_all()
+        if self.persist_rankings and self._is_persist_writer():
+            self.persist_all()
+        self._evict_closed_months()
+
+    def _flush_loop(self) -> None:
+        while True:
+            time.sleep(self.snapshot_interval)
+            try:
+                with self.app.app_context():
+                    self.flush()
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error flushing leaderboards: {str(e)}")
+
+
+# Global leaderboard service instance
+leaderboard_service = LeaderboardService()
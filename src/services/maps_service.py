@@ -5,6 +5,8 @@ from geopy.geocoders import Nominatim
 from geopy.distance import geodesic
 import json
 
+from src.services.deadline_service import DeadlineExceeded
+
 logger = logging.getLogger(__name__)
 
 class MapsService:
@@ -178,6 +180,8 @@ class MapsService:
             
             return heatmap_data
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting heatmap data: {str(e)}")
             return []
@@ -214,6 +218,8 @@ class MapsService:
                 'bounds': self.default_city_bounds.get(city, {}).get('bounds', {})
             }
             
+        except DeadlineExceeded:
+            raise
         except Exception as e:
             logger.error(f"Error getting city statistics: {str(e)}")
             return {
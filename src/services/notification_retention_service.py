@@ -0,0 +1,212 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, exists, insert, not_, select, text
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+# Days a read notification is kept, per type; types not listed use NOTIFICATION_RETENTION_DAYS
+DEFAULT_RETENTION_TTLS = {
+    'welcome': 30,
+    'monthly_report': 90,
+    'complaint_voted': 60
+}
+
+
+class NotificationRetentionService:
+    """Removes read notifications past their retention period.
+
+    Each type has its own TTL (``None`` keeps that type forever). Expired rows
+    are moved to ``notification_archive`` with their content compressed, or
+    deleted, in small batches with one short transaction each, so SQLite
+    writers are never blocked for long. Unread notifications and
+    notifications with deliveries still in the outbox are never touched.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.batch_size = 500
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize notification retention service with Flask app"""
+        self.app = app
+        self.default_days = app.config.get('NOTIFICATION_RETENTION_DAYS', 180)
+        self.ttls = {**DEFAULT_RETENTION_TTLS, **app.config.get('NOTIFICATION_RETENTION_TTLS', {})}
+        self.mode = app.config.get('NOTIFICATION_RETENTION_MODE', 'archive')  # 'archive' or 'delete'
+        self.batch_size = app.config.get('NOTIFICATION_RETENTION_BATCH_SIZE', 500)
+        self.batch_pause = app.config.get('NOTIFICATION_RETENTION_BATCH_PAUSE', 0.05)
+
+    def _rules(self, now: datetime) -> List[Tuple[str, object, datetime]]:
+        """(label, type condition, cutoff) for every type with a finite TTL"""
+        from src.models.notification import Notification
+
+        rules = []
+        for notification_type, days in sorted(self.ttls.items()):
+            if days is not None:
+                rules.append((notification_type, Notification.type == notification_type,
+                              now - timedelta(days=days)))
+        if self.default_days is not None:
+            rules.append(('*', not_(Notification.type.in_(list(self.ttls))),
+                          now - timedelta(days=self.default_days)))
+        return rules
+
+    def _expired_batch(self, type_condition, cutoff: datetime) -> List:
+        from src.models.notification import Notification, NotificationDelivery as Delivery
+
+        in_outbox = exists().where(and_(
+            Delivery.notification_id == Notification.id,
+            Delivery.status.in_(['pending', 'sending'])
+        ))
+        return db.session.execute(
+            select(
+                Notification.id, Notification.user_id, Notification.complaint_id, Notification.type,
+                Notification.title, Notification.message, Notification.template_key,
+                Notification.template_params, Notification.sent_email,
+                Notification.sent_whatsapp, Notification.created_at, Notification.read_at
+            ).where(
+                type_condition,
+                Notification.is_read == True,
+                Notification.created_at < cutoff,
+                ~in_outbox
+            ).order_by(Notification.id).limit(self.batch_size)
+        ).all()
+
+    def _remove_batch(self, rows: List, archive: bool) -> Tuple[int, int]:
+        """Archive or delete one batch in its own transaction; returns (raw bytes, archived bytes)"""
+        from src.models.notification import Notification, NotificationArchive, NotificationDelivery
+
+        ids = [row.id for row in rows]
+        raw_bytes = sum(
+            len(row.title.encode('utf-8')) + len(row.message.encode('utf-8'))
+            + len((row.template_params or '').encode('utf-8'))
+            for row in rows
+        )
+        archived_bytes = 0
+        now = datetime.utcnow()
+        try:
+            if archive:
+                archived = []
+                for row in rows:
+                    payload = NotificationArchive.pack({
+                        'complaint_id': row.complaint_id,
+                        'title': row.title,
+                        'message': row.message,
+                        'template_key': row.template_key,
+                        'template_params': row.template_params,
+                        'sent_email': row.sent_email,
+                        'sent_whatsapp': row.sent_whatsapp
+                    })
+                    archived_bytes += len(payload)
+                    archived.append({
+                        'id': row.id,
+                        'user_id': row.user_id,
+                        'type': row.type,
+                        'created_at': row.created_at,
+                        'read_at': row.read_at,
+                        'archived_at': now,
+                        'payload': payload
+                    })
+                db.session.execute(insert(NotificationArchive), archived)
+            db.session.execute(delete(NotificationDelivery).where(NotificationDelivery.notification_id.in_(ids)))
+            db.session.execute(delete(Notification).where(Notification.id.in_(ids)))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return raw_bytes, archived_bytes
+
+    def _storage(self) -> Optional[Dict]:
+        """Database size and free space, when the backend reports them"""
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            page_size = db.session.execute(text('PRAGMA page_size')).scalar()
+            page_count = db.session.execute(text('PRAGMA page_count')).scalar()
+            free_pages = db.session.execute(text('PRAGMA freelist_count')).scalar()
+            return {'database_bytes': page_size * page_count, 'free_bytes': page_size * free_pages}
+        if dialect == 'postgresql':
+            return {
+                'database_bytes': db.session.execute(text('SELECT pg_database_size(current_database())')).scalar(),
+                'notification_table_bytes': db.session.execute(
+                    text("SELECT pg_total_relation_size('notification')")
+                ).scalar()
+            }
+        return None
+
+    def _vacuum(self) -> None:
+        """Give freed pages back to the filesystem (takes an exclusive lock on SQLite)"""
+        db.session.remove()
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.execute(text('VACUUM'))
+
+    def apply(self, mode: Optional[str] = None, vacuum: bool = False,
+              max_batches: Optional[int] = None) -> Dict:
+        """Run the retention policy once and report what was removed and the space reclaimed"""
+        mode = mode or self.mode
+        if mode not in ('archive', 'delete'):
+            raise ValueError(f"Unknown notification retention mode {mode}")
+
+        started = time.perf_counter()
+        storage_before = self._storage()
+        db.session.commit()
+
+        by_type: Dict[str, int] = {}
+        raw_bytes = archived_bytes = batches = 0
+        for label, type_condition, cutoff in self._rules(datetime.utcnow()):
+            while max_batches is None or batches < max_batches:
+                rows = self._expired_batch(type_condition, cutoff)
+                if not rows:
+                    break
+                batch_raw, batch_archived = self._remove_batch(rows, archive=mode == 'archive')
+                raw_bytes += batch_raw
+                archived_bytes += batch_archived
+                batches += 1
+                for row in rows:
+                    by_type[row.type] = by_type.get(row.type, 0) + 1
+                if self.batch_pause:
+                    # Let request writers take the database lock between batches
+                    time.sleep(self.batch_pause)
+
+        if vacuum and sum(by_type.values()):
+            self._vacuum()
+        storage_after = self._storage()
+
+        removed = sum(by_type.values())
+        report = {
+            'mode': mode,
+            'removed': removed,
+            'by_type': by_type,
+            'batches': batches,
+            'content_bytes_removed': raw_bytes,
+            'archive_bytes_written': archived_bytes,
+            'compression_ratio': round(raw_bytes / archived_bytes, 2) if archived_bytes else None,
+            'storage_before': storage_before,
+            'storage_after': storage_after,
+            'vacuumed': bool(vacuum and removed),
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 1)
+        }
+        if storage_before and storage_after:
+            report['reclaimed_bytes'] = storage_before['database_bytes'] - storage_after['database_bytes']
+            if 'free_bytes' in storage_after:
+                report['reusable_bytes'] = storage_after['free_bytes']
+
+        logger.info(f"Notification retention ({mode}) removed {removed} rows in {batches} batches")
+        return report
+
+    def get_user_archive(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Dict]:
+        """Archived notifications of a user, newest first"""
+        from src.models.notification import NotificationArchive
+
+        archived = NotificationArchive.query.filter_by(user_id=user_id).order_by(
+            NotificationArchive.created_at.desc()
+        ).offset(offset).limit(limit).all()
+        return [notification.to_dict() for notification in archived]
+
+
+# Global notification retention service instance
+notification_retention_service = NotificationRetentionService()
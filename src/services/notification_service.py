@@ -1,23 +1,112 @@
 import smtplib
 import requests
 import logging
+import re
+import threading
+import uuid
+from collections import OrderedDict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 from typing import Dict, List, Optional
+from sqlalchemy import func, select
 from src.database import db
 from src.models.notification import Notification
+from src.services.broadcast_service import broadcast_service
+from src.services.channel_transport import HTTPTransport, SMTPConnectionPool
+from src.services.delivery_service import delivery_service
+from src.services.notification_templates import (
+    COMPLAINT_TEMPLATES, SYSTEM_TEMPLATES, RenderedNotification, template_registry
+)
+from src.services.unread_counter_service import unread_counter_service
 
 logger = logging.getLogger(__name__)
 
+# User fields read by _generate_system_notification_content; bulk sends render
+# each template once per distinct combination of these values
+SYSTEM_TEMPLATE_USER_FIELDS = ('full_name',)
+
+# User fields read by the supporter templates (see queue_complaint_notifications)
+SUPPORTER_TEMPLATE_USER_FIELDS = ('full_name',)
+
+# Dates as formatted by the templates, e.g. '05/03/2025 às 14:30'
+RENDERED_DATE = re.compile(r'\d{2}/\d{2}/\d{4} às \d{2}:\d{2}')
+
+
+class BulkNotificationJob:
+    """Progress handle of a bulk notification send running in the background"""
+
+    def __init__(self, notification_type: str, total: int):
+        self.id = uuid.uuid4().hex
+        self.notification_type = notification_type
+        self.total = total
+        self.processed = 0
+        self.created = 0
+        self.emails_queued = 0
+        self.whatsapp_queued = 0
+        self.failed = 0
+        self.status = 'pending'
+        self.error = None
+        self.started_at = datetime.utcnow()
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def add_chunk(self, processed: int, created: int, emails_queued: int, whatsapp_queued: int, failed: int) -> None:
+        with self._lock:
+            self.processed += processed
+            self.created += created
+            self.emails_queued += emails_queued
+            self.whatsapp_queued += whatsapp_queued
+            self.failed += failed
+
+    def finish(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.status = 'failed' if error else 'completed'
+            self.error = error
+            self.finished_at = datetime.utcnow()
+        self._done.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                'id': self.id,
+                'type': self.notification_type,
+                'status': self.status,
+                'total': self.total,
+                'processed': self.processed,
+                'created': self.created,
+                'emails_queued': self.emails_queued,
+                'whatsapp_queued': self.whatsapp_queued,
+                'failed': self.failed,
+                'progress': round(self.processed / self.total * 100, 2) if self.total else 100.0,
+                'error': self.error,
+                'started_at': self.started_at.isoformat(),
+                'finished_at': self.finished_at.isoformat() if self.finished_at else None
+            }
+
+
 class NotificationService:
     def __init__(self, app=None):
         self.app = app
+        self._bulk_jobs: 'OrderedDict[str, BulkNotificationJob]' = OrderedDict()
+        self._bulk_lock = threading.Lock()
+        self._mime_parts: 'OrderedDict[tuple, MIMEText]' = OrderedDict()
+        self._mime_lock = threading.Lock()
+        self.mime_cache_size = 1024
         if app:
             self.init_app(app)
     
     def init_app(self, app):
         """Initialize notification service with Flask app"""
+        self.app = app
+        self.bulk_chunk_size = app.config.get('NOTIFICATION_BULK_CHUNK_SIZE', 500)
+        self.bulk_jobs_kept = app.config.get('NOTIFICATION_BULK_JOBS_KEPT', 100)
+        self.mime_cache_size = app.config.get('NOTIFICATION_MIME_CACHE_SIZE', 1024)
+        template_registry.stored_cache_size = app.config.get('NOTIFICATION_RENDER_CACHE_SIZE', 20000)
         self.smtp_server = app.config.get('SMTP_SERVER', 'smtp.gmail.com')
         self.smtp_port = app.config.get('SMTP_PORT', 587)
         self.smtp_username = app.config.get('SMTP_USERNAME', '')
@@ -28,325 +117,418 @@ class NotificationService:
         self.whatsapp_api_url = app.config.get('WHATSAPP_API_URL', 'https://api.whatsapp.mock.com')
         self.whatsapp_token = app.config.get('WHATSAPP_TOKEN', 'demo_token')
         
+        # 'log' only logs messages (demo); 'live' talks to the SMTP server and WhatsApp API
+        self.delivery_mode = app.config.get('NOTIFICATION_DELIVERY_MODE', 'log')
+        self.smtp_use_tls = app.config.get('SMTP_USE_TLS', True)
+        self.smtp_timeout = app.config.get('SMTP_TIMEOUT', 10)
+        
+        # Pooled channel transports (connections are opened on first use)
+        self.email_transport = SMTPConnectionPool(
+            self.smtp_server, self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            use_tls=self.smtp_use_tls,
+            timeout=self.smtp_timeout,
+            max_size=app.config.get('SMTP_POOL_SIZE', 4),
+            max_idle_seconds=app.config.get('SMTP_POOL_MAX_IDLE', 30),
+            max_messages_per_connection=app.config.get('SMTP_MAX_MESSAGES_PER_CONNECTION', 100)
+        )
+        self.whatsapp_transport = HTTPTransport(
+            self.whatsapp_api_url,
+            name='whatsapp',
+            pool_size=app.config.get('WHATSAPP_POOL_SIZE', 10),
+            timeout=app.config.get('WHATSAPP_TIMEOUT', 10)
+        )
+        
+    def _mime_part(self, body: str, subtype: str) -> MIMEText:
+        """Encoded MIME body part, shared by every message with the same content"""
+        key = (subtype, body)
+        with self._mime_lock:
+            part = self._mime_parts.get(key)
+            if part is not None:
+                self._mime_parts.move_to_end(key)
+                return part
+        
+        part = MIMEText(body, subtype, 'utf-8')
+        if self.mime_cache_size:
+            with self._mime_lock:
+                self._mime_parts[key] = part
+                while len(self._mime_parts) > self.mime_cache_size:
+                    self._mime_parts.popitem(last=False)
+        return part
+    
+    def _build_email(self, to_email: str, subject: str, body: str, html_body: str = None) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        
+        # Add plain text part
+        msg.attach(self._mime_part(body, 'plain'))
+        
+        # Add HTML part if provided
+        if html_body:
+            msg.attach(self._mime_part(html_body, 'html'))
+        
+        return msg
+    
+    def deliver_emails(self, messages: List[tuple]) -> List[Optional[str]]:
+        """Send (to_email, subject, body) messages over one pooled SMTP connection.
+
+        Returns one entry per message: ``None`` on success or the error text.
+        """
+        if self.delivery_mode != 'live':
+            for to_email, subject, body in messages:
+                # For demo purposes, we'll just log the email instead of actually sending
+                logger.info(f"EMAIL SENT TO: {to_email}")
+                logger.info(f"SUBJECT: {subject}")
+                logger.info(f"BODY: {body}")
+            return [None] * len(messages)
+        
+        return self.email_transport.send_messages([
+            self._build_email(to_email, subject, body) for to_email, subject, body in messages
+        ])
+    
+    def deliver_email(self, to_email: str, subject: str, body: str, html_body: str = None) -> None:
+        """Send an email, raising on failure"""
+        if self.delivery_mode != 'live' or not html_body:
+            error = self.deliver_emails([(to_email, subject, body)])[0]
+            if error:
+                raise smtplib.SMTPException(error)
+            return
+        
+        self.email_transport.send_message(self._build_email(to_email, subject, body, html_body))
+    
     def send_email(self, to_email: str, subject: str, body: str, html_body: str = None) -> bool:
         """Send email notification"""
         try:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-            
-            # Add plain text part
-            text_part = MIMEText(body, 'plain', 'utf-8')
-            msg.attach(text_part)
-            
-            # Add HTML part if provided
-            if html_body:
-                html_part = MIMEText(html_body, 'html', 'utf-8')
-                msg.attach(html_part)
-            
-            # For demo purposes, we'll just log the email instead of actually sending
-            logger.info(f"EMAIL SENT TO: {to_email}")
-            logger.info(f"SUBJECT: {subject}")
-            logger.info(f"BODY: {body}")
-            
-            # In production, uncomment this to actually send emails:
-            # with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-            #     server.starttls()
-            #     server.login(self.smtp_username, self.smtp_password)
-            #     server.send_message(msg)
-            
+            self.deliver_email(to_email, subject, body, html_body)
             return True
             
         except Exception as e:
             logger.error(f"Error sending email to {to_email}: {str(e)}")
             return False
     
+    def _whatsapp_payload(self, phone_number: str, message: str) -> Dict:
+        # Format phone number (remove non-digits and add country code if needed)
+        phone = ''.join(filter(str.isdigit, phone_number))
+        if not phone.startswith('55'):
+            phone = '55' + phone
+        
+        return {
+            'phone': phone,
+            'message': message,
+            'token': self.whatsapp_token
+        }
+    
+    def deliver_whatsapp_messages(self, messages: List[tuple]) -> List[Optional[str]]:
+        """Send (phone_number, message) pairs over the keep-alive HTTP pool.
+
+        Returns one entry per message: ``None`` on success or the error text.
+        """
+        payloads = [self._whatsapp_payload(phone_number, message) for phone_number, message in messages]
+        if self.delivery_mode != 'live':
+            for payload in payloads:
+                # For demo purposes, we'll just log the WhatsApp message
+                logger.info(f"WHATSAPP SENT TO: +{payload['phone']}")
+                logger.info(f"MESSAGE: {payload['message']}")
+            return [None] * len(payloads)
+        
+        return self.whatsapp_transport.post_many(payloads)
+    
+    def deliver_whatsapp(self, phone_number: str, message: str) -> None:
+        """Send a WhatsApp message, raising on failure"""
+        error = self.deliver_whatsapp_messages([(phone_number, message)])[0]
+        if error:
+            raise RuntimeError(f"WhatsApp {error}")
+    
     def send_whatsapp(self, phone_number: str, message: str) -> bool:
         """Send WhatsApp notification"""
         try:
-            # Format phone number (remove non-digits and add country code if needed)
-            phone = ''.join(filter(str.isdigit, phone_number))
-            if not phone.startswith('55'):
-                phone = '55' + phone
-            
-            # For demo purposes, we'll just log the WhatsApp message
-            logger.info(f"WHATSAPP SENT TO: +{phone}")
-            logger.info(f"MESSAGE: {message}")
-            
-            # In production, uncomment this to actually send WhatsApp messages:
-            # payload = {
-            #     'phone': phone,
-            #     'message': message,
-            #     'token': self.whatsapp_token
-            # }
-            # response = requests.post(self.whatsapp_api_url, json=payload, timeout=10)
-            # return response.status_code == 200
-            
+            self.deliver_whatsapp(phone_number, message)
             return True
             
         except Exception as e:
             logger.error(f"Error sending WhatsApp to {phone_number}: {str(e)}")
             return False
     
+    def get_transport_stats(self) -> Dict:
+        """Latency and connection counters of the channel transports"""
+        return {
+            'email': self.email_transport.stats.to_dict(),
+            'whatsapp': self.whatsapp_transport.stats.to_dict()
+        }
+    
+    def queue_complaint_notification(self, user_id: int, complaint_id: int, notification_type: str,
+                                     extra_data: Dict = None) -> Optional[Notification]:
+        """Add a complaint notification and its pending deliveries to the current transaction.
+
+        The caller commits; email and WhatsApp are sent afterwards by the
+        delivery workers.
+        """
+        from src.models.user import User
+        from src.models.complaint import Complaint
+        
+        user = User.query.get(user_id)
+        complaint = Complaint.query.get(complaint_id)
+        
+        if not user or not complaint:
+            logger.error(f"User {user_id} or complaint {complaint_id} not found")
+            return None
+        
+        # Generate notification content based on type
+        content = self._generate_notification_content(notification_type, user, complaint, extra_data)
+        
+        notification = Notification(
+            user_id=user_id,
+            complaint_id=complaint_id,
+            type=notification_type,
+            title=content.subject,
+            message='',
+            template_key=content.template_key,
+            template_params=content.stored_params()
+        )
+        db.session.add(notification)
+        unread_counter_service.increment(user_id)
+        delivery_service.enqueue(notification, user, content)
+        return notification
+    
+    def queue_complaint_notifications(self, complaint_id: int, notification_type: str,
+                                      extra_data: Dict = None) -> int:
+        """Notify a complaint's author and every active user who voted on it, in the current transaction.
+
+        Recipients come from one query over ``votes``; notifications and
+        their outbox deliveries are flushed in chunks of
+        ``bulk_chunk_size``. The author gets the complaint template,
+        supporters the matching supporter template. The caller commits.
+        Returns the number of notifications added.
+        """
+        from src.models.user import User
+        from src.models.complaint import Complaint, Vote
+
+        complaint = Complaint.query.get(complaint_id)
+        if not complaint:
+            logger.error(f"Complaint {complaint_id} not found")
+            return 0
+
+        voters = select(Vote.user_id).where(Vote.complaint_id == complaint_id)
+        recipients = db.session.query(
+            User.id, User.full_name, User.email, User.phone,
+            User.email_notifications, User.whatsapp_notifications
+        ).filter(
+            (User.id == complaint.user_id) | ((User.is_active == True) & User.id.in_(voters))
+        ).order_by(User.id).all()
+
+        now = datetime.now()
+        rendered = {}
+        for start in range(0, len(recipients), self.bulk_chunk_size):
+            items = []
+            for user in recipients[start:start + self.bulk_chunk_size]:
+                if user.id == complaint.user_id:
+                    key = ('complaint',)
+                else:
+                    key = ('supporter',) + tuple(getattr(user, field) for field in SUPPORTER_TEMPLATE_USER_FIELDS)
+                content = rendered.get(key)
+                if content is None:
+                    content = rendered[key] = template_registry.render_all(
+                        key[0], notification_type, now=now, user=user, complaint=complaint, extra=extra_data or {}
+                    )
+                notification = Notification(
+                    user_id=user.id,
+                    complaint_id=complaint_id,
+                    type=notification_type,
+                    title=content.subject,
+                    message='',
+                    template_key=content.template_key,
+                    template_params=content.stored_params()
+                )
+                items.append((notification, user, content))
+            db.session.add_all([notification for notification, _, _ in items])
+            delivery_service.enqueue_many(items)
+            unread_counter_service.add_notifications(user.id for _, user, _ in items)
+            db.session.flush()
+        return len(recipients)
+
     def send_complaint_notification(self, user_id: int, complaint_id: int, notification_type: str, 
                                   extra_data: Dict = None) -> bool:
         """Send notification about complaint status change"""
         try:
-            from src.models.user import User
-            from src.models.complaint import Complaint
-            
-            user = User.query.get(user_id)
-            complaint = Complaint.query.get(complaint_id)
-            
-            if not user or not complaint:
-                logger.error(f"User {user_id} or complaint {complaint_id} not found")
+            notification = self.queue_complaint_notification(user_id, complaint_id, notification_type, extra_data)
+            if notification is None:
                 return False
             
-            # Generate notification content based on type
-            subject, email_body, whatsapp_message = self._generate_notification_content(
-                notification_type, user, complaint, extra_data
-            )
-            
-            # Send email if user has email notifications enabled
-            email_sent = False
-            if user.email_notifications and user.email:
-                email_sent = self.send_email(user.email, subject, email_body)
-            
-            # Send WhatsApp if user has WhatsApp notifications enabled
-            whatsapp_sent = False
-            if user.whatsapp_notifications and user.phone:
-                whatsapp_sent = self.send_whatsapp(user.phone, whatsapp_message)
-            
-            # Save notification to database
-            notification = Notification(
-                user_id=user_id,
-                complaint_id=complaint_id,
-                type=notification_type,
-                title=subject,
-                message=email_body,
-                email_sent=email_sent,
-                whatsapp_sent=whatsapp_sent,
-                extra_data=extra_data or {}
-            )
-            
-            db.session.add(notification)
             db.session.commit()
-            
-            return email_sent or whatsapp_sent
+            return True
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error sending complaint notification: {str(e)}")
             return False
     
-    def _generate_notification_content(self, notification_type: str, user, complaint, extra_data: Dict = None):
-        """Generate notification content based on type"""
-        extra_data = extra_data or {}
-        
-        templates = {
-            'complaint_created': {
-                'subject': f'Reclamação #{complaint.id} registrada com sucesso',
-                'email_body': f'''Olá {user.full_name},
-
-Sua reclamação foi registrada com sucesso no sistema deuruimcidadao!
-
-Detalhes da reclamação:
-- ID: #{complaint.id}
-- Título: {complaint.title}
-- Categoria: {complaint.category}
-- Status: {complaint.status}
-- Data: {complaint.created_at.strftime('%d/%m/%Y às %H:%M')}
-
-Você receberá atualizações sobre o andamento da sua reclamação.
-
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'🏛️ *deuruimcidadao*\n\nSua reclamação #{complaint.id} foi registrada!\n\n📋 *{complaint.title}*\n📍 {complaint.location}\n⏰ Status: {complaint.status}\n\nVocê receberá atualizações sobre o andamento.'
-            },
-            
-            'status_updated': {
-                'subject': f'Reclamação #{complaint.id} - Status atualizado',
-                'email_body': f'''Olá {user.full_name},
-
-Sua reclamação teve o status atualizado!
-
-Detalhes:
-- ID: #{complaint.id}
-- Título: {complaint.title}
-- Novo Status: {complaint.status}
-- Data da atualização: {datetime.now().strftime('%d/%m/%Y às %H:%M')}
-
-{extra_data.get('admin_message', '')}
-
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'🏛️ *deuruimcidadao*\n\n📢 Atualização da reclamação #{complaint.id}\n\n📋 *{complaint.title}*\n🔄 Novo status: *{complaint.status}*\n\n{extra_data.get("admin_message", "")}'
-            },
-            
-            'complaint_resolved': {
-                'subject': f'Reclamação #{complaint.id} foi resolvida!',
-                'email_body': f'''Olá {user.full_name},
+    def _generate_notification_content(self, notification_type: str, user, complaint,
+                                       extra_data: Dict = None) -> RenderedNotification:
+        """Generate notification content based on type (parts render on first use)"""
+        return template_registry.render_all(
+            'complaint', notification_type, user=user, complaint=complaint, extra=extra_data or {}
+        )
+    
+    def send_bulk_notifications(self, user_ids: List[int], notification_type: str, 
+                              extra_data: Dict = None) -> BulkNotificationJob:
+        """Send a system notification to many users in the background.
 
-Temos uma ótima notícia! Sua reclamação foi resolvida.
+        Returns a progress handle right away; see ``get_bulk_job``.
+        """
+        user_ids = list(dict.fromkeys(user_ids))
+        job = BulkNotificationJob(notification_type, len(user_ids))
+        with self._bulk_lock:
+            self._bulk_jobs[job.id] = job
+            while len(self._bulk_jobs) > self.bulk_jobs_kept:
+                self._bulk_jobs.popitem(last=False)
 
-Detalhes:
-- ID: #{complaint.id}
-- Título: {complaint.title}
-- Status: Resolvida
-- Data da resolução: {datetime.now().strftime('%d/%m/%Y às %H:%M')}
+        thread = threading.Thread(
+            target=self._run_bulk_job,
+            args=(job, user_ids, notification_type, extra_data or {}),
+            name=f'bulk-notification-{job.id[:8]}',
+            daemon=True
+        )
+        thread.start()
+        return job
 
-{extra_data.get('resolution_message', '')}
+    def get_bulk_job(self, job_id: str) -> Optional[BulkNotificationJob]:
+        with self._bulk_lock:
+            return self._bulk_jobs.get(job_id)
 
-Por favor, avalie o atendimento recebido acessando sua conta no deuruimcidadao.
+    def _run_bulk_job(self, job: BulkNotificationJob, user_ids: List[int], notification_type: str,
+                      extra_data: Dict) -> None:
+        job.status = 'running'
+        rendered = {}
+        try:
+            with self.app.app_context():
+                for start in range(0, len(user_ids), self.bulk_chunk_size):
+                    chunk = user_ids[start:start + self.bulk_chunk_size]
+                    self._send_bulk_chunk(job, chunk, notification_type, extra_data, rendered)
+                db.session.remove()
+            job.finish()
+        except Exception as e:
+            logger.error(f"Error running bulk notification job {job.id}: {str(e)}")
+            job.finish(str(e))
+        logger.info(f"Bulk notification job {job.id} finished: {job.to_dict()}")
 
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'🎉 *deuruimcidadao*\n\n✅ Sua reclamação #{complaint.id} foi RESOLVIDA!\n\n📋 *{complaint.title}*\n📍 {complaint.location}\n\nPor favor, avalie o atendimento no app!'
-            },
-            
-            'new_response': {
-                'subject': f'Nova resposta na reclamação #{complaint.id}',
-                'email_body': f'''Olá {user.full_name},
+    def _send_bulk_chunk(self, job: BulkNotificationJob, user_ids: List[int], notification_type: str,
+                         extra_data: Dict, rendered: Dict) -> None:
+        """Load, render and store one chunk of recipients with their outbox deliveries.
 
-Você recebeu uma nova resposta na sua reclamação.
+        Notifications and deliveries commit together; the delivery workers
+        send the emails and WhatsApp messages afterwards, with retries.
+        """
+        from src.models.user import User
 
-Detalhes:
-- ID: #{complaint.id}
-- Título: {complaint.title}
-- Resposta de: {extra_data.get('responder_name', 'Administração')}
-- Data: {datetime.now().strftime('%d/%m/%Y às %H:%M')}
+        recipients = db.session.query(
+            User.id, User.full_name, User.email, User.phone,
+            User.email_notifications, User.whatsapp_notifications
+        ).filter(User.id.in_(user_ids), User.is_active == True).all()
 
-Resposta:
-{extra_data.get('response_message', '')}
+        items = []
+        for user in recipients:
+            key = tuple(getattr(user, field) for field in SYSTEM_TEMPLATE_USER_FIELDS)
+            content = rendered.get(key)
+            if content is None:
+                content = rendered[key] = self._generate_system_notification_content(
+                    notification_type, user, extra_data
+                )
+            notification = Notification(
+                user_id=user.id,
+                type=notification_type,
+                title=content.subject,
+                message='',
+                template_key=content.template_key,
+                template_params=content.stored_params()
+            )
+            items.append((notification, user, content))
 
-Acesse sua conta para ver mais detalhes.
+        channels = []
+        try:
+            if items:
+                db.session.add_all([notification for notification, _, _ in items])
+                channels = [delivery.channel for delivery in delivery_service.enqueue_many(items)]
+                unread_counter_service.add_notifications(user.id for _, user, _ in items)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error storing bulk notifications: {str(e)}")
+            job.add_chunk(len(user_ids), 0, 0, 0, len(user_ids))
+            return
 
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'💬 *deuruimcidadao*\n\nNova resposta na reclamação #{complaint.id}\n\n📋 *{complaint.title}*\n👤 {extra_data.get("responder_name", "Administração")}\n\n"{extra_data.get("response_message", "")[:100]}..."\n\nVeja mais no app!'
-            }
-        }
-        
-        template = templates.get(notification_type, templates['complaint_created'])
-        return template['subject'], template['email_body'], template['whatsapp']
+        job.add_chunk(
+            processed=len(user_ids),
+            created=len(items),
+            emails_queued=channels.count('email'),
+            whatsapp_queued=channels.count('whatsapp'),
+            failed=len(user_ids) - len(items)
+        )
     
-    def send_bulk_notifications(self, user_ids: List[int], notification_type: str, 
-                              extra_data: Dict = None) -> Dict[str, int]:
-        """Send bulk notifications to multiple users"""
-        results = {'sent': 0, 'failed': 0}
+    def queue_system_notification(self, user_id: int, notification_type: str,
+                                  extra_data: Dict = None) -> Optional[Notification]:
+        """Add a system notification and its pending deliveries to the current transaction"""
+        from src.models.user import User
         
-        for user_id in user_ids:
-            try:
-                success = self.send_system_notification(user_id, notification_type, extra_data)
-                if success:
-                    results['sent'] += 1
-                else:
-                    results['failed'] += 1
-            except Exception as e:
-                logger.error(f"Error sending bulk notification to user {user_id}: {str(e)}")
-                results['failed'] += 1
+        user = User.query.get(user_id)
+        if not user:
+            return None
+        
+        # Generate system notification content
+        content = self._generate_system_notification_content(notification_type, user, extra_data)
         
-        return results
+        notification = Notification(
+            user_id=user_id,
+            type=notification_type,
+            title=content.subject,
+            message='',
+            template_key=content.template_key,
+            template_params=content.stored_params()
+        )
+        db.session.add(notification)
+        unread_counter_service.increment(user_id)
+        delivery_service.enqueue(notification, user, content)
+        return notification
     
     def send_system_notification(self, user_id: int, notification_type: str, 
                                extra_data: Dict = None) -> bool:
         """Send system-wide notification (not related to specific complaint)"""
         try:
-            from src.models.user import User
-            
-            user = User.query.get(user_id)
-            if not user:
+            notification = self.queue_system_notification(user_id, notification_type, extra_data)
+            if notification is None:
                 return False
             
-            # Generate system notification content
-            subject, email_body, whatsapp_message = self._generate_system_notification_content(
-                notification_type, user, extra_data
-            )
-            
-            # Send notifications
-            email_sent = False
-            if user.email_notifications and user.email:
-                email_sent = self.send_email(user.email, subject, email_body)
-            
-            whatsapp_sent = False
-            if user.whatsapp_notifications and user.phone:
-                whatsapp_sent = self.send_whatsapp(user.phone, whatsapp_message)
-            
-            # Save to database
-            notification = Notification(
-                user_id=user_id,
-                type=notification_type,
-                title=subject,
-                message=email_body,
-                email_sent=email_sent,
-                whatsapp_sent=whatsapp_sent,
-                extra_data=extra_data or {}
-            )
-            
-            db.session.add(notification)
             db.session.commit()
-            
-            return email_sent or whatsapp_sent
+            return True
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error sending system notification: {str(e)}")
             return False
     
-    def _generate_system_notification_content(self, notification_type: str, user, extra_data: Dict = None):
-        """Generate system notification content"""
-        extra_data = extra_data or {}
-        
-        templates = {
-            'welcome': {
-                'subject': 'Bem-vindo ao deuruimcidadao!',
-                'email_body': f'''Olá {user.full_name},
-
-Bem-vindo ao deuruimcidadao - a plataforma que conecta você à sua cidade!
-
-Com o deuruimcidadao você pode:
-- Registrar reclamações sobre problemas urbanos
-- Acompanhar o andamento das suas solicitações
-- Votar em reclamações de outros cidadãos
-- Contribuir para uma cidade melhor
-
-Sua voz importa! Juntos podemos fazer a diferença.
-
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'🏛️ *Bem-vindo ao deuruimcidadao!*\n\nOlá {user.full_name}! 👋\n\nAgora você pode registrar reclamações, acompanhar soluções e contribuir para uma cidade melhor!\n\nSua voz importa! 🗣️'
-            },
-            
-            'monthly_report': {
-                'subject': 'Relatório mensal - deuruimcidadao',
-                'email_body': f'''Olá {user.full_name},
-
-Aqui está o resumo das suas atividades no último mês:
-
-- Reclamações registradas: {extra_data.get('complaints_count', 0)}
-- Votos dados: {extra_data.get('votes_count', 0)}
-- Reclamações resolvidas: {extra_data.get('resolved_count', 0)}
-- Pontos XP ganhos: {extra_data.get('xp_gained', 0)}
-
-Continue contribuindo para uma cidade melhor!
-
-Atenciosamente,
-Equipe deuruimcidadao''',
-                'whatsapp': f'📊 *Relatório Mensal*\n\n{user.full_name}, veja suas atividades:\n\n📝 {extra_data.get("complaints_count", 0)} reclamações\n👍 {extra_data.get("votes_count", 0)} votos\n✅ {extra_data.get("resolved_count", 0)} resolvidas\n⭐ {extra_data.get("xp_gained", 0)} XP\n\nContinue contribuindo! 🏆'
-            }
-        }
-        
-        template = templates.get(notification_type, templates['welcome'])
-        return template['subject'], template['email_body'], template['whatsapp']
+    def _generate_system_notification_content(self, notification_type: str, user,
+                                              extra_data: Dict = None) -> RenderedNotification:
+        """Generate system notification content (parts render on first use)"""
+        return template_registry.render_all('system', notification_type, user=user, extra=extra_data or {})
     
-    def get_user_notifications(self, user_id: int, limit: int = 20, offset: int = 0) -> List[Dict]:
-        """Get notifications for a user"""
-        notifications = Notification.query.filter_by(user_id=user_id)\
-                                        .order_by(Notification.created_at.desc())\
-                                        .limit(limit)\
-                                        .offset(offset)\
-                                        .all()
+    def get_user_notifications(self, user_id: int, limit: int = 20, offset: int = 0,
+                               unread_only: bool = False) -> List[Dict]:
+        """Get notifications for a user, personal ones merged with broadcasts, newest first"""
+        query = Notification.query.filter_by(user_id=user_id)
+        if unread_only:
+            query = query.filter_by(is_read=False)
         
-        return [notification.to_dict() for notification in notifications]
+        # Enough personal rows to fill the page once the broadcasts are merged in
+        notifications = query.order_by(Notification.created_at.desc())\
+                             .limit(limit + offset)\
+                             .all()
+        
+        merged = [notification.to_dict() for notification in notifications]
+        merged.extend(broadcast_service.for_user(user_id, unread_only=unread_only))
+        merged.sort(key=lambda notification: notification['created_at'] or '', reverse=True)
+        return merged[offset:offset + limit]
     
     def mark_notification_as_read(self, notification_id: int, user_id: int) -> bool:
         """Mark notification as read"""
@@ -357,20 +539,145 @@ Equipe deuruimcidadao''',
             ).first()
             
             if notification:
-                notification.read = True
-                notification.read_at = datetime.utcnow()
-                db.session.commit()
+                notification.mark_as_read()
                 return True
             
             return False
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error marking notification as read: {str(e)}")
             return False
     
+    def mark_all_as_read(self, user_id: int) -> int:
+        """Mark every unread notification of a user as read; returns how many changed"""
+        try:
+            updated = Notification.query.filter_by(
+                user_id=user_id,
+                is_read=False
+            ).update({
+                'is_read': True,
+                'read_at': datetime.utcnow()
+            }, synchronize_session=False)
+            unread_counter_service.increment(user_id, -updated)
+            db.session.commit()
+            
+        except Exception:
+            db.session.rollback()
+            raise
+        
+        return updated + broadcast_service.mark_as_read(user_id)
+    
+    def _stored_form(self, notification, users: Dict, complaints: Dict) -> tuple:
+        """``((template_key, params), None)`` re-rendering a notification's text exactly, or ``(None, reason)``"""
+        user = users.get(notification.user_id)
+        if user is None:
+            return None, 'missing_user'
+        if notification.complaint_id:
+            complaint = complaints.get(notification.complaint_id)
+            if complaint is None:
+                return None, 'missing_complaint'
+            if notification.type not in COMPLAINT_TEMPLATES:
+                return None, 'unknown_type'
+            group, objects = 'complaint', {'user': user, 'complaint': complaint}
+        elif notification.type in SYSTEM_TEMPLATES:
+            group, objects = 'system', {'user': user}
+        else:
+            return None, 'unknown_type'
+
+        template_key = template_registry.template_key(group, notification.type)
+        # Texts with the send time embedded are tried with each date found in them
+        candidates = [notification.created_at] + [
+            datetime.strptime(found, '%d/%m/%Y às %H:%M')
+            for found in RENDERED_DATE.findall(notification.message)
+        ]
+        for now in candidates:
+            params = template_registry.stored_params(template_key, now=now, extra={}, **objects)
+            if template_registry.render_stored(template_key, params) == notification.message:
+                return (template_key, params), None
+            # Rendered with extra data that was not kept: read it back from the text
+            extra = template_registry.recover_extra(template_key, notification.message, now=now, **objects)
+            if extra:
+                params = template_registry.stored_params(template_key, now=now, extra=extra, **objects)
+                if template_registry.render_stored(template_key, params) == notification.message:
+                    return (template_key, params), None
+        # The template changed since the text was rendered
+        return None, 'text_mismatch'
+
+    def migrate_stored_messages(self, batch_size: int = 500, sample_size: int = 100) -> Dict:
+        """Convert rows with a rendered message to template key + parameters.
+
+        Only rows whose text is reproduced exactly by a template are
+        converted; the others keep their text and are reported by reason
+        (``unconverted``), with up to ``sample_size`` of their ids. One
+        transaction per batch.
+        """
+        from src.models.user import User
+        from src.models.complaint import Complaint
+
+        bytes_before = db.session.query(func.coalesce(func.sum(
+            func.length(Notification.message) + func.coalesce(func.length(Notification.template_params), 0)
+        ), 0)).scalar()
+
+        scanned = converted = 0
+        unconverted: Dict[str, int] = {}
+        unconverted_ids = []
+        last_id = 0
+        while True:
+            notifications = Notification.query.filter(
+                Notification.id > last_id,
+                Notification.template_key.is_(None),
+                Notification.message != ''
+            ).order_by(Notification.id).limit(batch_size).all()
+            if not notifications:
+                break
+            last_id = notifications[-1].id
+            scanned += len(notifications)
+
+            users = {user.id: user for user in User.query.filter(
+                User.id.in_({notification.user_id for notification in notifications})
+            ).all()}
+            complaint_ids = {notification.complaint_id for notification in notifications if notification.complaint_id}
+            complaints = {complaint.id: complaint for complaint in Complaint.query.filter(
+                Complaint.id.in_(complaint_ids)
+            ).all()} if complaint_ids else {}
+
+            try:
+                for notification in notifications:
+                    stored, reason = self._stored_form(notification, users, complaints)
+                    if stored:
+                        notification.template_key, notification.template_params = stored
+                        notification.message = ''
+                        converted += 1
+                    else:
+                        unconverted[reason] = unconverted.get(reason, 0) + 1
+                        if len(unconverted_ids) < sample_size:
+                            unconverted_ids.append(notification.id)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            db.session.expunge_all()
+
+        bytes_after = db.session.query(func.coalesce(func.sum(
+            func.length(Notification.message) + func.coalesce(func.length(Notification.template_params), 0)
+        ), 0)).scalar()
+
+        logger.info(f"Converted {converted} of {scanned} notifications to stored templates")
+        if unconverted:
+            logger.warning(f"Notifications left as rendered text: {unconverted}")
+        return {
+            'scanned': scanned,
+            'converted': converted,
+            'unconverted': unconverted,
+            'unconverted_ids': unconverted_ids,
+            'message_bytes_before': bytes_before,
+            'message_bytes_after': bytes_after
+        }
+
     def get_unread_count(self, user_id: int) -> int:
-        """Get count of unread notifications for user"""
-        return Notification.query.filter_by(user_id=user_id, read=False).count()
+        """Get count of unread notifications for user, unseen broadcasts included"""
+        return unread_counter_service.get(user_id) + broadcast_service.unseen_count(user_id)
 
 # Global notification service instance
 notification_service = NotificationService()
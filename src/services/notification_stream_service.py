@@ -0,0 +1,294 @@
+import json
+import logging
+import queue
+import threading
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Set
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+STREAM_SESSION_KEY = 'notification_stream_new'
+
+
+class StreamSubscriber:
+    """One open event stream: a bounded queue of pending events and the ids already sent"""
+
+    def __init__(self, user_id: int, max_queue: int):
+        self.user_id = user_id
+        self.queue: 'queue.Queue' = queue.Queue(max_queue)
+        self._sent_ids: deque = deque(maxlen=256)
+
+    def put(self, item) -> None:
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            # A client that does not read its events is closed instead of buffered forever
+            self.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        self.queue.put_nowait(None)
+
+    def mark_sent(self, notification_id: int) -> bool:
+        """Record a sent notification; False when it was already sent on this stream"""
+        if notification_id in self._sent_ids:
+            return False
+        self._sent_ids.append(notification_id)
+        return True
+
+
+def format_event(event_name: str, data: Dict, event_id: Optional[int] = None) -> str:
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_name}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class NotificationStreamService:
+    """Pushes new notifications and unread count changes to open event streams.
+
+    Events are published in process once the transaction that wrote them
+    commits. With ``NOTIFICATION_STREAM_BROKER = 'database'`` a poller also
+    reads notifications committed by other worker processes, so several
+    workers can serve streams without a separate message broker. The
+    default is ``'database'`` when ``WORKER_PROCESSES`` is above one, since
+    with ``'memory'`` a stream would miss every notification committed by
+    the other workers.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._subscribers: Dict[int, List[StreamSubscriber]] = {}
+        self._lock = threading.Lock()
+        self._listening = False
+        self._poller: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.max_connections = 100
+        self.heartbeat_seconds = 15
+        self.resume_limit = 100
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize notification stream service with Flask app"""
+        from src.services.unread_counter_service import unread_counter_service
+
+        self.app = app
+        self.max_connections = app.config.get('NOTIFICATION_STREAM_MAX_CONNECTIONS', 100)
+        self.heartbeat_seconds = app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15)
+        self.retry_ms = app.config.get('NOTIFICATION_STREAM_RETRY_MS', 5000)
+        self.resume_limit = app.config.get('NOTIFICATION_STREAM_RESUME_LIMIT', 100)
+        self.max_queue = app.config.get('NOTIFICATION_STREAM_QUEUE_SIZE', 200)
+        # 'memory' or 'database'; several workers need the poller to see each other's notifications
+        default_broker = 'database' if app.config.get('WORKER_PROCESSES', 1) > 1 else 'memory'
+        self.broker = app.config.get('NOTIFICATION_STREAM_BROKER') or default_broker
+        self.poll_interval = app.config.get('NOTIFICATION_STREAM_POLL_INTERVAL', 2)
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            unread_counter_service.add_change_listener(self._publish_unread)
+            self._listening = True
+
+    def start(self) -> None:
+        """Start the shared broker poller when streams are served by several processes"""
+        if self.broker != 'database' or self._poller:
+            return
+        self._poller = threading.Thread(target=self._poll_loop, name='notification-stream-poller', daemon=True)
+        self._poller.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._poller:
+            self._poller.join(timeout)
+            self._poller = None
+        self._stop.clear()
+
+    # Publishing
+
+    def _after_flush(self, session, flush_context) -> None:
+        from src.models.notification import Notification
+
+        if not self._subscribers:
+            return
+        # Serialized now, while the flushed attributes are loaded: after_commit may not emit SQL
+        new = [obj.to_dict() for obj in session.new if isinstance(obj, Notification)]
+        if new:
+            session.info.setdefault(STREAM_SESSION_KEY, []).extend(new)
+
+    def _after_commit(self, session) -> None:
+        for data in session.info.pop(STREAM_SESSION_KEY, None) or ():
+            self.publish(data['user_id'], 'notification', data)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(STREAM_SESSION_KEY, None)
+
+    def _publish_unread(self, user_ids: Set[int]) -> None:
+        for user_id in user_ids:
+            self.publish(user_id, 'unread', None)
+
+    def publish(self, user_id: int, event_name: str, data: Optional[Dict]) -> None:
+        """Queue an event for every open stream of a user in this process"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(int(user_id), ()))
+        for subscriber in subscribers:
+            subscriber.put((event_name, data))
+
+    def publish_all(self, event_name: str, data: Optional[Dict]) -> None:
+        """Queue an event for every open stream in this process"""
+        with self._lock:
+            subscribers = [subscriber for group in self._subscribers.values() for subscriber in group]
+        for subscriber in subscribers:
+            subscriber.put((event_name, data))
+
+    # Subscriptions
+
+    def subscribe(self, user_id: int) -> Optional[StreamSubscriber]:
+        """Open a stream for a user; None when this worker is at its connection cap"""
+        with self._lock:
+            if sum(len(subscribers) for subscribers in self._subscribers.values()) >= self.max_connections:
+                return None
+            subscriber = StreamSubscriber(int(user_id), self.max_queue)
+            self._subscribers.setdefault(subscriber.user_id, []).append(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: StreamSubscriber) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(subscriber.user_id, [])
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if not subscribers:
+                self._subscribers.pop(subscriber.user_id, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            users = len(self._subscribers)
+            connections = sum(len(subscribers) for subscribers in self._subscribers.values())
+        return {
+            'connections': connections,
+            'users': users,
+            'max_connections': self.max_connections,
+            'broker': self.broker
+        }
+
+    # Shared broker
+
+    def _poll_loop(self) -> None:
+        from src.models.notification import Notification
+
+        last_id = None
+        while not self._stop.wait(self.poll_interval):
+            rows = []
+            try:
+                with self.app.app_context():
+                    with self._lock:
+                        user_ids = list(self._subscribers)
+                    if last_id is None or not user_ids:
+                        last_id = db.session.execute(select(func.max(Notification.id))).scalar() or 0
+                    else:
+                        rows = db.session.execute(
+                            select(Notification.id, Notification.user_id).where(
+                                Notification.id > last_id,
+                                Notification.user_id.in_(user_ids)
+                            ).order_by(Notification.id)
+                        ).all()
+                        if rows:
+                            last_id = rows[-1].id
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error polling notification stream broker: {str(e)}")
+                continue
+
+            # Rows committed by this process were already published; streams skip duplicates
+            for row in rows:
+                self.publish(row.user_id, 'notification', {'id': row.id})
+            for user_id in {row.user_id for row in rows}:
+                self.publish(user_id, 'unread', None)
+
+    # Streaming
+
+    def _notifications_after(self, user_id: int, last_event_id: int) -> List[Dict]:
+        from src.models.notification import Notification
+
+        try:
+            return [
+                notification.to_dict()
+                for notification in Notification.query.filter(
+                    Notification.user_id == user_id,
+                    Notification.id > last_event_id
+                ).order_by(Notification.id).limit(self.resume_limit).all()
+            ]
+        finally:
+            # Never keep a read transaction open while the stream waits
+            db.session.remove()
+
+    def _unread_event(self, user_id: int) -> str:
+        from src.services.notification_service import notification_service
+
+        try:
+            count = notification_service.get_unread_count(user_id)
+        finally:
+            db.session.remove()
+        return format_event('unread', {'unread_count': count})
+
+    def stream(self, subscriber: StreamSubscriber, last_event_id: Optional[int] = None) -> Iterator[str]:
+        """Server-Sent Events for one subscriber; runs until the client disconnects"""
+        user_id = subscriber.user_id
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            if last_event_id is not None:
+                for data in self._notifications_after(user_id, last_event_id):
+                    if subscriber.mark_sent(data['id']):
+                        yield format_event('notification', data, data['id'])
+            yield self._unread_event(user_id)
+
+            while True:
+                try:
+                    item = subscriber.queue.get(timeout=self.heartbeat_seconds)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if item is None:
+                    return
+
+                # Send everything already queued; a burst of count changes costs one read
+                items = [item]
+                while True:
+                    try:
+                        items.append(subscriber.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                unread_changed = False
+                for item in items:
+                    if item is None:
+                        return
+                    event_name, data = item
+                    if event_name == 'unread':
+                        unread_changed = True
+                    elif event_name == 'notification' and subscriber.mark_sent(data['id']):
+                        if 'title' not in data:
+                            loaded = self._notifications_after(user_id, data['id'] - 1)[:1]
+                            if not loaded or loaded[0]['id'] != data['id']:
+                                continue
+                            data = loaded[0]
+                        yield format_event('notification', data, data['id'])
+                if unread_changed:
+                    yield self._unread_event(user_id)
+        finally:
+            self.unsubscribe(subscriber)
+
+
+# Global notification stream service instance
+notification_stream_service = NotificationStreamService()
@@ -0,0 +1,462 @@
+"""Notification templates (Jinja2), compiled once at startup.
+
+Templates are grouped by notification family; each type has a subject, an
+email body and a WhatsApp message. Context variables: ``user``, ``extra``
+(the notification extra data), ``now`` and, for complaint and supporter
+templates, ``complaint``.
+
+Notifications store only a template key and the parameters their email
+body reads (``stored_params``); the text is rendered again when read
+(``render_stored``), through an LRU cache. A stored row that no longer
+renders (e.g. its template now reads a value that was not kept) falls back
+to a caller-given text instead of failing the whole list.
+"""
+import json
+import logging
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Dict, Optional, Set, Tuple, Union
+
+from jinja2 import Environment, StrictUndefined, Template
+
+logger = logging.getLogger(__name__)
+
+COMPLAINT_TEMPLATES = {
+    'complaint_created': {
+        'subject': 'Reclamação #{{ complaint.id }} registrada com sucesso',
+        'email_body': '''Olá {{ user.full_name }},
+
+Sua reclamação foi registrada com sucesso no sistema deuruimcidadao!
+
+Detalhes da reclamação:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Categoria: {{ complaint.category }}
+- Status: {{ complaint.status }}
+- Data: {{ complaint.created_at.strftime('%d/%m/%Y às %H:%M') }}
+
+Você receberá atualizações sobre o andamento da sua reclamação.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '🏛️ *deuruimcidadao*\n\nSua reclamação #{{ complaint.id }} foi registrada!\n\n📋 *{{ complaint.title }}*\n📍 {{ complaint.address or complaint.city }}\n⏰ Status: {{ complaint.status }}\n\nVocê receberá atualizações sobre o andamento.'
+    },
+    
+    'status_updated': {
+        'subject': 'Reclamação #{{ complaint.id }} - Status atualizado',
+        'email_body': '''Olá {{ user.full_name }},
+
+Sua reclamação teve o status atualizado!
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Novo Status: {{ complaint.status }}
+- Data da atualização: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+{{ extra.get('admin_message', '') }}
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': "🏛️ *deuruimcidadao*\n\n📢 Atualização da reclamação #{{ complaint.id }}\n\n📋 *{{ complaint.title }}*\n🔄 Novo status: *{{ complaint.status }}*\n\n{{ extra.get('admin_message', '') }}"
+    },
+    
+    'complaint_resolved': {
+        'subject': 'Reclamação #{{ complaint.id }} foi resolvida!',
+        'email_body': '''Olá {{ user.full_name }},
+
+Temos uma ótima notícia! Sua reclamação foi resolvida.
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Status: Resolvida
+- Data da resolução: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+{{ extra.get('resolution_message', '') }}
+
+Por favor, avalie o atendimento recebido acessando sua conta no deuruimcidadao.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '🎉 *deuruimcidadao*\n\n✅ Sua reclamação #{{ complaint.id }} foi RESOLVIDA!\n\n📋 *{{ complaint.title }}*\n📍 {{ complaint.address or complaint.city }}\n\nPor favor, avalie o atendimento no app!'
+    },
+    
+    'priority_updated': {
+        'subject': 'Reclamação #{{ complaint.id }} - Prioridade atualizada',
+        'email_body': '''Olá {{ user.full_name }},
+
+Sua reclamação teve a prioridade atualizada.
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Nova prioridade: {{ complaint.priority }}
+- Data da atualização: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '🏛️ *deuruimcidadao*\n\n⚡ Reclamação #{{ complaint.id }} marcada como prioridade *{{ complaint.priority }}*\n\n📋 *{{ complaint.title }}*'
+    },
+    
+    'new_response': {
+        'subject': 'Nova resposta na reclamação #{{ complaint.id }}',
+        'email_body': '''Olá {{ user.full_name }},
+
+Você recebeu uma nova resposta na sua reclamação.
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Resposta de: {{ extra.get('responder_name', 'Administração') }}
+- Data: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+Resposta:
+{{ extra.get('response_message', '') }}
+
+Acesse sua conta para ver mais detalhes.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '💬 *deuruimcidadao*\n\nNova resposta na reclamação #{{ complaint.id }}\n\n📋 *{{ complaint.title }}*\n👤 {{ extra.get("responder_name", "Administração") }}\n\n"{{ extra.get("response_message", "")[:100] }}..."\n\nVeja mais no app!'
+    }
+}
+
+# Same complaint events, worded for users who voted on someone else's complaint
+SUPPORTER_TEMPLATES = {
+    'status_updated': {
+        'subject': 'Reclamação #{{ complaint.id }} que você apoiou - Status atualizado',
+        'email_body': '''Olá {{ user.full_name }},
+
+Uma reclamação que você apoiou teve o status atualizado!
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Novo Status: {{ complaint.status }}
+- Data da atualização: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+Obrigado por apoiar esta reclamação.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': "🏛️ *deuruimcidadao*\n\n📢 Atualização da reclamação #{{ complaint.id }} que você apoiou\n\n📋 *{{ complaint.title }}*\n🔄 Novo status: *{{ complaint.status }}*"
+    },
+
+    'complaint_resolved': {
+        'subject': 'Reclamação #{{ complaint.id }} que você apoiou foi resolvida!',
+        'email_body': '''Olá {{ user.full_name }},
+
+Temos uma ótima notícia! Uma reclamação que você apoiou foi resolvida.
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Status: Resolvida
+- Data da resolução: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+{{ extra.get('response_message', '') }}
+
+Obrigado por apoiar esta reclamação.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '🎉 *deuruimcidadao*\n\n✅ A reclamação #{{ complaint.id }} que você apoiou foi RESOLVIDA!\n\n📋 *{{ complaint.title }}*\n📍 {{ complaint.address or complaint.city }}'
+    },
+
+    'new_response': {
+        'subject': 'Nova resposta na reclamação #{{ complaint.id }} que você apoiou',
+        'email_body': '''Olá {{ user.full_name }},
+
+Uma reclamação que você apoiou recebeu uma nova resposta.
+
+Detalhes:
+- ID: #{{ complaint.id }}
+- Título: {{ complaint.title }}
+- Resposta de: {{ extra.get('responder_name', 'Administração') }}
+- Data: {{ now.strftime('%d/%m/%Y às %H:%M') }}
+
+Resposta:
+{{ extra.get('response_message', '') }}
+
+Acesse sua conta para ver mais detalhes.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '💬 *deuruimcidadao*\n\nNova resposta na reclamação #{{ complaint.id }} que você apoiou\n\n📋 *{{ complaint.title }}*\n👤 {{ extra.get("responder_name", "Administração") }}\n\n"{{ extra.get("response_message", "")[:100] }}..."\n\nVeja mais no app!'
+    }
+}
+
+SYSTEM_TEMPLATES = {
+    'welcome': {
+        'subject': 'Bem-vindo ao deuruimcidadao!',
+        'email_body': '''Olá {{ user.full_name }},
+
+Bem-vindo ao deuruimcidadao - a plataforma que conecta você à sua cidade!
+
+Com o deuruimcidadao você pode:
+- Registrar reclamações sobre problemas urbanos
+- Acompanhar o andamento das suas solicitações
+- Votar em reclamações de outros cidadãos
+- Contribuir para uma cidade melhor
+
+Sua voz importa! Juntos podemos fazer a diferença.
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': '🏛️ *Bem-vindo ao deuruimcidadao!*\n\nOlá {{ user.full_name }}! 👋\n\nAgora você pode registrar reclamações, acompanhar soluções e contribuir para uma cidade melhor!\n\nSua voz importa! 🗣️'
+    },
+    
+    'monthly_report': {
+        'subject': 'Relatório mensal - deuruimcidadao',
+        'email_body': '''Olá {{ user.full_name }},
+
+Aqui está o resumo das suas atividades no último mês:
+
+- Reclamações registradas: {{ extra.get('complaints_count', 0) }}
+- Votos dados: {{ extra.get('votes_count', 0) }}
+- Reclamações resolvidas: {{ extra.get('resolved_count', 0) }}
+- Pontos XP ganhos: {{ extra.get('xp_gained', 0) }}
+
+Continue contribuindo para uma cidade melhor!
+
+Atenciosamente,
+Equipe deuruimcidadao''',
+        'whatsapp': "📊 *Relatório Mensal*\n\n{{ user.full_name }}, veja suas atividades:\n\n📝 {{ extra.get('complaints_count', 0) }} reclamações\n👍 {{ extra.get('votes_count', 0) }} votos\n✅ {{ extra.get('resolved_count', 0) }} resolvidas\n⭐ {{ extra.get('xp_gained', 0) }} XP\n\nContinue contribuindo! 🏆"
+    }
+}
+
+# Several deliveries to one recipient merged into a single message; ``items`` has ``subject`` and ``body``
+DIGEST_TEMPLATES = {
+    'digest': {
+        'subject': 'Você tem {{ items|length }} novas notificações - deuruimcidadao',
+        'email_body': '''Olá,
+
+Você recebeu {{ items|length }} notificações nos últimos minutos:
+{% for item in items %}
+==============================
+{{ item.subject }}
+
+{{ item.body }}
+{% endfor %}
+==============================
+Veja todas as atualizações no app.
+
+Equipe deuruimcidadao''',
+        'whatsapp': "🏛️ *deuruimcidadao*\n\nVocê tem {{ items|length }} novas notificações:\n{% for item in items %}\n➖➖➖\n{{ item.body }}\n{% endfor %}"
+    }
+}
+
+
+TEMPLATE_PARTS = ('subject', 'email_body', 'whatsapp')
+
+# Part kept in the database as template key + parameters (Notification.message)
+STORED_PART = 'email_body'
+
+_OBJECT_REFERENCE = re.compile(r'\b(user|complaint)\.(\w+)')
+_EXTRA_REFERENCE = re.compile(r'\bextra\.get\(\s*[\'"](\w+)[\'"]')
+_NOW_REFERENCE = re.compile(r'\bnow\b')
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'$dt': value.isoformat(timespec='seconds')}
+    return str(value)
+
+
+def _decode_value(obj: Dict):
+    if len(obj) == 1 and '$dt' in obj:
+        return datetime.fromisoformat(obj['$dt'])
+    return obj
+
+
+class RenderedNotification:
+    """Subject, email body and WhatsApp message of one notification.
+
+    Each part is rendered on first access, so channels the user disabled
+    cost nothing. Unpacks as ``subject, email_body, whatsapp``.
+    """
+
+    def __init__(self, registry: 'TemplateRegistry', group: str, notification_type: str, context: Dict):
+        self._registry = registry
+        self._group = group
+        self._notification_type = notification_type
+        self._context = context
+        self._parts: Dict[str, str] = {}
+        self._stored_params: Optional[str] = None
+
+    def _part(self, part: str) -> str:
+        if part not in self._parts:
+            self._parts[part] = self._registry.render(self._group, self._notification_type, part, **self._context)
+        return self._parts[part]
+
+    @property
+    def subject(self) -> str:
+        return self._part('subject')
+
+    @property
+    def email_body(self) -> str:
+        return self._part('email_body')
+
+    @property
+    def whatsapp(self) -> str:
+        return self._part('whatsapp')
+
+    def __iter__(self):
+        return iter(tuple(self._part(part) for part in TEMPLATE_PARTS))
+
+    @property
+    def template_key(self) -> str:
+        return self._registry.template_key(self._group, self._notification_type)
+
+    def stored_params(self) -> str:
+        """JSON parameters that re-render this notification's stored part"""
+        if self._stored_params is None:
+            self._stored_params = self._registry.stored_params(self.template_key, **self._context)
+        return self._stored_params
+
+
+class TemplateRegistry:
+    """Compiled notification templates, rendered one part at a time"""
+
+    def __init__(self):
+        self.environment = Environment(autoescape=False, undefined=StrictUndefined)
+        # Templates use no globals; an empty mapping makes every render context cheaper
+        self.environment.globals.clear()
+        self._groups: Dict[str, Tuple[Dict, str]] = {}
+        self._compiled: Dict[Tuple[str, str, str], Union[Template, str]] = {}
+        self._references: Dict[str, Tuple[Dict[str, Set[str]], Set[str], bool]] = {}
+        self._stored_cache: 'OrderedDict[Tuple[str, str], str]' = OrderedDict()
+        self.stored_cache_size = 20000
+        self._lock = threading.Lock()
+
+    def register(self, group: str, templates: Dict[str, Dict[str, str]], default: str) -> None:
+        """Compile every template of a group; ``default`` is used for unknown types"""
+        compiled = {}
+        for notification_type, parts in templates.items():
+            for part, source in parts.items():
+                # Text without template syntax is stored as is and never rendered
+                is_static = '{{' not in source and '{%' not in source
+                compiled[(group, notification_type, part)] = source if is_static else self.environment.from_string(source)
+        references = {}
+        for notification_type, parts in templates.items():
+            source = parts.get(STORED_PART, '')
+            attributes: Dict[str, Set[str]] = {}
+            for name, attribute in _OBJECT_REFERENCE.findall(source):
+                attributes.setdefault(name, set()).add(attribute)
+            references[f"{group}:{notification_type}"] = (
+                attributes, set(_EXTRA_REFERENCE.findall(source)), bool(_NOW_REFERENCE.search(source))
+            )
+        with self._lock:
+            self._groups[group] = (templates, default)
+            self._compiled.update(compiled)
+            self._references.update(references)
+            self._stored_cache.clear()
+
+    def resolve(self, group: str, notification_type: str) -> str:
+        """Template type actually used for a notification type"""
+        templates, default = self._groups[group]
+        return notification_type if notification_type in templates else default
+
+    def render(self, group: str, notification_type: str, part: str, **context) -> str:
+        template = self._compiled[(group, self.resolve(group, notification_type), part)]
+        if isinstance(template, str):
+            return template
+        return template.render(**context)
+
+    def render_all(self, group: str, notification_type: str, now: Optional[datetime] = None,
+                   **context) -> RenderedNotification:
+        """Lazily rendered parts of one notification type"""
+        context['now'] = now or datetime.now()
+        context.setdefault('extra', {})
+        return RenderedNotification(self, group, notification_type, context)
+
+    def template_key(self, group: str, notification_type: str) -> str:
+        """Key stored with a notification: ``group:type`` of the template actually used"""
+        return f"{group}:{self.resolve(group, notification_type)}"
+
+    def stored_params(self, template_key: str, now: Optional[datetime] = None, extra: Optional[Dict] = None,
+                      **objects) -> str:
+        """Compact JSON of just the values the stored part of a template reads"""
+        attributes, extra_keys, uses_now = self._references[template_key]
+        params = {}
+        for name in sorted(attributes):
+            obj = objects.get(name)
+            params[name] = {attribute: getattr(obj, attribute, None) for attribute in sorted(attributes[name])}
+        if extra_keys and extra:
+            used = {key: extra[key] for key in sorted(extra_keys) if key in extra}
+            if used:
+                params['extra'] = used
+        if uses_now:
+            params['now'] = now or datetime.now()
+        return json.dumps(params, ensure_ascii=False, separators=(',', ':'), default=_encode_value)
+
+    def _render_params(self, template_key: str, params: Optional[str]) -> str:
+        group, notification_type = template_key.split(':', 1)
+        values = json.loads(params, object_hook=_decode_value) if params else {}
+        context = {name: SimpleNamespace(**value) for name, value in values.items() if name in ('user', 'complaint')}
+        context['extra'] = values.get('extra', {})
+        context['now'] = values.get('now')
+        return self.render(group, notification_type, STORED_PART, **context)
+
+    def recover_extra(self, template_key: str, text: str, now: Optional[datetime] = None,
+                      **objects) -> Optional[Dict[str, str]]:
+        """Extra values that make the stored part of a template render ``text``, if any.
+
+        Renders the template with a marker in place of each extra value and
+        matches ``text`` against the result. Used to convert messages
+        rendered before their extra data was kept.
+        """
+        _, extra_keys, _ = self._references[template_key]
+        if not extra_keys:
+            return None
+        markers = {key: f"\x00{key}\x00" for key in extra_keys}
+        pattern = re.escape(self._render_params(
+            template_key, self.stored_params(template_key, now=now, extra=markers, **objects)
+        ))
+        for key, marker in markers.items():
+            marker = re.escape(marker)
+            pattern = pattern.replace(marker, f"(?P<{key}>.*?)", 1).replace(marker, f"(?P={key})")
+        match = re.fullmatch(pattern, text, re.DOTALL)
+        if match is None:
+            return None
+        return {key: value for key, value in match.groupdict().items() if value is not None}
+
+    def render_stored(self, template_key: str, params: Optional[str], fallback: str = '') -> str:
+        """Render the stored part of a notification from its key and parameters (LRU cached).
+
+        Returns ``fallback`` (not cached) when the parameters no longer fit
+        the template, so one old row cannot break a list.
+        """
+        cache_key = (template_key, params or '')
+        # Hits skip the lock: get and move_to_end are each atomic on an OrderedDict
+        text = self._stored_cache.get(cache_key)
+        if text is not None:
+            try:
+                self._stored_cache.move_to_end(cache_key)
+            except KeyError:
+                pass  # evicted by another thread meanwhile
+            return text
+
+        try:
+            text = self._render_params(template_key, params)
+        except Exception as e:
+            logger.warning(f"Could not render stored notification {template_key}: {str(e)}")
+            return fallback
+
+        if self.stored_cache_size:
+            with self._lock:
+                self._stored_cache[cache_key] = text
+                while len(self._stored_cache) > self.stored_cache_size:
+                    self._stored_cache.popitem(last=False)
+        return text
+
+
+template_registry = TemplateRegistry()
+template_registry.register('complaint', COMPLAINT_TEMPLATES, default='complaint_created')
+template_registry.register('supporter', SUPPORTER_TEMPLATES, default='status_updated')
+template_registry.register('system', SYSTEM_TEMPLATES, default='welcome')
+template_registry.register('digest', DIGEST_TEMPLATES, default='digest')
@@ -0,0 +1,194 @@
+import hmac
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Optional, Tuple
+
+import bcrypt
+
+logger = logging.getLogger(__name__)
+
+# bcrypt only reads the first 72 bytes; older releases truncated silently, bcrypt >= 5 raises
+BCRYPT_MAX_PASSWORD_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """The hashing pool is saturated; the request should be retried after ``retry_after`` seconds"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Password hashing pool saturated, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _encode(password: str) -> bytes:
+    return password.encode('utf-8')[:BCRYPT_MAX_PASSWORD_BYTES]
+
+
+def hash_cost(password_hash: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash (``$2b$12$...`` -> 12); None when it is not one"""
+    parts = (password_hash or '').split('$')
+    try:
+        return int(parts[2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _verify(password_hash: str, password: str, rounds: Optional[int]) -> Tuple[bool, Optional[str]]:
+    """(matches, new hash); the new hash is set when it matched with a cost other than ``rounds``"""
+    try:
+        stored = password_hash.encode('utf-8')
+        matches = hmac.compare_digest(bcrypt.hashpw(_encode(password), stored), stored)
+    except ValueError:
+        # Not a bcrypt hash
+        return False, None
+    if matches and rounds is not None and hash_cost(password_hash) != rounds:
+        return True, _hash(password, rounds)
+    return matches, None
+
+
+class PasswordService:
+    """Hashes and verifies passwords with bcrypt on a bounded thread pool.
+
+    bcrypt releases the GIL, so up to ``workers`` hashes run on separate
+    cores while the request threads wait for them, and at most
+    ``queue_size`` more wait in line. ``workers`` defaults to the host's
+    cores divided by ``WORKER_PROCESSES``, so all worker processes
+    together keep to one bcrypt thread per core. Past that, or when a queued job waits
+    longer than ``timeout``, ``PasswordHasherBusy`` is raised and the route
+    answers 503 with Retry-After instead of pinning every worker on CPU.
+    Hashes made with another cost factor are replaced on the next
+    successful verification.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._slots: Optional[threading.BoundedSemaphore] = None
+        self._lock = threading.Lock()
+        self._stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0, 'timed_out': 0}
+        self._busy_seconds = 0.0
+        self._in_flight = 0
+        self.rounds = 12
+        self.workers = os.cpu_count() or 1
+        self.queue_size = self.workers * 4
+        self.timeout = 10
+        self.retry_after = 2
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize password service with Flask app"""
+        self.app = app
+        # Same key Flask-Bcrypt reads, so both agree on the cost of new hashes
+        self.rounds = app.config.get('BCRYPT_LOG_ROUNDS', 12)
+        # The cores are shared by every worker process on the host
+        self.workers = app.config.get(
+            'PASSWORD_HASH_WORKERS', max(1, (os.cpu_count() or 1) // app.config.get('WORKER_PROCESSES', 1))
+        )
+        self.queue_size = app.config.get('PASSWORD_HASH_QUEUE_SIZE', self.workers * 4)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', 10)
+        self.retry_after = app.config.get('PASSWORD_HASH_RETRY_AFTER', 2)
+        self.shutdown()
+
+    def _pool(self) -> Tuple[ThreadPoolExecutor, threading.BoundedSemaphore]:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='password-hash')
+                # One slot per running or queued job
+                self._slots = threading.BoundedSemaphore(self.workers + self.queue_size)
+            return self._executor, self._slots
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor, self._slots = self._executor, None, None
+        if executor:
+            executor.shutdown(wait=False)
+
+    def _release(self, slots: threading.BoundedSemaphore) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        slots.release()
+
+    def _count(self, key: str, elapsed: float = 0.0) -> None:
+        with self._lock:
+            self._stats[key] += 1
+            self._busy_seconds += elapsed
+
+    def _run(self, stat: str, fn, *args):
+        executor, slots = self._pool()
+        if not slots.acquire(blocking=False):
+            self._count('rejected')
+            raise PasswordHasherBusy(self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self._count(stat, time.perf_counter() - started)
+
+        try:
+            future = executor.submit(timed)
+        except Exception:
+            self._release(slots)
+            raise
+        future.add_done_callback(lambda done: self._release(slots))
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            # Still queued: dropped; already running: it finishes and frees its slot
+            future.cancel()
+            self._count('timed_out')
+            raise PasswordHasherBusy(self.retry_after)
+
+    def hash_password(self, password: str) -> str:
+        return self._run('hashed', _hash, password, self.rounds)
+
+    def check_password(self, password_hash: str, password: str) -> bool:
+        return self._run('verified', _verify, password_hash, password, None)[0]
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        return hash_cost(password_hash) != self.rounds
+
+    def verify(self, password_hash: str, password: str) -> Tuple[bool, Optional[str]]:
+        """(matches, new hash); on a match with an outdated cost the new hash is computed
+        in the same pool job and the caller stores it"""
+        matches, new_hash = self._run('verified', _verify, password_hash, password, self.rounds)
+        if new_hash:
+            self._count('rehashed')
+        return matches, new_hash
+
+    def verify_and_upgrade(self, user, password: str) -> bool:
+        """Check a user's password; an upgraded hash is set on ``user.password_hash`` for the caller to commit"""
+        matches, new_hash = self.verify(user.password_hash, password)
+        if new_hash:
+            logger.info(f"Password hash of user {user.id} upgraded to cost {self.rounds}")
+            user.password_hash = new_hash
+        return matches
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            busy_seconds = self._busy_seconds
+            in_flight = self._in_flight
+        jobs = stats['hashed'] + stats['verified']
+        return {
+            **stats,
+            'rounds': self.rounds,
+            'workers': self.workers,
+            'queue_size': self.queue_size,
+            'in_flight': in_flight,
+            'avg_job_ms': round(busy_seconds / jobs * 1000, 1) if jobs else None
+        }
+
+
+# Global password service instance
+password_service = PasswordService()
@@ -0,0 +1,257 @@
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func, insert, select
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+
+def month_bounds(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Return the half-open interval [start, end) covering a calendar month"""
+    start = datetime(year, month, 1)
+    if month == 12:
+        end = datetime(year + 1, 1, 1)
+    else:
+        end = datetime(year, month + 1, 1)
+    return start, end
+
+
+def shift_month(year: int, month: int, delta: int) -> Tuple[int, int]:
+    """Move a (year, month) pair by ``delta`` months"""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+class PointRollupService:
+    def __init__(self, app=None):
+        self.app = app
+        self._rolled_months = set()
+        self._lock = threading.Lock()
+        self.archive_batch_size = 5000
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize point rollup service with Flask app"""
+        self.app = app
+        self.archive_after_months = app.config.get('POINT_ARCHIVE_AFTER_MONTHS')
+        self.archive_batch_size = app.config.get('POINT_ARCHIVE_BATCH_SIZE', 5000)
+
+    @staticmethod
+    def _current_period() -> Tuple[int, int]:
+        now = datetime.utcnow()
+        return now.year, now.month
+
+    def is_rolled_up(self, year: int, month: int) -> bool:
+        """Whether a closed month has already been folded into point_monthly"""
+        from src.models.gamification import PointMonthly
+
+        if (year, month) in self._rolled_months:
+            return True
+        if (year, month) >= self._current_period():
+            return False
+
+        rolled = db.session.query(
+            PointMonthly.query.filter_by(year=year, month=month).exists()
+        ).scalar()
+        if rolled:
+            with self._lock:
+                self._rolled_months.add((year, month))
+        return rolled
+
+    def monthly_totals(self, city: str, year: int, month: int):
+        """Select of (user_id, points) for one city and month.
+
+        Closed months that were compacted are read from point_monthly; the
+        current month (and closed months not compacted yet) use a range
+        predicate on the raw point_history rows.
+        """
+        from src.models.user import User
+        from src.models.gamification import PointHistory, PointMonthly
+
+        if self.is_rolled_up(year, month):
+            return select(
+                PointMonthly.user_id.label('user_id'),
+                func.sum(PointMonthly.points).label('points')
+            ).where(
+                PointMonthly.city == city,
+                PointMonthly.year == year,
+                PointMonthly.month == month
+            ).group_by(PointMonthly.user_id)
+
+        start, end = month_bounds(year, month)
+        return select(
+            PointHistory.user_id.label('user_id'),
+            func.sum(PointHistory.points).label('points')
+        ).join(
+            User, User.id == PointHistory.user_id
+        ).where(
+            User.city == city,
+            PointHistory.created_at >= start,
+            PointHistory.created_at < end
+        ).group_by(PointHistory.user_id)
+
+    def compact_month(self, year: int, month: int) -> int:
+        """Fold the raw rows of one closed month into point_monthly; returns rows written"""
+        from src.models.user import User
+        from src.models.gamification import PointHistory, PointMonthly
+
+        start, end = month_bounds(year, month)
+        grouped = db.session.query(
+            PointHistory.user_id,
+            User.city,
+            PointHistory.action,
+            func.sum(PointHistory.points),
+            func.count(PointHistory.id)
+        ).join(
+            User, User.id == PointHistory.user_id
+        ).filter(
+            PointHistory.created_at >= start,
+            PointHistory.created_at < end
+        ).group_by(PointHistory.user_id, User.city, PointHistory.action).all()
+
+        if not grouped:
+            return 0
+
+        now = datetime.utcnow()
+        rollups: Dict[Tuple[int, str], Dict] = {}
+        for user_id, city, action, points, count in grouped:
+            row = rollups.setdefault((user_id, city), {
+                'user_id': user_id,
+                'city': city,
+                'year': year,
+                'month': month,
+                'points': 0,
+                'actions': {},
+                'created_at': now
+            })
+            row['points'] += points
+            row['actions'][action] = count
+
+        try:
+            PointMonthly.query.filter_by(year=year, month=month).delete(synchronize_session=False)
+            db.session.execute(insert(PointMonthly), list(rollups.values()))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        with self._lock:
+            self._rolled_months.add((year, month))
+        return len(rollups)
+
+    def compact(self) -> Dict:
+        """Fold every closed month that still has raw rows and was not compacted yet"""
+        from src.models.gamification import PointHistory
+
+        current = self._current_period()
+        current_start, _ = month_bounds(*current)
+        oldest = db.session.query(func.min(PointHistory.created_at)).filter(
+            PointHistory.created_at < current_start
+        ).scalar()
+
+        compacted = []
+        if oldest is not None:
+            period = (oldest.year, oldest.month)
+            while period < current:
+                if not self.is_rolled_up(*period):
+                    rows = self.compact_month(*period)
+                    if rows:
+                        compacted.append({'year': period[0], 'month': period[1], 'rows': rows})
+                period = shift_month(*period, 1)
+
+        logger.info(f"Point history compaction folded {len(compacted)} months")
+        return {'compacted_months': compacted}
+
+    def archive(self, older_than_months: Optional[int] = None) -> int:
+        """Move raw rows older than N months to point_history_archive.
+
+        Months are compacted first, so reads keep working from point_monthly.
+        Rows are moved in small batches to keep write transactions short.
+        Returns the number of archived rows.
+        """
+        from src.models.gamification import PointHistory, PointHistoryArchive
+
+        older_than_months = older_than_months or self.archive_after_months
+        if not older_than_months:
+            return 0
+
+        self.compact()
+        cutoff, _ = month_bounds(*shift_month(*self._current_period(), -older_than_months))
+
+        archived = 0
+        while True:
+            ids = [row_id for (row_id,) in db.session.query(PointHistory.id).filter(
+                PointHistory.created_at < cutoff
+            ).order_by(PointHistory.id).limit(self.archive_batch_size).all()]
+            if not ids:
+                break
+
+            try:
+                db.session.execute(insert(PointHistoryArchive).from_select(
+                    ['id', 'user_id', 'points', 'action', 'created_at'],
+                    select(
+                        PointHistory.id, PointHistory.user_id, PointHistory.points,
+                        PointHistory.action, PointHistory.created_at
+                    ).where(PointHistory.id.in_(ids))
+                ))
+                PointHistory.query.filter(PointHistory.id.in_(ids)).delete(synchronize_session=False)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            archived += len(ids)
+
+        logger.info(f"Archived {archived} point history rows older than {cutoff.date()}")
+        return archived
+
+    def get_user_monthly_points(self, user_id: int, months: int = 6) -> List[Dict]:
+        """Points per month for a user, oldest first, including the current month"""
+        from src.models.gamification import PointHistory, PointMonthly
+
+        current = self._current_period()
+        periods = [shift_month(*current, -offset) for offset in range(months - 1, -1, -1)]
+
+        rolled = [period for period in periods if self.is_rolled_up(*period)]
+        totals = {period: {'points': 0, 'actions': {}} for period in periods}
+
+        if rolled:
+            first_year = rolled[0][0]
+            for rollup in PointMonthly.query.filter(
+                PointMonthly.user_id == user_id,
+                PointMonthly.year >= first_year
+            ).all():
+                period = (rollup.year, rollup.month)
+                if period in totals:
+                    totals[period]['points'] += rollup.points or 0
+                    for action, count in (rollup.actions or {}).items():
+                        totals[period]['actions'][action] = totals[period]['actions'].get(action, 0) + count
+
+        for period in periods:
+            if period in rolled:
+                continue
+            start, end = month_bounds(*period)
+            for action, points, count in db.session.query(
+                PointHistory.action,
+                func.sum(PointHistory.points),
+                func.count(PointHistory.id)
+            ).filter(
+                PointHistory.user_id == user_id,
+                PointHistory.created_at >= start,
+                PointHistory.created_at < end
+            ).group_by(PointHistory.action).all():
+                totals[period]['points'] += points
+                totals[period]['actions'][action] = count
+
+        return [
+            {'year': year, 'month': month, **totals[(year, month)]}
+            for year, month in periods
+        ]
+
+
+# Global point rollup service instance
+point_rollup_service = PointRollupService()
@@ -0,0 +1,151 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import desc, func, select
+
+from src.database import db, upsert
+from src.services.point_rollup_service import point_rollup_service
+
+logger = logging.getLogger(__name__)
+
+
+def upsert_city_rankings(rows: List[Dict]) -> None:
+    """Bulk insert-or-update CityRanking rows (one statement on SQLite/PostgreSQL).
+
+    Each row must carry city, user_id, points, rank_position, month, year,
+    created_at and updated_at. The caller owns the transaction.
+    """
+    from src.models.gamification import CityRanking
+
+    if not rows:
+        return
+
+    upsert(
+        CityRanking.__table__, rows, key=['city', 'user_id', 'month', 'year'],
+        updates=lambda new: {
+            'points': new.points,
+            'rank_position': new.rank_position,
+            'updated_at': new.updated_at
+        }
+    )
+
+
+class RankingService:
+    def __init__(self, app=None):
+        self.app = app
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize ranking service with Flask app"""
+        self.app = app
+        self.max_workers = app.config.get('RANKING_MAX_WORKERS', 4)
+
+    def _ranked_scores_query(self, city: str, year: int, month: int):
+        """Monthly point totals for a city, ranked with RANK() OVER.
+
+        Totals come from point_monthly for compacted months and from a range
+        predicate on point_history (``idx_point_history_created_at``) otherwise.
+        """
+        totals = point_rollup_service.monthly_totals(city, year, month).subquery()
+
+        return select(
+            totals.c.user_id,
+            totals.c.points,
+            func.rank().over(order_by=desc(totals.c.points)).label('rank_position')
+        )
+
+    def _compute_city(self, engine, query) -> Tuple[List, float]:
+        """Run the ranking query of one city on its own connection"""
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            ranked = conn.execute(query).all()
+        return ranked, (time.perf_counter() - started) * 1000
+
+    def recompute_cities(self, cities: Iterable[str], year: Optional[int] = None,
+                         month: Optional[int] = None) -> Dict:
+        """Recompute the monthly ranking of several cities.
+
+        Rankings are computed in parallel (one connection per city) and then
+        written with a single bulk upsert; rows of users that no longer score
+        in the month are removed. Returns a per-city timing report.
+        """
+        from src.models.gamification import CityRanking
+
+        now = datetime.utcnow()
+        year = year or now.year
+        month = month or now.month
+        cities = sorted({city.lower() for city in cities if city})
+
+        total_started = time.perf_counter()
+        engine = db.engine
+        queries = [self._ranked_scores_query(city, year, month) for city in cities]
+        workers = max(1, min(self.max_workers, len(cities)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(lambda query: self._compute_city(engine, query), queries))
+
+        rows = []
+        report = []
+        for city, (ranked, elapsed_ms) in zip(cities, results):
+            for user_id, points, rank_position in ranked:
+                rows.append({
+                    'city': city,
+                    'user_id': user_id,
+                    'points': points,
+                    'rank_position': rank_position,
+                    'month': month,
+                    'year': year,
+                    'created_at': now,
+                    'updated_at': now
+                })
+            report.append({
+                'city': city,
+                'users': len(ranked),
+                'query_ms': round(elapsed_ms, 2)
+            })
+
+        write_started = time.perf_counter()
+        try:
+            upsert_city_rankings(rows)
+            if cities:
+                CityRanking.query.filter(
+                    CityRanking.city.in_(cities),
+                    CityRanking.month == month,
+                    CityRanking.year == year,
+                    CityRanking.updated_at < now
+                ).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        write_ms = (time.perf_counter() - write_started) * 1000
+
+        result = {
+            'year': year,
+            'month': month,
+            'cities': report,
+            'rows_written': len(rows),
+            'write_ms': round(write_ms, 2),
+            'total_ms': round((time.perf_counter() - total_started) * 1000, 2)
+        }
+        logger.info(f"Ranking recomputed for {len(cities)} cities in {result['total_ms']}ms")
+        return result
+
+    def recompute_city(self, city: str, year: Optional[int] = None,
+                       month: Optional[int] = None) -> Dict:
+        """Recompute the monthly ranking of a single city"""
+        return self.recompute_cities([city], year, month)
+
+    def recompute_all_cities(self, year: Optional[int] = None, month: Optional[int] = None) -> Dict:
+        """Recompute the monthly ranking of every city with registered users"""
+        from src.models.user import User
+
+        cities = [city for (city,) in db.session.query(User.city).distinct().all()]
+        return self.recompute_cities(cities, year, month)
+
+
+# Global ranking service instance
+ranking_service = RankingService()
@@ -0,0 +1,247 @@
+import logging
+import math
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from flask import jsonify, make_response, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Limits per endpoint ('<blueprint>.<view>'), overridable through the RATE_LIMITS config.
+# 'per': 'ip' buckets by client address; 'user' by JWT identity, falling back to the address
+DEFAULT_LIMITS = {
+    'auth.login': {'rate': '10/minute', 'per': 'ip'},
+    'auth.validate_field': {'rate': '60/minute', 'burst': 20, 'per': 'ip'},
+    # app/ tree: availability checks
+    'auth.check_username': {'rate': '60/minute', 'burst': 20, 'per': 'ip'},
+    'auth.check_email': {'rate': '60/minute', 'burst': 20, 'per': 'ip'},
+    'complaints.find_similar_complaints': {'rate': '30/minute', 'burst': 10, 'per': 'user'},
+    'maps.geocode_address': {'rate': '30/minute', 'burst': 10, 'per': 'user'},
+    'maps.validate_coordinates': {'rate': '60/minute', 'burst': 20, 'per': 'user'},
+}
+
+
+class RateLimit:
+    """Token bucket: ``burst`` tokens, refilled at ``count`` tokens per ``period`` seconds"""
+
+    def __init__(self, rate: str, burst: Optional[int] = None, per: str = 'ip'):
+        count, _, unit = rate.partition('/')
+        self.count = int(count)
+        self.period = PERIODS[unit.strip().rstrip('s')]
+        self.burst = int(burst) if burst else self.count
+        self.per = per
+        self.refill_rate = self.count / self.period
+
+    @property
+    def policy(self) -> str:
+        return f"{self.burst};w={self.period}"
+
+
+class MemoryBuckets:
+    """Buckets of this process only; each worker enforces the limits on its own"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: 'OrderedDict[str, Tuple[float, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key: str, limit: RateLimit, now: float) -> Tuple[bool, float]:
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (limit.burst, now))
+            tokens = min(limit.burst, tokens + (now - updated) * limit.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # Least recently used buckets go first; a dropped bucket comes back full
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, tokens
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+
+class SQLiteBuckets:
+    """Buckets in a local SQLite file shared by every worker process on the host"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._takes = 0
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=1, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=OFF')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)'
+            )
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, limit: RateLimit, now: float) -> Tuple[bool, float]:
+        conn = self._connection()
+        # BEGIN IMMEDIATE takes the write lock up front, so read-modify-write is atomic across workers
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            tokens, updated = row if row else (limit.burst, now)
+            tokens = min(limit.burst, tokens + max(0.0, now - updated) * limit.refill_rate)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, tokens, now))
+            self._takes += 1
+            if self._takes % 1000 == 0:
+                # Buckets idle for a day have long been full again
+                conn.execute('DELETE FROM buckets WHERE updated < ?', (now - 86400,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return allowed, tokens
+
+    def size(self) -> int:
+        return self._connection().execute('SELECT COUNT(*) FROM buckets').fetchone()[0]
+
+
+class RateLimitService:
+    """Token-bucket rate limits for endpoints that are cheap to call and expensive to serve.
+
+    Each limited endpoint has its own bucket per client address or per
+    user. With ``RATE_LIMIT_BROKER = 'memory'`` the buckets live in this
+    process; with ``'sqlite'`` they live in a local SQLite file
+    (``RATE_LIMIT_STORAGE``) so every worker on the host shares them. The
+    default is ``'sqlite'`` when ``WORKER_PROCESSES`` is above one, since
+    per-process buckets would let each worker allow the full rate. If that
+    storage fails the request is let through rather than rejected.
+
+    Behind a reverse proxy the client address is only right when the app
+    trusts the proxy's ``X-Forwarded-For`` (``TRUSTED_PROXIES``, see
+    INSTALL.md); otherwise every client shares the proxy's bucket.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.broker = 'memory'
+        self.limits: Dict[str, RateLimit] = {}
+        self._buckets = MemoryBuckets(100000)
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._stats_lock = threading.Lock()
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize rate limit service with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('RATE_LIMIT_ENABLED', True)
+        # 'memory' or 'sqlite'; several workers need the shared buckets to enforce the configured rate
+        default_broker = 'sqlite' if app.config.get('WORKER_PROCESSES', 1) > 1 else 'memory'
+        self.broker = app.config.get('RATE_LIMIT_BROKER') or default_broker
+
+        limits = dict(DEFAULT_LIMITS)
+        limits.update(app.config.get('RATE_LIMITS', {}))
+        self.limits = {endpoint: RateLimit(**spec) for endpoint, spec in limits.items() if spec}
+
+        if self.broker == 'sqlite':
+            path = app.config.get('RATE_LIMIT_STORAGE') or os.path.join(tempfile.gettempdir(), 'deuruimcidadao-ratelimit.db')
+            self._buckets = SQLiteBuckets(path)
+        else:
+            self._buckets = MemoryBuckets(app.config.get('RATE_LIMIT_MAX_KEYS', 100000))
+
+    def _client_key(self, limit: RateLimit) -> str:
+        if limit.per == 'user':
+            try:
+                verify_jwt_in_request(optional=True)
+                identity = get_jwt_identity()
+            except Exception:
+                identity = None
+            if identity is not None:
+                return f"user:{identity}"
+        # The client's address once ProxyFix has applied the trusted X-Forwarded-For hops
+        return f"ip:{request.remote_addr}"
+
+    def _count(self, endpoint: str, key: str) -> None:
+        with self._stats_lock:
+            counters = self._stats.setdefault(endpoint, {'allowed': 0, 'rejected': 0, 'storage_errors': 0})
+            counters[key] += 1
+
+    def check(self, endpoint: str) -> Optional[Dict[str, str]]:
+        """Take a token for the current request; returns the RateLimit-* headers (None when unlimited).
+
+        A rejected request gets a ``Retry-After`` header as well.
+        """
+        limit = self.limits.get(endpoint)
+        if not self.enabled or limit is None:
+            return None
+
+        now = time.time()
+        try:
+            allowed, tokens = self._buckets.take(f"{endpoint}|{self._client_key(limit)}", limit, now)
+        except Exception as e:
+            logger.warning(f"Rate limit storage unavailable, letting request through: {str(e)}")
+            self._count(endpoint, 'storage_errors')
+            return None
+
+        headers = {
+            'RateLimit-Limit': str(limit.burst),
+            'RateLimit-Remaining': str(int(tokens)),
+            'RateLimit-Reset': str(math.ceil((limit.burst - tokens) / limit.refill_rate)),
+            'RateLimit-Policy': limit.policy,
+        }
+        if not allowed:
+            headers['Retry-After'] = str(math.ceil((1 - tokens) / limit.refill_rate))
+        self._count(endpoint, 'allowed' if allowed else 'rejected')
+        return headers
+
+    def get_stats(self) -> Dict:
+        with self._stats_lock:
+            endpoints = {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+        try:
+            buckets = self._buckets.size()
+        except Exception:
+            buckets = None
+        return {
+            'enabled': self.enabled,
+            'broker': self.broker,
+            'buckets': buckets,
+            'limits': {
+                endpoint: {'rate': f"{limit.count}/{limit.period}s", 'burst': limit.burst, 'per': limit.per}
+                for endpoint, limit in self.limits.items()
+            },
+            'endpoints': endpoints
+        }
+
+
+# Global rate limit service instance
+rate_limit_service = RateLimitService()
+
+
+def rate_limit():
+    """Decorator applying the endpoint's configured limit; rejected requests get a 429"""
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            headers = rate_limit_service.check(request.endpoint)
+            if headers is None:
+                return f(*args, **kwargs)
+            if 'Retry-After' in headers:
+                return jsonify({'message': 'Muitas requisições, tente novamente em instantes'}), 429, headers
+
+            response = make_response(f(*args, **kwargs))
+            response.headers.extend(headers)
+            return response
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
@@ -0,0 +1,287 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from flask import current_app, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from src.services.etag_service import complaint_changes
+
+logger = logging.getLogger(__name__)
+
+CACHE_SESSION_KEY = 'response_cache_tags'
+# Tag of entries that show user names
+USERS_TAG = 'users'
+
+
+def city_tag(city: str) -> str:
+    return f"city:{(city or 'cuiaba').lower()}"
+
+
+def complaint_tag(complaint_id: int) -> str:
+    return f"complaint:{int(complaint_id)}"
+
+
+class CacheEntry:
+    __slots__ = ('body', 'status', 'mimetype', 'tags', 'stored_at')
+
+    def __init__(self, body: bytes, status: int, mimetype: str, tags: Set[str], stored_at: float):
+        self.body = body
+        self.status = status
+        self.mimetype = mimetype
+        self.tags = tags
+        self.stored_at = stored_at
+
+
+class ResponseCacheService:
+    """Server-side cache of hot GET responses, invalidated by dependency tags.
+
+    Entries are keyed by endpoint and normalized query parameters and carry
+    tags such as ``city:cuiaba`` or ``complaint:42``. Flushes that change
+    complaints, votes or responses collect the affected tags, which are
+    invalidated when the transaction commits. Entries are fresh for ``ttl``
+    seconds; for ``stale_ttl`` more they are still served while one
+    background refresh recomputes them. Invalidation only reaches the worker
+    process that committed the change: views that also send a version-based
+    ETag pass ``version`` so it is part of the key, otherwise the TTL bounds
+    how long another worker's change can go unseen.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.ttl = 15
+        self.stale_ttl = 120
+        self.max_entries = 2000
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._tag_generation: Dict[str, int] = {}
+        self._refreshing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._listening = False
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._stats: Dict[str, Dict[str, int]] = {}
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize response cache service with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('RESPONSE_CACHE_ENABLED', True)
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL', 15)
+        self.stale_ttl = app.config.get('RESPONSE_CACHE_STALE_TTL', 120)
+        self.max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 2000)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=app.config.get('RESPONSE_CACHE_REFRESH_WORKERS', 2),
+                thread_name_prefix='response-cache'
+            )
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    # Invalidation
+
+    def _after_flush(self, session, flush_context) -> None:
+        changes = complaint_changes(session, flush_context)
+        tags = {city_tag(city) for city in changes.cities}
+        tags.update(complaint_tag(complaint_id) for complaint_id in changes.complaint_ids)
+        if changes.users:
+            tags.add(USERS_TAG)
+        if tags:
+            session.info.setdefault(CACHE_SESSION_KEY, set()).update(tags)
+
+    def _after_commit(self, session) -> None:
+        tags = session.info.pop(CACHE_SESSION_KEY, None)
+        if tags:
+            self.invalidate(tags)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(CACHE_SESSION_KEY, None)
+
+    def invalidate(self, tags: Iterable[str]) -> int:
+        """Drop every entry carrying any of ``tags``; returns how many were dropped"""
+        dropped = 0
+        with self._lock:
+            for tag in tags:
+                self._tag_generation[tag] = self._tag_generation.get(tag, 0) + 1
+                for key in self._tag_index.pop(tag, ()):
+                    if self._remove(key):
+                        dropped += 1
+        self._count('*', 'invalidated', dropped)
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            for tag in self._tag_index:
+                self._tag_generation[tag] = self._tag_generation.get(tag, 0) + 1
+            self._entries.clear()
+            self._tag_index.clear()
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+        return True
+
+    # Entries
+
+    @staticmethod
+    def cache_key(endpoint: str, view_args: Dict, args) -> str:
+        """Endpoint, view arguments and the non-empty query parameters, sorted (the city lower-cased, as the views do)"""
+        params = sorted(
+            (name, value.strip().lower() if name == 'city' else value.strip())
+            for name, values in args.lists() for value in values if value.strip()
+        )
+        parts = [endpoint]
+        parts.extend(f"{name}={value}" for name, value in sorted((view_args or {}).items()))
+        parts.extend(f"{name}={value}" for name, value in params)
+        return '|'.join(parts)
+
+    def _generations(self, tags: Set[str]) -> Tuple:
+        with self._lock:
+            return tuple(self._tag_generation.get(tag, 0) for tag in sorted(tags))
+
+    def _store(self, key: str, response, tags: Set[str], generations: Tuple) -> bool:
+        if response.status_code != 200 or response.is_streamed:
+            return False
+        entry = CacheEntry(response.get_data(), response.status_code, response.mimetype, tags, time.monotonic())
+        evicted = 0
+        with self._lock:
+            # A tag invalidated while the response was being computed may have made it stale already
+            if generations != tuple(self._tag_generation.get(tag, 0) for tag in sorted(tags)):
+                return False
+            self._remove(key)
+            self._entries[key] = entry
+            for tag in tags:
+                self._tag_index.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                evicted += 1
+        self._count('*', 'evicted', evicted)
+        return True
+
+    def _lookup(self, key: str) -> Tuple[Optional[CacheEntry], bool]:
+        """(entry, fresh); expired entries are dropped"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            age = now - entry.stored_at
+            if age >= self.ttl + self.stale_ttl:
+                self._remove(key)
+                return None, False
+            self._entries.move_to_end(key)
+            return entry, age < self.ttl
+
+    def _refresh(self, app, key: str, path: str, query_string: str, view, view_args: Dict,
+                 tags: Set[str], generations: Tuple) -> None:
+        try:
+            with app.test_request_context(path, query_string=query_string):
+                response = make_response(view(**view_args))
+                if self._store(key, response, tags, generations):
+                    self._count(key.split('|', 1)[0], 'refreshed')
+        except Exception as e:
+            logger.error(f"Error refreshing cached response {key}: {str(e)}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    # Metrics
+
+    def _count(self, endpoint: str, name: str, amount: int = 1) -> None:
+        if not amount:
+            return
+        with self._lock:
+            counters = self._stats.setdefault(endpoint, {})
+            counters[name] = counters.get(name, 0) + amount
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = {endpoint: dict(counters) for endpoint, counters in self._stats.items()}
+            entries = len(self._entries)
+            size = sum(len(entry.body) for entry in self._entries.values())
+        for endpoint, counters in stats.items():
+            if endpoint == '*':
+                continue
+            hits = counters.get('hits', 0) + counters.get('stale_hits', 0)
+            lookups = hits + counters.get('misses', 0)
+            counters['hit_ratio'] = round(hits / lookups, 4) if lookups else None
+        return {
+            'enabled': self.enabled,
+            'ttl': self.ttl,
+            'stale_ttl': self.stale_ttl,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'bytes': size,
+            'endpoints': stats
+        }
+
+
+# Global response cache service instance
+response_cache_service = ResponseCacheService()
+
+
+def cached(tags: Callable[..., Iterable[str]], when: Optional[Callable[[], bool]] = None,
+           version: Optional[Callable[..., str]] = None):
+    """Decorator serving a GET view from the response cache.
+
+    ``tags`` receives the view arguments and returns the entry's dependency
+    tags; ``when`` can exclude requests (free-text searches, say) from the
+    cache. ``version`` returns the DB-visible data version the view's ETag is
+    built from; it is added to the key, so a write committed by another
+    worker is never answered with this worker's older body. Responses carry
+    ``X-Cache: HIT``, ``STALE`` or ``MISS``.
+    """
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            service = response_cache_service
+            if not service.enabled or request.method != 'GET' or (when is not None and not when()):
+                return f(*args, **kwargs)
+
+            endpoint = request.endpoint
+            key = service.cache_key(endpoint, kwargs, request.args)
+            if version is not None:
+                key = f"{key}|@{version(**kwargs)}"
+            entry, fresh = service._lookup(key)
+            if entry is not None:
+                if not fresh:
+                    with service._lock:
+                        refresh = key not in service._refreshing
+                        service._refreshing.add(key)
+                    if refresh:
+                        entry_tags = set(tags(**kwargs))
+                        service._executor.submit(
+                            service._refresh, current_app._get_current_object(), key, request.path,
+                            request.query_string.decode('utf-8'), f, dict(kwargs), entry_tags, service._generations(entry_tags)
+                        )
+                service._count(endpoint, 'hits' if fresh else 'stale_hits')
+                response = make_response(entry.body, entry.status)
+                response.mimetype = entry.mimetype
+                response.headers['X-Cache'] = 'HIT' if fresh else 'STALE'
+                return response
+
+            service._count(endpoint, 'misses')
+            entry_tags = set(tags(**kwargs))
+            generations = service._generations(entry_tags)
+            response = make_response(f(*args, **kwargs))
+            service._store(key, response, entry_tags, generations)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
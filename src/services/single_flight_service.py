@@ -0,0 +1,203 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from flask import make_response, request
+
+try:
+    import fcntl
+except ImportError:  # Windows: only in-process collapsing
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# (status, headers, body) of a computed response, shareable between threads and processes
+Result = Tuple[int, List[Tuple[str, str]], bytes]
+
+# Recomputed by each copy of the response
+UNSHARED_HEADERS = {'content-length', 'set-cookie'}
+
+
+class Flight:
+    __slots__ = ('done', 'result')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Result] = None
+
+
+class SingleFlightService:
+    """Collapses identical concurrent computations into one.
+
+    The first request for a key computes the response; concurrent requests
+    for the same key wait for it and get a copy. With
+    ``SINGLE_FLIGHT_BROKER = 'file'`` the computing thread also takes an
+    ``flock`` on a per-key lock file, so one worker process computes while
+    the others wait and read the result it writes next to the lock. Only
+    200 responses are shared; a caller that waits longer than ``timeout``
+    seconds, or whose leader failed or answered with an error, computes on
+    its own.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self.enabled = True
+        self.broker = 'memory'
+        self.timeout = 10.0
+        self.lock_dir = None
+        self._flights: Dict[str, Flight] = {}
+        self._lock = threading.Lock()
+        self._stats = {'leaders': 0, 'collapsed': 0, 'shared_across_workers': 0, 'timeouts': 0, 'leader_failures': 0}
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize single-flight service with Flask app"""
+        self.app = app
+        self.enabled = app.config.get('SINGLE_FLIGHT_ENABLED', True)
+        self.broker = app.config.get('SINGLE_FLIGHT_BROKER', 'memory')  # 'memory' or 'file'
+        self.timeout = app.config.get('SINGLE_FLIGHT_TIMEOUT', 10.0)
+        if self.broker == 'file':
+            if fcntl is None:
+                logger.warning("File locks are not available here, single-flight stays in-process")
+                self.broker = 'memory'
+            else:
+                self.lock_dir = app.config.get('SINGLE_FLIGHT_LOCK_DIR') or os.path.join(
+                    tempfile.gettempdir(), 'deuruimcidadao-single-flight'
+                )
+                os.makedirs(self.lock_dir, exist_ok=True)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._stats[name] += 1
+
+    def do(self, key: str, compute: Callable[[], Result]) -> Result:
+        """Run ``compute`` once for all concurrent callers of ``key`` and return its result to each"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Flight()
+
+        if not leader:
+            if flight.done.wait(self.timeout) and flight.result is not None:
+                self._count('collapsed')
+                return flight.result
+            self._count('timeouts' if not flight.done.is_set() else 'leader_failures')
+            return compute()
+
+        self._count('leaders')
+        try:
+            result = self._file_flight(key, compute) if self.broker == 'file' else compute()
+            # An error (a 503 from a deadline, say) belongs to this request, not to the waiters
+            if result[0] == 200:
+                flight.result = result
+            return result
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    # Across worker processes
+
+    def _file_flight(self, key: str, compute: Callable[[], Result]) -> Result:
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).hexdigest()
+        lock_path = os.path.join(self.lock_dir, f"{digest}.lock")
+        result_path = os.path.join(self.lock_dir, f"{digest}.result")
+        started = time.time()
+
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            deadline = time.monotonic() + self.timeout
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        self._count('timeouts')
+                        return compute()
+                    time.sleep(0.01)
+
+            try:
+                # Another worker held the lock and finished while we waited: use its result
+                shared = self._read_result(result_path, since=started)
+                if shared is not None:
+                    self._count('shared_across_workers')
+                    return shared
+                result = compute()
+                if result[0] == 200:
+                    self._write_result(result_path, result)
+                return result
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _write_result(path: str, result: Result) -> None:
+        status, headers, body = result
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}"
+        with open(tmp_path, 'wb') as f:
+            f.write(f"{time.time()} {status}\n".encode('utf-8'))
+            f.write(json.dumps(headers).encode('utf-8') + b'\n')
+            f.write(body)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read_result(path: str, since: float) -> Optional[Result]:
+        try:
+            with open(path, 'rb') as f:
+                header = f.readline().decode('utf-8').split(' ', 1)
+                written_at, status = float(header[0]), int(header[1])
+                if written_at < since:
+                    return None
+                headers = [tuple(item) for item in json.loads(f.readline().decode('utf-8'))]
+                return status, headers, f.read()
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self._stats)
+            in_flight = len(self._flights)
+        return {'enabled': self.enabled, 'broker': self.broker, 'timeout': self.timeout, 'in_flight': in_flight, **stats}
+
+
+# Global single-flight service instance
+single_flight_service = SingleFlightService()
+
+
+def single_flight(key: Optional[Callable[[], str]] = None):
+    """Decorator collapsing concurrent identical requests to a view into one computation.
+
+    Requests share a computation when they hit the same endpoint with the
+    same query string and, when given, the same ``key()`` (e.g. the
+    caller's city for per-user views).
+    """
+    def decorator(f):
+        def wrapper(*args, **kwargs):
+            if not single_flight_service.enabled:
+                return f(*args, **kwargs)
+
+            parts = [request.endpoint, request.query_string.decode('utf-8')]
+            parts.extend(f"{name}={value}" for name, value in sorted(kwargs.items()))
+            if key is not None:
+                parts.append(key())
+
+            def compute() -> Result:
+                response = make_response(f(*args, **kwargs))
+                headers = [(name, value) for name, value in response.headers.items()
+                           if name.lower() not in UNSHARED_HEADERS]
+                return response.status_code, headers, response.get_data()
+
+            status, headers, body = single_flight_service.do('|'.join(parts), compute)
+            return make_response(body, status, headers)
+        wrapper.__name__ = f.__name__
+        return wrapper
+    return decorator
@@ -0,0 +1,169 @@
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import delete, insert, select
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+
+class TokenRevocationService:
+    """Revoked JWT ids, checked on every protected request with one dict lookup.
+
+    Each revoked ``jti`` is kept in memory until the token it belongs to
+    expires, and is written to ``revoked_token`` so revocations survive a
+    restart. With ``TOKEN_REVOCATION_BROKER = 'database'`` (the default) a
+    poller reads the revocations other worker processes wrote, so a logout
+    takes effect everywhere within ``poll_interval`` seconds; ``'memory'``
+    only suits a single process. Expired entries are swept
+    from memory and from the table every ``sweep_interval`` seconds.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        # jti -> expiry as a UNIX timestamp
+        self._revoked: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._worker: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.broker = 'database'
+        self.poll_interval = 1
+        self.sweep_interval = 300
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize token revocation service with Flask app"""
+        self.app = app
+        # 'memory' or 'database'; polling by default, so a logout reaches every gunicorn worker
+        self.broker = app.config.get('TOKEN_REVOCATION_BROKER', 'database')
+        self.poll_interval = app.config.get('TOKEN_REVOCATION_POLL_INTERVAL', 1)
+        self.sweep_interval = app.config.get('TOKEN_REVOCATION_SWEEP_INTERVAL', 300)
+
+    def load(self) -> int:
+        """Read the still valid revocations from the table (startup); returns how many"""
+        from src.models.user import RevokedToken
+
+        rows = db.session.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.expires_at > datetime.utcnow()
+            )
+        ).all()
+        with self._lock:
+            for row in rows:
+                self._revoked[row.jti] = self._timestamp(row.expires_at)
+            self._last_id = max([self._last_id] + [row.id for row in rows])
+        return len(rows)
+
+    def start(self) -> None:
+        """Start the sweeper (and, with the database broker, the poller) thread"""
+        if self._worker:
+            return
+        self._worker = threading.Thread(target=self._run, name='token-revocation', daemon=True)
+        self._worker.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._worker:
+            self._worker.join(timeout)
+            self._worker = None
+        self._stop.clear()
+
+    @staticmethod
+    def _timestamp(value: datetime) -> float:
+        # expires_at is stored as naive UTC
+        return (value - datetime(1970, 1, 1)).total_seconds()
+
+    # Checks
+
+    def is_revoked(self, jti: str) -> bool:
+        """Whether a token id was revoked; never touches the database"""
+        expires = self._revoked.get(jti)
+        return expires is not None and expires > time.time()
+
+    def revoke(self, jti: str, expires: float, user_id: Optional[int] = None,
+               token_type: str = 'access') -> None:
+        """Revoke a token until ``expires`` (its ``exp`` claim) and persist it"""
+        from src.models.user import RevokedToken
+
+        if expires <= time.time() or self.is_revoked(jti):
+            return
+        with self._lock:
+            self._revoked[jti] = expires
+        try:
+            db.session.execute(insert(RevokedToken).values(
+                jti=jti,
+                user_id=int(user_id) if user_id is not None else None,
+                token_type=token_type,
+                expires_at=datetime.utcfromtimestamp(expires),
+                revoked_at=datetime.utcnow()
+            ))
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    def revoke_token(self, jwt_payload: Dict) -> None:
+        """Revoke the token a request was authenticated with (``get_jwt()``)"""
+        self.revoke(jwt_payload['jti'], jwt_payload['exp'], jwt_payload.get('sub'), jwt_payload.get('type', 'access'))
+
+    # Background work
+
+    def _poll(self) -> None:
+        """Add revocations written by other worker processes"""
+        from src.models.user import RevokedToken
+
+        rows = db.session.execute(
+            select(RevokedToken.id, RevokedToken.jti, RevokedToken.expires_at).where(
+                RevokedToken.id > self._last_id
+            ).order_by(RevokedToken.id)
+        ).all()
+        if rows:
+            with self._lock:
+                for row in rows:
+                    self._revoked[row.jti] = self._timestamp(row.expires_at)
+                self._last_id = rows[-1].id
+
+    def sweep(self) -> int:
+        """Forget expired revocations, in memory and in the table; returns how many rows were deleted"""
+        from src.models.user import RevokedToken
+
+        now = time.time()
+        with self._lock:
+            # Rebuilt rather than deleted from in place, so lookups never see a dict being resized
+            self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > now}
+        try:
+            deleted = db.session.execute(
+                delete(RevokedToken).where(RevokedToken.expires_at <= datetime.utcnow())
+            ).rowcount
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        return deleted
+
+    def _run(self) -> None:
+        interval = self.poll_interval if self.broker == 'database' else self.sweep_interval
+        next_sweep = time.monotonic() + self.sweep_interval
+        while not self._stop.wait(interval):
+            try:
+                with self.app.app_context():
+                    if self.broker == 'database':
+                        self._poll()
+                    if time.monotonic() >= next_sweep:
+                        next_sweep = time.monotonic() + self.sweep_interval
+                        deleted = self.sweep()
+                        if deleted:
+                            logger.info(f"Swept {deleted} expired token revocations")
+                    db.session.remove()
+            except Exception as e:
+                logger.error(f"Error syncing token revocations: {str(e)}")
+
+
+# Global token revocation service instance
+token_revocation_service = TokenRevocationService()
@@ -0,0 +1,211 @@
+import logging
+import threading
+import time
+from collections import Counter, OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from src.database import db, greatest, upsert
+
+logger = logging.getLogger(__name__)
+
+COUNTER_SESSION_KEY = 'unread_counter_changes'
+
+
+class Recipient(NamedTuple):
+    """What decides which broadcasts a user sees, cached next to the counter"""
+    city: str
+    role: str
+    created_at: Optional[datetime]
+    watermark: int
+
+
+class UnreadCounterService:
+    """Per-user unread notification counters.
+
+    Counters live in ``notification_counter`` and are changed in the same
+    transaction as the notifications they count. Reads are served from an
+    in-process cache whose entries are dropped when a change commits; the
+    TTL bounds staleness for changes committed by other worker processes.
+    Each entry also holds the user's ``Recipient`` (city, role, signup
+    time and broadcast watermark), so the nav badge, broadcasts included,
+    costs at most one primary key read.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._cache: 'OrderedDict[int, Tuple[int, Optional[Recipient], float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._listening = False
+        self._change_listeners = []
+        self.cache_size = 50000
+        self.cache_ttl = 5
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize unread counter service with Flask app"""
+        self.app = app
+        self.cache_size = app.config.get('UNREAD_COUNTER_CACHE_SIZE', 50000)
+        self.cache_ttl = app.config.get('UNREAD_COUNTER_CACHE_TTL', 5)
+        # Entries read from another app's database
+        self.invalidate()
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_flush(self, session, flush_context) -> None:
+        from src.models.user import User
+
+        # A new city or role changes which broadcasts the cached recipient sees
+        changed = [
+            obj.id for obj in session.dirty
+            if isinstance(obj, User) and any(inspect(obj).attrs[name].history.has_changes() for name in ('city', 'role'))
+        ]
+        if changed:
+            session.info.setdefault(COUNTER_SESSION_KEY, Counter()).update(dict.fromkeys(changed, 0))
+
+    def _after_commit(self, session) -> None:
+        changes = session.info.pop(COUNTER_SESSION_KEY, None)
+        if not changes:
+            return
+        with self._lock:
+            for user_id in changes:
+                self._cache.pop(user_id, None)
+        for listener in self._change_listeners:
+            try:
+                listener(set(changes))
+            except Exception as e:
+                logger.error(f"Error notifying unread counter listener: {str(e)}")
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(COUNTER_SESSION_KEY, None)
+
+    def add_change_listener(self, listener) -> None:
+        """Call ``listener(user_ids)`` after a transaction that changed counters commits"""
+        if listener not in self._change_listeners:
+            self._change_listeners.append(listener)
+
+    def _upsert(self, rows):
+        from src.models.notification import NotificationCounter
+
+        table = NotificationCounter.__table__
+        upsert(
+            table, rows, key=['user_id'],
+            updates=lambda new: {'unread_count': greatest(table.c.unread_count + new.unread_count, 0)}
+        )
+
+    def apply(self, deltas: Dict[int, int]) -> None:
+        """Change the counters of several users in the current transaction (no commit)"""
+        deltas = {int(user_id): delta for user_id, delta in deltas.items() if delta}
+        if not deltas:
+            return
+
+        self._upsert([
+            {'user_id': user_id, 'unread_count': delta}
+            for user_id, delta in sorted(deltas.items())
+        ])
+        db.session.info.setdefault(COUNTER_SESSION_KEY, Counter()).update(deltas)
+
+    def increment(self, user_id: int, delta: int = 1) -> None:
+        self.apply({user_id: delta})
+
+    def add_notifications(self, user_ids: Iterable[int]) -> None:
+        """Count one new unread notification per user id given"""
+        self.apply(Counter(user_ids))
+
+    def touch(self, user_id: int) -> None:
+        """Drop the user's cached entry when the current transaction commits (e.g. a new watermark)"""
+        db.session.info.setdefault(COUNTER_SESSION_KEY, Counter()).update({int(user_id): 0})
+
+    def _entry(self, user_id: int) -> Tuple[int, Optional[Recipient]]:
+        """(unread count, recipient) of a user, cached, else one primary key read"""
+        from src.models.user import User
+        from src.models.notification import NotificationCounter
+
+        user_id = int(user_id)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and now - cached[2] < self.cache_ttl:
+                self._cache.move_to_end(user_id)
+                return cached[0], cached[1]
+
+        # Changed but not committed yet: read, but keep it out of the cache
+        pending = user_id in db.session.info.get(COUNTER_SESSION_KEY, {})
+        row = db.session.execute(
+            select(
+                User.city, User.role, User.created_at,
+                func.coalesce(NotificationCounter.unread_count, 0),
+                func.coalesce(NotificationCounter.broadcast_read_id, 0)
+            ).outerjoin(NotificationCounter, NotificationCounter.user_id == User.id).where(User.id == user_id)
+        ).first()
+        if row is None:
+            count, recipient = 0, None
+        else:
+            count, recipient = row[3], Recipient(row[0], row[1], row[2], row[4])
+        if not pending:
+            with self._lock:
+                self._cache[user_id] = (count, recipient, now)
+                self._cache.move_to_end(user_id)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        return count, recipient
+
+    def get(self, user_id: int) -> int:
+        """Unread notification count of a user (cached, else one primary key read)"""
+        return self._entry(user_id)[0]
+
+    def recipient(self, user_id: int) -> Optional[Recipient]:
+        """City, role, signup time and broadcast watermark of a user; None if there is no such user"""
+        return self._entry(user_id)[1]
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        with self._lock:
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(int(user_id), None)
+
+    def rebuild(self) -> int:
+        """Recount every user's unread notifications; returns the number of counters written"""
+        from src.models.notification import Notification, NotificationCounter
+
+        counts = db.session.execute(
+            select(Notification.user_id, func.count(Notification.id)).where(
+                Notification.is_read == False
+            ).group_by(Notification.user_id)
+        ).all()
+        try:
+            # Rows are kept: they also hold each user's broadcast read watermark
+            NotificationCounter.query.update({'unread_count': 0}, synchronize_session=False)
+            if counts:
+                self._upsert([{'user_id': user_id, 'unread_count': count} for user_id, count in counts])
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        self.invalidate()
+        logger.info(f"Rebuilt {len(counts)} unread notification counters")
+        return len(counts)
+
+    def ensure_initialized(self) -> None:
+        """Build the counters once when the table is new but notifications already exist"""
+        from src.models.notification import Notification, NotificationCounter
+
+        has_counters = db.session.query(NotificationCounter.query.exists()).scalar()
+        if not has_counters and db.session.query(
+            Notification.query.filter(Notification.is_read == False).exists()
+        ).scalar():
+            self.rebuild()
+
+
+# Global unread counter service instance
+unread_counter_service = UnreadCounterService()
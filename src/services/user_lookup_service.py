@@ -0,0 +1,140 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from flask import g, has_app_context
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from src.database import db
+
+logger = logging.getLogger(__name__)
+
+USER_LOOKUP_SESSION_KEY = 'user_lookup_changes'
+
+
+@dataclass(frozen=True)
+class UserSnapshot:
+    """Read-only copy of the user fields authorization reads"""
+    id: int
+    role: str
+    city: str
+    is_active: bool
+
+
+class UserLookupService:
+    """Resolves JWT identities to ``UserSnapshot`` without a query on the hot path.
+
+    Snapshots are memoized for the current request in ``flask.g`` and kept in
+    a process-wide LRU. A committed change to a user (profile, role,
+    deactivation) evicts that user's entry; the TTL bounds how long a change
+    committed by another worker process can go unseen.
+    """
+
+    def __init__(self, app=None):
+        self.app = app
+        self._cache: 'OrderedDict[int, Tuple[UserSnapshot, float]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._listening = False
+        self._generation = 0
+        self.cache_size = 10000
+        self.cache_ttl = 60
+        if app:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Initialize user lookup service with Flask app"""
+        self.app = app
+        self.cache_size = app.config.get('USER_LOOKUP_CACHE_SIZE', 10000)
+        self.cache_ttl = app.config.get('USER_LOOKUP_CACHE_TTL', 60)
+
+        if not self._listening:
+            event.listen(Session, 'after_flush', self._after_flush)
+            event.listen(Session, 'after_commit', self._after_commit)
+            event.listen(Session, 'after_rollback', self._after_rollback)
+            self._listening = True
+
+    def _after_flush(self, session, flush_context) -> None:
+        from src.models.user import User
+
+        changed = {obj.id for obj in session.dirty if isinstance(obj, User) and session.is_modified(obj)}
+        changed.update(obj.id for obj in session.deleted if isinstance(obj, User))
+        if changed:
+            session.info.setdefault(USER_LOOKUP_SESSION_KEY, set()).update(changed)
+
+    def _after_commit(self, session) -> None:
+        changed = session.info.pop(USER_LOOKUP_SESSION_KEY, None)
+        if changed:
+            for user_id in changed:
+                self.invalidate(user_id)
+
+    def _after_rollback(self, session) -> None:
+        session.info.pop(USER_LOOKUP_SESSION_KEY, None)
+
+    @staticmethod
+    def _request_memo() -> Optional[dict]:
+        if not has_app_context():
+            return None
+        if 'user_snapshots' not in g:
+            g.user_snapshots = {}
+        return g.user_snapshots
+
+    def get(self, user_id) -> Optional[UserSnapshot]:
+        """Snapshot of a user (request memo, else cache, else one primary key read); None if missing"""
+        from src.models.user import User
+
+        user_id = int(user_id)
+        memo = self._request_memo()
+        if memo is not None and user_id in memo:
+            return memo[user_id]
+
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user_id)
+            if cached is not None and now - cached[1] < self.cache_ttl:
+                self._cache.move_to_end(user_id)
+                snapshot = cached[0]
+            else:
+                snapshot = None
+            generation = self._generation
+
+        if snapshot is None:
+            row = db.session.execute(
+                select(User.id, User.role, User.city, User.is_active).where(User.id == user_id)
+            ).first()
+            if row is None:
+                return None
+            snapshot = UserSnapshot(row.id, row.role, row.city, bool(row.is_active))
+            with self._lock:
+                # A change committed while this row was read must not be overwritten by it
+                if generation == self._generation:
+                    self._cache[user_id] = (snapshot, now)
+                    self._cache.move_to_end(user_id)
+                    while len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+
+        if memo is not None:
+            memo[user_id] = snapshot
+        return snapshot
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's snapshot (every snapshot when None); needed after bulk UPDATEs on users"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._cache.clear()
+            else:
+                self._cache.pop(int(user_id), None)
+        memo = self._request_memo()
+        if memo:
+            if user_id is None:
+                memo.clear()
+            else:
+                memo.pop(int(user_id), None)
+
+
+# Global user lookup service instance
+user_lookup_service = UserLookupService()
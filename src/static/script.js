@@ -5,6 +5,7 @@ class AppState {
         this.token = localStorage.getItem('token');
         this.isLoggedIn = false;
         this.notifications = [];
+        this.notificationStream = null;
         this.init();
     }
 
@@ -42,9 +43,18 @@ class AppState {
         this.isLoggedIn = true;
         this.updateUI();
         this.loadNotifications();
+        this.openNotificationStream();
     }
 
     logout() {
+        this.closeNotificationStream();
+        if (this.token) {
+            // Revoga o token no servidor; a sessão local é encerrada sem esperar a resposta
+            fetch('/api/auth/logout', {
+                method: 'POST',
+                headers: { 'Authorization': `Bearer ${this.token}` }
+            }).catch(() => {});
+        }
         this.user = null;
         this.token = null;
         this.isLoggedIn = false;
@@ -86,7 +96,7 @@ class AppState {
         if (!this.isLoggedIn) return;
 
         try {
-            const response = await fetch('/api/profile/notifications?unread_only=true', {
+            const response = await fetch('/api/notifications/unread-count', {
                 headers: {
                     'Authorization': `Bearer ${this.token}`,
                     'Content-Type': 'application/json'
@@ -102,6 +112,27 @@ class AppState {
         }
     }
 
+    openNotificationStream() {
+        // EventSource reconnects by itself and resumes with Last-Event-ID
+        if (!this.isLoggedIn || this.notificationStream || !window.EventSource) return;
+
+        const stream = new EventSource(`/api/notifications/stream?jwt=${encodeURIComponent(this.token)}`);
+        stream.addEventListener('unread', (event) => {
+            this.updateNotificationBadge(JSON.parse(event.data).unread_count);
+        });
+        stream.addEventListener('notification', (event) => {
+            this.notifications.unshift(JSON.parse(event.data));
+        });
+        this.notificationStream = stream;
+    }
+
+    closeNotificationStream() {
+        if (this.notificationStream) {
+            this.notificationStream.close();
+            this.notificationStream = null;
+        }
+    }
+
     updateNotificationBadge(count) {
         const badge = document.getElementById('notification-badge');
         if (badge) {
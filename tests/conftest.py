@@ -0,0 +1,94 @@
+import os
+import sys
+
+import pytest
+from flask import Flask
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database import db, bcrypt, jwt, upgrade_schema  # noqa: E402
+from src.models.user import User  # noqa: E402
+import src.models.complaint  # noqa: E402,F401
+import src.models.notification  # noqa: E402,F401
+import src.models.gamification  # noqa: E402,F401
+
+# Serviços usados pelos testes; os que iniciam threads (start()) não são iniciados
+SERVICES = (
+    'src.services.password_service:password_service',
+    'src.services.unread_counter_service:unread_counter_service',
+    'src.services.broadcast_service:broadcast_service',
+    'src.services.notification_service:notification_service',
+    'src.services.notification_retention_service:notification_retention_service',
+    'src.services.delivery_service:delivery_service',
+    'src.services.point_rollup_service:point_rollup_service',
+    'src.services.leaderboard_service:leaderboard_service',
+    'src.services.ranking_service:ranking_service',
+    'src.services.badge_service:badge_service',
+    'src.services.token_revocation_service:token_revocation_service',
+    'src.services.rate_limit_service:rate_limit_service',
+    'src.services.etag_service:etag_service',
+    'src.services.response_cache_service:response_cache_service',
+)
+
+
+def _service(path):
+    module, name = path.split(':')
+    return getattr(__import__(module, fromlist=[name]), name)
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Configuração da aplicação de teste; os testes podem alterá-la antes de usar ``app``"""
+    return {
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'app.db'}",
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        'JWT_SECRET_KEY': 'test-jwt-secret',
+        'BCRYPT_LOG_ROUNDS': 4,
+        'LEADERBOARD_SNAPSHOT_INTERVAL': 0,
+        'LEADERBOARD_SNAPSHOT_DIR': str(tmp_path / 'leaderboards'),
+        'NOTIFICATION_DIGEST_WINDOW': 0,
+        'RATE_LIMIT_STORAGE': str(tmp_path / 'ratelimit.db'),
+    }
+
+
+@pytest.fixture
+def app(config, tmp_path):
+    app = Flask('deuruimcidadao-tests', instance_path=str(tmp_path / 'instance'))
+    app.config.update(config)
+    db.init_app(app)
+    bcrypt.init_app(app)
+    jwt.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        upgrade_schema()
+        for path in SERVICES:
+            _service(path).init_app(app)
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def make_user(app):
+    created = []
+
+    def make_user(city='cuiaba', **fields):
+        index = len(created) + 1
+        user = User(
+            username=f"usuario{index}",
+            email=f"usuario{index}@example.com",
+            cpf=f"{index:011d}",
+            password='Senha123!',
+            city=city,
+            full_name=f"Usuário {index}"
+        )
+        for name, value in fields.items():
+            setattr(user, name, value)
+        db.session.add(user)
+        db.session.commit()
+        created.append(user)
+        return user
+
+    return make_user
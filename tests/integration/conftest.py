@@ -0,0 +1,31 @@
+import pytest
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from src.database import db, jwt
+from src.routes.admin import admin_bp
+from src.services.user_lookup_service import user_lookup_service
+
+
+@pytest.fixture
+def admin_api(app, make_user):
+    """Cliente das rotas /api/admin e o cabeçalho de autorização de um responsável"""
+    app.register_blueprint(admin_bp, url_prefix='/api')
+    jwt.user_lookup_loader(lambda jwt_header, jwt_payload: user_lookup_service.get(jwt_payload['sub']))
+    user_lookup_service.init_app(app)
+    admin = make_user(role='responsavel')
+    token = create_access_token(identity=str(admin.id))
+    return app.test_client(), {'Authorization': f"Bearer {token}"}
+
+
+@pytest.fixture
+def statements(app):
+    """SQL executado durante o teste, em minúsculas"""
+    executed = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        executed.append(statement.lower())
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', record)
@@ -0,0 +1,53 @@
+import pytest
+
+
+@pytest.fixture
+def admin_post(admin_api):
+    client, headers = admin_api
+
+    def post(path, body):
+        return client.post(f'/api/admin/{path}', json=body, headers=headers)
+
+    return post
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'year': 'dois mil'}, 'year deve ser um número inteiro'),
+    ({'year': 2025.5}, 'year deve ser um número inteiro'),
+    ({'year': 10 ** 12}, 'year deve estar entre'),
+    ({'month': 0}, 'month deve estar entre 1 e 12'),
+    ({'month': -3}, 'month deve estar entre 1 e 12'),
+    ({'month': True}, 'month deve ser um número inteiro'),
+    ([2025, 3], 'Corpo da requisição inválido'),
+])
+def test_ranking_update_rejects_invalid_periods(admin_post, body, message):
+    response = admin_post('ranking/update-all', body)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'].startswith(message)
+
+
+def test_ranking_update_accepts_a_valid_period(admin_post):
+    response = admin_post('ranking/update-all', {'year': '2025', 'month': 3})
+
+    assert response.status_code == 200
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'archive_after_months': 'seis'}, 'archive_after_months deve ser um número inteiro'),
+    ({'archive_after_months': 0}, 'archive_after_months deve estar entre 1 e 1200'),
+    ({'archive_after_months': -6}, 'archive_after_months deve estar entre 1 e 1200'),
+    ({'archive_after_months': 10 ** 9}, 'archive_after_months deve estar entre 1 e 1200'),
+])
+def test_point_compaction_rejects_invalid_archive_ages(admin_post, body, message):
+    response = admin_post('points/compact', body)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+
+def test_point_compaction_accepts_a_valid_archive_age(admin_post):
+    response = admin_post('points/compact', {'archive_after_months': '12'})
+
+    assert response.status_code == 200
+    assert response.get_json()['result']['archived_rows'] == 0
@@ -0,0 +1,24 @@
+import pytest
+
+from src.routes.admin import STATS_ENDPOINTS
+from src.routes.notifications import notifications_bp
+from src.services.admission_service import admission_service
+
+
+@pytest.mark.parametrize('path', sorted(STATS_ENDPOINTS))
+def test_stats_endpoints_answer_under_their_key(admin_api, path):
+    client, headers = admin_api
+
+    response = client.get(f'/api/admin/{path}', headers=headers)
+
+    assert response.status_code == 200
+    assert list(response.get_json()) == [STATS_ENDPOINTS[path][0]]
+
+
+def test_stats_endpoints_and_the_stream_are_exempt_from_shedding(app, admin_api):
+    app.register_blueprint(notifications_bp, url_prefix='/api/notifications')
+    endpoints = {f"admin.{key}_stats" for key, _, _ in STATS_ENDPOINTS.values()}
+
+    assert endpoints <= set(app.view_functions)
+    assert all(admission_service.exempt(endpoint) for endpoint in endpoints | {'notifications.stream_notifications'})
+    assert not admission_service.exempt('admin.update_all_rankings')
@@ -0,0 +1,58 @@
+import pytest
+
+from src.database import db
+from src.models.complaint import Complaint
+from src.models.gamification import Badge, PointHistory, UserBadge
+from src.services.badge_service import BadgeService
+
+
+@pytest.fixture
+def engajado(app):
+    badge = Badge(name='Engajado', description='Criou 5 denúncias', icon='star',
+                  category='activity', requirement=5)
+    db.session.add(badge)
+    db.session.commit()
+    return badge
+
+
+def _worker(app):
+    service = BadgeService()
+    service.init_app(app)
+    return service
+
+
+def _complaint_created(worker, user):
+    db.session.add(Complaint(
+        title='Buraco', description='Buraco grande', category='infraestrutura',
+        city=user.city, user_id=user.id
+    ))
+    record = PointHistory.create_record(user.id, 10, 'complaint_created')
+    db.session.commit()
+    return worker.handle_event(user.id, 'complaint_created', record_id=record.id)
+
+
+def test_counters_follow_actions_handled_by_other_workers(app, make_user, engajado):
+    user = make_user()
+    first, second = _worker(app), _worker(app)
+
+    for worker in (first, first, second, second):
+        assert _complaint_created(worker, user) == []
+
+    # O primeiro worker não viu as duas denúncias tratadas pelo segundo
+    assert _complaint_created(first, user) == ['Engajado']
+    assert UserBadge.query.filter_by(user_id=user.id).count() == 1
+
+
+def test_cached_counters_are_advanced_without_reloading(app, make_user, engajado, monkeypatch):
+    user = make_user()
+    worker = _worker(app)
+    _complaint_created(worker, user)
+
+    loads = []
+    load_state = worker._load_state
+    monkeypatch.setattr(worker, '_load_state', lambda user_id: loads.append(user_id) or load_state(user_id))
+    for _ in range(4):
+        _complaint_created(worker, user)
+
+    assert loads == []
+    assert worker._states[user.id].counters['complaints'] == 5
@@ -0,0 +1,53 @@
+from src.database import db
+from src.models.complaint import Complaint, Vote
+from src.models.notification import Notification, NotificationDelivery
+from src.services.notification_service import notification_service
+
+
+def _complaint(author, *voters):
+    complaint = Complaint(title='Buraco na rua', description='Buraco grande', category='infraestrutura',
+                          city=author.city, user_id=author.id)
+    db.session.add(complaint)
+    db.session.flush()
+    db.session.add_all([Vote(user_id=voter.id, complaint_id=complaint.id) for voter in voters])
+    db.session.commit()
+    return complaint
+
+
+def test_response_notifies_author_and_active_voters(admin_api, make_user, statements):
+    client, headers = admin_api
+    author = make_user()
+    voter = make_user()
+    silent_voter = make_user(email_notifications=False)
+    inactive_voter = make_user(is_active=False)
+    complaint = _complaint(author, voter, silent_voter, inactive_voter)
+
+    statements.clear()
+    response = client.post(f'/api/admin/complaints/{complaint.id}/respond', headers=headers,
+                           json={'message': 'Equipe enviada ao local', 'status': 'respondida'})
+    assert response.status_code == 201
+    assert len([sql for sql in statements if 'from vote' in sql]) == 1
+
+    notifications = {n.user_id: n for n in Notification.query.filter_by(complaint_id=complaint.id)}
+    assert set(notifications) == {author.id, voter.id, silent_voter.id}
+    assert notifications[author.id].template_key == 'complaint:new_response'
+    assert notifications[voter.id].template_key == 'supporter:new_response'
+    assert 'que você apoiou' in notifications[voter.id].get_message()
+    assert 'Equipe enviada ao local' in notifications[voter.id].get_message()
+
+    deliveries = {(d.user_id, d.channel) for d in NotificationDelivery.query}
+    assert deliveries == {(author.id, 'email'), (voter.id, 'email')}
+    assert notification_service.get_unread_count(voter.id) == 1
+
+
+def test_notifications_are_written_in_chunks(app, make_user):
+    notification_service.bulk_chunk_size = 2
+    author = make_user()
+    voters = [make_user() for _ in range(4)]
+    complaint = _complaint(author, *voters)
+
+    assert notification_service.queue_complaint_notifications(complaint.id, 'complaint_resolved') == 5
+    db.session.commit()
+
+    assert Notification.query.filter_by(complaint_id=complaint.id).count() == 5
+    assert NotificationDelivery.query.count() == 5
@@ -0,0 +1,218 @@
+"""Outbox de notificações contra um servidor SMTP local (aiosmtpd) e um endpoint WhatsApp falso"""
+
+import email
+import json
+import socket
+import threading
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+aiosmtpd_controller = pytest.importorskip('aiosmtpd.controller')
+
+from src.database import db  # noqa: E402
+from src.models.notification import Notification, NotificationDelivery  # noqa: E402
+from src.services.delivery_service import delivery_service  # noqa: E402
+from src.services.notification_service import notification_service  # noqa: E402
+
+MAX_ATTEMPTS = 3
+RETRY_BASE_SECONDS = 30
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class RecordingHandler:
+    """Aceita ou recusa (554) as mensagens, guardando as aceitas"""
+
+    def __init__(self):
+        self.messages = []
+        self.reject = False
+
+    async def handle_DATA(self, server, session, envelope):
+        if self.reject:
+            return '554 5.6.0 Mensagem recusada'
+        self.messages.append(envelope)
+        return '250 OK'
+
+
+class FakeWhatsApp(BaseHTTPRequestHandler):
+    payloads = []
+    status = 200
+
+    def do_POST(self):
+        length = int(self.headers['Content-Length'])
+        FakeWhatsApp.payloads.append(json.loads(self.rfile.read(length)))
+        self.send_response(FakeWhatsApp.status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def smtp_handler():
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname='127.0.0.1', port=_free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def whatsapp_url():
+    FakeWhatsApp.payloads = []
+    FakeWhatsApp.status = 200
+    server = HTTPServer(('127.0.0.1', 0), FakeWhatsApp)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/send"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def config(config, smtp_handler, whatsapp_url):
+    _, port = smtp_handler
+    config.update({
+        'NOTIFICATION_DELIVERY_MODE': 'live',
+        'SMTP_SERVER': '127.0.0.1',
+        'SMTP_PORT': port,
+        'SMTP_USE_TLS': False,
+        'WHATSAPP_API_URL': whatsapp_url,
+        'NOTIFICATION_MAX_ATTEMPTS': MAX_ATTEMPTS,
+        'NOTIFICATION_RETRY_BASE_SECONDS': RETRY_BASE_SECONDS,
+    })
+    return config
+
+
+@pytest.fixture
+def handler(app, smtp_handler):
+    yield smtp_handler[0]
+    notification_service.email_transport.close()
+    notification_service.whatsapp_transport.close()
+
+
+def _queue_welcome(user):
+    notification = notification_service.queue_system_notification(user.id, 'welcome')
+    db.session.commit()
+    return notification
+
+
+def _delivery(channel='email'):
+    db.session.expire_all()
+    return NotificationDelivery.query.filter_by(channel=channel).one()
+
+
+def _make_due(delivery):
+    delivery.next_attempt_at = datetime.utcnow() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_sends_queued_email_and_marks_notification(handler, make_user):
+    user = make_user()
+    notification = _queue_welcome(user)
+    assert _delivery().status == 'pending'
+
+    assert delivery_service.process_batch('test') == 1
+
+    assert [envelope.rcpt_tos for envelope in handler.messages] == [[user.email]]
+    delivery = _delivery()
+    assert delivery.status == 'sent'
+    assert delivery.attempts == 1
+    assert delivery.lease_owner is None
+    assert db.session.get(Notification, notification.id).sent_email is True
+
+
+def test_rejected_email_is_retried_with_backoff(handler, make_user):
+    user = make_user()
+    _queue_welcome(user)
+    handler.reject = True
+
+    before = datetime.utcnow()
+    assert delivery_service.process_batch('test') == 1
+
+    delivery = _delivery()
+    assert delivery.status == 'pending'
+    assert delivery.attempts == 1
+    assert '554' in delivery.last_error
+    # Uma recusa não é queda de conexão: sem reconexão nem reenvio
+    assert notification_service.email_transport.stats.reconnects == 0
+    # Primeira espera: a base com ±20% de variação
+    delay = (delivery.next_attempt_at - before).total_seconds()
+    assert RETRY_BASE_SECONDS * 0.8 - 1 <= delay <= RETRY_BASE_SECONDS * 1.2 + 1
+    # Ainda esperando: nada a enviar
+    assert delivery_service.process_batch('test') == 0
+
+    handler.reject = False
+    _make_due(delivery)
+    assert delivery_service.process_batch('test') == 1
+    assert _delivery().status == 'sent'
+    assert len(handler.messages) == 1
+
+
+def test_exhausted_email_moves_to_dead_letter_and_can_be_requeued(handler, make_user):
+    user = make_user()
+    _queue_welcome(user)
+    handler.reject = True
+
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        assert delivery_service.process_batch('test') == 1
+        delivery = _delivery()
+        assert delivery.attempts == attempt
+        if attempt < MAX_ATTEMPTS:
+            assert delivery.status == 'pending'
+            _make_due(delivery)
+
+    assert delivery.status == 'dead'
+    assert delivery_service.process_batch('test') == 0
+
+    handler.reject = False
+    assert delivery_service.retry_dead() == 1
+    assert delivery_service.process_batch('test') == 1
+    assert _delivery().status == 'sent'
+
+
+def test_whatsapp_goes_to_the_api(handler, make_user):
+    user = make_user(phone='(65) 99999-0000', whatsapp_notifications=True, email_notifications=False)
+    notification = _queue_welcome(user)
+
+    assert delivery_service.process_batch('test') == 1
+
+    assert [payload['phone'] for payload in FakeWhatsApp.payloads] == ['5565999990000']
+    assert _delivery('whatsapp').status == 'sent'
+    assert db.session.get(Notification, notification.id).sent_whatsapp is True
+
+
+def test_whatsapp_error_is_retried(handler, make_user):
+    user = make_user(phone='65999990000', whatsapp_notifications=True, email_notifications=False)
+    _queue_welcome(user)
+    FakeWhatsApp.status = 500
+
+    assert delivery_service.process_batch('test') == 1
+
+    delivery = _delivery('whatsapp')
+    assert delivery.status == 'pending'
+    assert '500' in delivery.last_error
+
+
+def test_outbox_keeps_no_copy_of_the_message(handler, make_user):
+    user = make_user(phone='65999990000', whatsapp_notifications=True)
+    notification = _queue_welcome(user)
+    # O corpo do email é a mensagem da notificação, gerada no envio
+    assert _delivery('email').body == ''
+    assert _delivery('whatsapp').body != ''
+
+    assert delivery_service.process_batch('test') == 2
+
+    sent = email.message_from_bytes(handler.messages[0].content)
+    text = next(part for part in sent.walk() if part.get_content_type() == 'text/plain')
+    assert text.get_payload(decode=True).decode('utf-8') == db.session.get(Notification, notification.id).get_message()
+    assert [(delivery.status, delivery.body) for delivery in NotificationDelivery.query.order_by('channel')] == [
+        ('sent', ''), ('sent', '')
+    ]
@@ -0,0 +1,160 @@
+import threading
+from datetime import datetime
+
+import pytest
+
+from src.database import db
+from src.models.gamification import CityRanking, PointHistory
+from src.services.leaderboard_service import Leaderboard, LeaderboardService
+
+
+@pytest.fixture
+def leaderboards(app):
+    service = LeaderboardService()
+    service.init_app(app)
+    return service
+
+
+def _award(user, points, created_at=None):
+    record = PointHistory.create_record(user.id, points, 'teste')
+    if created_at is not None:
+        record.created_at = created_at
+    db.session.commit()
+    return record
+
+
+def test_rank_follows_rank_semantics():
+    board = Leaderboard('cuiaba', 2026, 1)
+    for user_id, points in [(1, 50), (2, 80), (3, 50), (4, 10)]:
+        board.add_points(user_id, points)
+
+    assert [board.rank(user_id) for user_id in (1, 2, 3, 4)] == [2, 1, 2, 4]
+    assert board.slice(1, 4) == [
+        {'user_id': 2, 'points': 80, 'rank_position': 1},
+        {'user_id': 1, 'points': 50, 'rank_position': 2},
+        {'user_id': 3, 'points': 50, 'rank_position': 2},
+        {'user_id': 4, 'points': 10, 'rank_position': 4},
+    ]
+
+    board.add_points(4, 100)
+    assert board.rank(4) == 1
+    assert board.rank(2) == 2
+
+
+def test_negative_and_large_scores():
+    board = Leaderboard('cuiaba', 2026, 1)
+    board.add_points(1, -30)
+    board.add_points(2, 5000)
+    board.add_points(3, 0)
+
+    assert [entry['user_id'] for entry in board.slice(1, 3)] == [2, 3, 1]
+    assert board.rank(1) == 3
+
+
+def test_out_of_order_commits_are_all_counted(leaderboards, make_user):
+    user, other = make_user(), make_user()
+    board = leaderboards.get_board('cuiaba')
+
+    first = _award(user, 10)
+    second = _award(other, 20)
+    # The hook of the higher id runs first
+    leaderboards.record_points(second, 'cuiaba')
+    leaderboards.record_points(first, 'cuiaba')
+
+    assert board.scores == {user.id: 10, other.id: 20}
+
+
+def test_records_are_not_counted_twice(leaderboards, make_user):
+    user = make_user()
+    board = leaderboards.get_board('cuiaba')
+    record = _award(user, 10)
+    leaderboards.record_points(record, 'cuiaba')
+    leaderboards.record_points(record, 'cuiaba')
+
+    leaderboards._catch_up(board)
+
+    assert board.scores == {user.id: 10}
+
+
+def test_points_from_other_workers_are_synced(leaderboards, make_user):
+    user = make_user()
+    worker = leaderboards
+    worker.sync_interval = 0
+    board = worker.get_board('cuiaba')
+
+    # Committed by another process: this worker's hook never runs
+    _award(user, 15)
+    assert worker.get_board('cuiaba') is board
+    assert board.scores == {user.id: 15}
+    assert worker.get_user_rank(user.id, 'cuiaba')['rank_position'] == 1
+
+
+def test_settled_rows_advance_the_watermark(leaderboards, make_user):
+    user = make_user()
+    now = datetime.utcnow()
+    old = _award(user, 5, created_at=now.replace(day=1, hour=0, minute=0, second=1))
+    recent = _award(user, 7)
+
+    board = leaderboards.get_board('cuiaba')
+
+    assert board.scores == {user.id: 12}
+    assert board.last_history_id >= old.id
+    assert recent.id in board.applied
+
+
+def test_snapshot_round_trip_keeps_applied_ids(leaderboards, make_user):
+    user = make_user()
+    board = leaderboards.get_board('cuiaba')
+    record = _award(user, 10)
+    leaderboards.record_points(record, 'cuiaba')
+    leaderboards.snapshot_all()
+
+    reloaded = LeaderboardService()
+    reloaded.init_app(leaderboards.app)
+    fresh = reloaded.get_board('cuiaba')
+
+    assert fresh.scores == board.scores == {user.id: 10}
+
+
+def test_a_cold_load_does_not_hold_up_other_cities(leaderboards, make_user):
+    user = make_user()
+    _award(user, 10)
+    loading, release = threading.Event(), threading.Event()
+    load = leaderboards._load
+
+    def slow_load(city, year, month):
+        if city == 'sinop':
+            loading.set()
+            release.wait(5)
+            return Leaderboard(city, year, month)
+        return load(city, year, month)
+
+    leaderboards._load = slow_load
+    loader = threading.Thread(target=leaderboards.get_board, args=('sinop',))
+    loader.start()
+    try:
+        assert loading.wait(5)
+        # Answered while sinop is still loading
+        assert leaderboards.get_top('cuiaba') == [{'user_id': user.id, 'points': 10, 'rank_position': 1}]
+        assert loader.is_alive()
+    finally:
+        release.set()
+        loader.join(5)
+
+
+def test_one_worker_writes_city_rankings(leaderboards, make_user):
+    user = make_user()
+    other_worker = LeaderboardService()
+    other_worker.init_app(leaderboards.app)
+    leaderboards.get_board('cuiaba')
+    other_worker.get_board('cuiaba')
+    # Committed after both boards were loaded, by a third process
+    _award(user, 10)
+
+    assert leaderboards._is_persist_writer()
+    assert not other_worker._is_persist_writer()
+    other_worker.flush()
+    assert CityRanking.query.count() == 0
+
+    leaderboards.flush()
+    assert [(row.user_id, row.points) for row in CityRanking.query.all()] == [(user.id, 10)]
@@ -0,0 +1,53 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.routes.notifications import notifications_bp
+
+
+@pytest.fixture
+def retention(app, admin_api, make_user):
+    app.register_blueprint(notifications_bp)
+    client, _ = admin_api
+    manager = make_user(role='gestor_publico')
+    headers = {'Authorization': f"Bearer {create_access_token(identity=str(manager.id))}"}
+    return lambda body: client.post('/api/notifications/admin/retention', json=body, headers=headers)
+
+
+@pytest.mark.parametrize('body, message', [
+    ({'max_batches': 'todos'}, 'max_batches deve ser um número inteiro'),
+    ({'max_batches': 2.5}, 'max_batches deve ser um número inteiro'),
+    ({'max_batches': -1}, 'max_batches deve estar entre 1 e 10000'),
+    ({'max_batches': 0}, 'max_batches deve estar entre 1 e 10000'),
+    ({'max_batches': 10 ** 9}, 'max_batches deve estar entre 1 e 10000'),
+])
+def test_retention_rejects_invalid_batch_limits(retention, body, message):
+    response = retention(body)
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
+
+
+def test_retention_runs_with_a_batch_limit(retention):
+    response = retention({'max_batches': '3', 'mode': 'delete'})
+
+    assert response.status_code == 200
+    assert response.get_json()['report']['removed'] == 0
+
+
+@pytest.mark.parametrize('batch_size, message', [
+    ('quinhentos', 'batch_size deve ser um número inteiro'),
+    (0, 'batch_size deve estar entre 1 e 5000'),
+    (10 ** 9, 'batch_size deve estar entre 1 e 5000'),
+])
+def test_message_migration_rejects_invalid_batch_sizes(app, admin_api, make_user, batch_size, message):
+    app.register_blueprint(notifications_bp)
+    client, _ = admin_api
+    manager = make_user(role='gestor_publico')
+
+    response = client.post(
+        '/api/notifications/admin/migrate-messages', json={'batch_size': batch_size},
+        headers={'Authorization': f"Bearer {create_access_token(identity=str(manager.id))}"}
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()['message'] == message
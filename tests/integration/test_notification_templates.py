@@ -0,0 +1,70 @@
+from datetime import datetime
+
+import pytest
+
+from src.database import db
+from src.models.complaint import Complaint
+from src.models.notification import Notification
+from src.services.notification_service import notification_service
+from src.services.notification_templates import template_registry
+
+
+@pytest.fixture
+def complaint(make_user):
+    user = make_user()
+    complaint = Complaint(
+        title='Buraco na rua', description='Buraco grande', category='infraestrutura',
+        city=user.city, user_id=user.id
+    )
+    db.session.add(complaint)
+    db.session.commit()
+    return complaint
+
+
+def _notification(complaint, notification_type, message, **fields):
+    notification = Notification(
+        user_id=complaint.user_id, complaint_id=complaint.id, type=notification_type,
+        title='Atualização', message=message, created_at=datetime(2025, 3, 1, 10, 30), **fields
+    )
+    db.session.add(notification)
+    db.session.commit()
+    return notification
+
+
+def _rendered(complaint, notification_type, **extra):
+    return template_registry.render_all(
+        'complaint', notification_type, now=datetime(2025, 3, 1, 10, 30),
+        user=complaint.user, complaint=complaint, extra=extra
+    ).email_body
+
+
+def test_stored_row_that_no_longer_renders_falls_back_to_the_title(complaint):
+    # Parâmetros gravados antes de o template passar a ler complaint.*
+    notification = _notification(
+        complaint, 'status_updated', '', template_key='complaint:status_updated', template_params='{"user":{}}'
+    )
+
+    assert notification.to_dict()['message'] == 'Atualização'
+
+
+def test_migration_recovers_extra_data_and_reports_what_it_left(complaint):
+    expected = {
+        _notification(complaint, 'priority_updated', _rendered(complaint, 'priority_updated')).id: {},
+        _notification(
+            complaint, 'status_updated', _rendered(complaint, 'status_updated', admin_message='Equipe enviada')
+        ).id: {'admin_message': 'Equipe enviada'}
+    }
+    unknown_id = _notification(complaint, 'response_added', 'Nova resposta').id
+    edited_id = _notification(complaint, 'priority_updated', 'Texto de um template antigo').id
+    complaint_id = complaint.id
+
+    report = notification_service.migrate_stored_messages()
+
+    assert report['converted'] == 2
+    assert report['unconverted'] == {'unknown_type': 1, 'text_mismatch': 1}
+    assert report['unconverted_ids'] == [unknown_id, edited_id]
+    complaint = db.session.get(Complaint, complaint_id)
+    for notification_id, extra in expected.items():
+        stored = db.session.get(Notification, notification_id)
+        assert stored.message == ''
+        assert stored.get_message() == _rendered(complaint, stored.type, **extra)
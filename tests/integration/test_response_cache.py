@@ -0,0 +1,113 @@
+import pytest
+from flask import Flask, jsonify
+from sqlalchemy import update
+
+from src.database import db
+from src.models.complaint import Complaint, ComplaintVersion, Vote
+from src.routes.complaints import complaints_bp
+from src.services.response_cache_service import cached, city_tag, response_cache_service
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(app):
+    response_cache_service.clear()
+    yield
+    response_cache_service.clear()
+
+
+def _complaint(user, city='cuiaba', title='Buraco na rua'):
+    complaint = Complaint(
+        title=title, description='Buraco grande', category='infraestrutura',
+        city=city, user_id=user.id
+    )
+    db.session.add(complaint)
+    db.session.commit()
+    return complaint
+
+
+@pytest.fixture
+def counted():
+    app = Flask(__name__)
+    calls = []
+
+    @app.route('/items')
+    @cached(tags=lambda: ['items'])
+    def items():
+        calls.append(1)
+        return jsonify({'calls': len(calls)})
+
+    return app.test_client(), calls
+
+
+def test_hit_after_miss_and_invalidation_by_tag(app, counted):
+    client, calls = counted
+
+    first = client.get('/items')
+    second = client.get('/items?')
+    assert (first.headers['X-Cache'], second.headers['X-Cache']) == ('MISS', 'HIT')
+    assert second.json == first.json and len(calls) == 1
+
+    assert response_cache_service.invalidate(['items']) == 1
+    assert client.get('/items').headers['X-Cache'] == 'MISS'
+    assert len(calls) == 2
+
+
+def test_expired_entries_are_served_stale_while_refreshing(app, counted):
+    client, calls = counted
+    client.get('/items')
+    response_cache_service.ttl = 0
+    try:
+        assert client.get('/items').headers['X-Cache'] == 'STALE'
+    finally:
+        response_cache_service.ttl = 15
+
+
+@pytest.fixture
+def api(app):
+    app.register_blueprint(complaints_bp, url_prefix='/api')
+    return app.test_client()
+
+
+def test_commits_invalidate_the_city_of_the_change(api, make_user):
+    user = make_user()
+    complaint = _complaint(user)
+
+    assert api.get('/api/complaints?city=cuiaba').headers['X-Cache'] == 'MISS'
+    assert api.get('/api/complaints?city=cuiaba').headers['X-Cache'] == 'HIT'
+    assert api.get('/api/complaints?city=sinop').headers['X-Cache'] == 'MISS'
+
+    db.session.add(Vote(user_id=user.id, complaint_id=complaint.id))
+    db.session.commit()
+
+    assert api.get('/api/complaints?city=cuiaba').headers['X-Cache'] == 'MISS'
+    assert api.get('/api/complaints?city=sinop').headers['X-Cache'] == 'HIT'
+    assert response_cache_service.get_stats()['entries'] == 2
+
+
+def test_write_from_another_worker_is_never_served_under_the_new_etag(api, make_user):
+    user = make_user()
+    _complaint(user)
+    first = api.get('/api/complaints?city=cuiaba')
+    assert first.headers['X-Cache'] == 'MISS'
+
+    # Another worker adds a complaint: the shared version moves, this process's cache is not invalidated
+    with db.engine.begin() as conn:
+        conn.execute(Complaint.__table__.insert().values(
+            title='Poste apagado', description='Sem luz', category='iluminacao', city='cuiaba', user_id=user.id
+        ))
+        conn.execute(update(ComplaintVersion).where(ComplaintVersion.city == 'cuiaba').values(
+            version=ComplaintVersion.version + 1
+        ))
+
+    second = api.get('/api/complaints?city=cuiaba')
+    assert second.headers['X-Cache'] == 'MISS'
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert len(second.json['complaints']) == 2
+
+    # The client revalidating with the new ETag gets a 304 for the new body
+    assert api.get('/api/complaints?city=cuiaba', headers={'If-None-Match': second.headers['ETag']}).status_code == 304
+
+
+def test_tag_helpers():
+    assert city_tag('Cuiaba') == 'city:cuiaba'
+    assert city_tag(None) == 'city:cuiaba'
@@ -0,0 +1,64 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.database import db
+from src.models.user import RevokedToken
+from src.services.token_revocation_service import TokenRevocationService
+
+
+@pytest.fixture
+def revocations(app):
+    return TokenRevocationService(app)
+
+
+def test_database_broker_by_default(revocations):
+    assert revocations.broker == 'database'
+
+
+def test_revoked_until_the_token_expires(revocations):
+    revocations.revoke('jti-1', time.time() + 60)
+
+    assert revocations.is_revoked('jti-1')
+    assert not revocations.is_revoked('jti-2')
+    assert RevokedToken.query.filter_by(jti='jti-1').count() == 1
+
+
+def test_already_expired_tokens_are_not_stored(revocations):
+    revocations.revoke('jti-1', time.time() - 1)
+
+    assert not revocations.is_revoked('jti-1')
+    assert RevokedToken.query.count() == 0
+
+
+def test_other_workers_see_the_revocation_after_polling(app, revocations):
+    other_worker = TokenRevocationService(app)
+    revocations.revoke('jti-1', time.time() + 60)
+
+    assert not other_worker.is_revoked('jti-1')
+    other_worker._poll()
+    assert other_worker.is_revoked('jti-1')
+
+
+def test_revocations_survive_a_restart(app, revocations):
+    revocations.revoke('jti-1', time.time() + 60)
+
+    restarted = TokenRevocationService(app)
+    assert restarted.load() == 1
+    assert restarted.is_revoked('jti-1')
+
+
+def test_sweep_forgets_expired_revocations(revocations):
+    revocations.revoke('jti-1', time.time() + 60)
+    db.session.add(RevokedToken(
+        jti='jti-old', token_type='access',
+        expires_at=datetime.utcnow() - timedelta(minutes=1), revoked_at=datetime.utcnow()
+    ))
+    db.session.commit()
+    revocations._revoked['jti-gone'] = time.time() - 1
+
+    assert revocations.sweep() == 1
+    assert 'jti-gone' not in revocations._revoked
+    assert revocations.is_revoked('jti-1')
+    assert [row.jti for row in RevokedToken.query.all()] == ['jti-1']
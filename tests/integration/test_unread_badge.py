@@ -0,0 +1,29 @@
+from src.database import db
+from src.models.notification import Notification
+from src.services.broadcast_service import broadcast_service
+from src.services.notification_service import notification_service
+
+
+def test_badge_with_broadcasts_is_served_from_the_cache(make_user, statements):
+    user = make_user()
+    Notification.create_notification(user.id, 'system', 'Aviso', 'Mensagem')
+    broadcast_service.send('all', title='Aviso geral', message='Para todos')
+    assert notification_service.get_unread_count(user.id) == 2
+
+    statements.clear()
+    assert notification_service.get_unread_count(user.id) == 2
+    assert statements == []
+
+
+def test_reading_broadcasts_and_moving_city_refresh_the_cached_recipient(make_user):
+    user = make_user()
+    broadcast_service.send('city', audience_value='sinop', title='Aviso', message='Só para Sinop')
+    broadcast_service.send('all', title='Aviso geral', message='Para todos')
+    assert notification_service.get_unread_count(user.id) == 1
+
+    user.city = 'sinop'
+    db.session.commit()
+    assert notification_service.get_unread_count(user.id) == 2
+
+    broadcast_service.mark_as_read(user.id)
+    assert notification_service.get_unread_count(user.id) == 0
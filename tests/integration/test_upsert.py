@@ -0,0 +1,94 @@
+from datetime import datetime
+
+import pytest
+
+import src.database
+from src.database import db, upsert
+from src.models.complaint import Complaint, ComplaintVersion
+from src.models.gamification import CityRanking
+from src.models.notification import NotificationCounter
+from src.services.broadcast_service import broadcast_service
+from src.services.etag_service import etag_service
+from src.services.ranking_service import upsert_city_rankings
+from src.services.unread_counter_service import unread_counter_service
+
+
+@pytest.fixture(params=['on_conflict', 'portable'])
+def dialect_path(request, monkeypatch):
+    if request.param == 'portable':
+        # Como num banco sem INSERT ... ON CONFLICT (MySQL, SQL Server...)
+        monkeypatch.setattr(src.database, '_ON_CONFLICT_INSERT', {})
+    return request.param
+
+
+def _versions():
+    return dict(db.session.query(ComplaintVersion.city, ComplaintVersion.version).all())
+
+
+def test_inserts_new_keys_and_updates_existing_ones(app, dialect_path):
+    table = ComplaintVersion.__table__
+
+    def bump(cities):
+        upsert(table, [{'city': city, 'version': 1} for city in cities], key=['city'],
+               updates=lambda new: {'version': table.c.version + new.version})
+        db.session.commit()
+
+    bump(['cuiaba'])
+    bump(['cuiaba', 'sinop'])
+
+    assert _versions() == {'cuiaba': 2, 'sinop': 1}
+
+
+def test_complaint_commits_bump_versions_inside_the_flush(app, make_user, dialect_path):
+    user = make_user()
+    before = etag_service.versions('cuiaba')
+
+    db.session.add(Complaint(title='Buraco na rua', description='Buraco grande', category='infraestrutura',
+                             city='cuiaba', user_id=user.id))
+    db.session.commit()
+
+    assert etag_service.versions('cuiaba') != before
+    assert _versions()['cuiaba'] >= 1
+
+
+def test_city_rankings_are_replaced_per_user_and_month(app, make_user, dialect_path):
+    first, second = make_user(), make_user()
+
+    def rank(points_by_user):
+        now = datetime.utcnow()
+        ordered = sorted(points_by_user.items(), key=lambda item: -item[1])
+        upsert_city_rankings([{
+            'city': 'cuiaba', 'user_id': user.id, 'points': points, 'rank_position': position,
+            'month': 3, 'year': 2025, 'created_at': now, 'updated_at': now
+        } for position, (user, points) in enumerate(ordered, start=1)])
+        db.session.commit()
+
+    rank({first: 50})
+    rank({first: 50, second: 80})
+
+    rows = {row.user_id: (row.points, row.rank_position) for row in CityRanking.query.all()}
+    assert rows == {first.id: (50, 2), second.id: (80, 1)}
+
+
+def test_unread_counters_never_go_below_zero(app, make_user, dialect_path):
+    user = make_user()
+
+    unread_counter_service.apply({user.id: 2})
+    db.session.commit()
+    unread_counter_service.apply({user.id: -5})
+    db.session.commit()
+
+    assert db.session.get(NotificationCounter, user.id).unread_count == 0
+
+
+def test_broadcast_watermark_only_moves_forward(app, make_user, dialect_path):
+    user = make_user()
+    first = broadcast_service.send('all', title='Aviso 1', message='Primeiro aviso').id
+    second = broadcast_service.send('all', title='Aviso 2', message='Segundo aviso').id
+
+    assert broadcast_service.mark_as_read(user.id) == 2
+    broadcast_service._advance_watermark(user.id, first)
+    db.session.commit()
+
+    assert db.session.get(NotificationCounter, user.id).broadcast_read_id == second
+    assert broadcast_service.unseen_count(user.id) == 0
@@ -0,0 +1,49 @@
+import pytest
+from flask_jwt_extended import create_access_token
+
+from src.models.notification import Notification
+from src.routes.user_profile import profile_bp
+from src.services.availability_service import availability_service
+
+
+def test_email_taken_by_another_worker_is_a_conflict(app, make_user, monkeypatch):
+    app.register_blueprint(profile_bp, url_prefix='/api')
+    first = make_user()
+    second = make_user()
+    # Filtro ainda não atualizado: o email do outro usuário parece livre
+    monkeypatch.setattr(availability_service, 'is_taken', lambda field, value: False)
+
+    token = create_access_token(identity=str(second.id))
+    response = app.test_client().put(
+        '/api/profile',
+        json={'email': first.email},
+        headers={'Authorization': f"Bearer {token}"}
+    )
+
+    assert response.status_code == 409
+    assert response.get_json()['message'] == 'Email já está em uso'
+
+
+@pytest.mark.parametrize('unread_only, expected', [
+    ('true', {'page': 1, 'pages': 2, 'per_page': 2, 'total': 3, 'has_next': True, 'has_prev': False}),
+    ('false', {'page': 1, 'per_page': 2, 'has_more': True, 'has_next': True, 'has_prev': False}),
+])
+def test_notification_list_is_paginated_without_counting(app, make_user, statements, unread_only, expected):
+    app.register_blueprint(profile_bp, url_prefix='/api')
+    user = make_user()
+    for index in range(3):
+        Notification.create_notification(user.id, 'system', f"Aviso {index}", 'Mensagem')
+    statements.clear()
+
+    token = create_access_token(identity=str(user.id))
+    response = app.test_client().get(
+        f"/api/profile/notifications?unread_only={unread_only}&per_page=2",
+        headers={'Authorization': f"Bearer {token}"}
+    )
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['pagination'] == expected
+    assert body['unread_count'] == 3
+    assert len(body['notifications']) == 2
+    assert not [statement for statement in statements if 'count(' in statement]
@@ -0,0 +1,16 @@
+import pytest
+from flask import Flask
+
+from src.services.notification_stream_service import NotificationStreamService
+
+
+@pytest.mark.parametrize('workers, broker', [(1, 'memory'), (4, 'database')])
+def test_shared_broker_by_default_with_several_workers(workers, broker):
+    app = Flask(__name__)
+    app.config['WORKER_PROCESSES'] = workers
+    service = NotificationStreamService()
+    # Keep this instance off the global session hooks
+    service._listening = True
+    service.init_app(app)
+
+    assert service.broker == broker
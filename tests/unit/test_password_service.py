@@ -0,0 +1,23 @@
+import pytest
+from flask import Flask
+
+from src.services import password_service as password_module
+from src.services.password_service import PasswordService
+
+
+@pytest.mark.parametrize('processes, workers, queue_size', [(1, 8, 32), (4, 2, 8), (16, 1, 4)])
+def test_worker_processes_share_the_cores(monkeypatch, processes, workers, queue_size):
+    monkeypatch.setattr(password_module.os, 'cpu_count', lambda: 8)
+    app = Flask(__name__)
+    app.config['WORKER_PROCESSES'] = processes
+    service = PasswordService(app)
+
+    assert (service.workers, service.queue_size) == (workers, queue_size)
+
+
+def test_configured_workers_win(monkeypatch):
+    monkeypatch.setattr(password_module.os, 'cpu_count', lambda: 8)
+    app = Flask(__name__)
+    app.config.update(WORKER_PROCESSES=4, PASSWORD_HASH_WORKERS=3)
+
+    assert PasswordService(app).workers == 3
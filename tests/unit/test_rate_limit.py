@@ -0,0 +1,83 @@
+import pytest
+from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from src.services.rate_limit_service import (
+    MemoryBuckets, RateLimit, RateLimitService, SQLiteBuckets, rate_limit, rate_limit_service
+)
+
+
+def test_bucket_allows_burst_then_refills():
+    limit = RateLimit('60/minute', burst=3)
+    buckets = MemoryBuckets(100)
+
+    assert [buckets.take('k', limit, 0.0)[0] for _ in range(4)] == [True, True, True, False]
+    # One token per second
+    assert buckets.take('k', limit, 1.0)[0] is True
+    assert buckets.take('k', limit, 1.0)[0] is False
+
+
+def test_memory_buckets_drop_least_recently_used_keys():
+    limit = RateLimit('1/minute')
+    buckets = MemoryBuckets(2)
+    for key in ('a', 'b', 'c'):
+        buckets.take(key, limit, 0.0)
+
+    assert buckets.size() == 2
+    # 'a' was dropped, so it comes back with a full bucket
+    assert buckets.take('a', limit, 0.0)[0] is True
+
+
+def test_sqlite_buckets_are_shared_between_workers(tmp_path):
+    limit = RateLimit('2/minute')
+    path = str(tmp_path / 'buckets.db')
+    first, second = SQLiteBuckets(path), SQLiteBuckets(path)
+
+    assert first.take('k', limit, 0.0)[0] is True
+    assert second.take('k', limit, 0.0)[0] is True
+    assert first.take('k', limit, 0.0)[0] is False
+    assert second.size() == 1
+
+
+@pytest.mark.parametrize('workers, broker', [(1, 'memory'), (4, 'sqlite')])
+def test_shared_broker_by_default_with_several_workers(tmp_path, workers, broker):
+    app = Flask(__name__)
+    app.config.update(WORKER_PROCESSES=workers, RATE_LIMIT_STORAGE=str(tmp_path / 'buckets.db'))
+    service = RateLimitService(app)
+
+    assert service.broker == broker
+
+
+@pytest.fixture
+def client(tmp_path):
+    app = Flask(__name__)
+    app.config['RATE_LIMITS'] = {'limited': {'rate': '2/minute', 'per': 'ip'}}
+    app.config['RATE_LIMIT_STORAGE'] = str(tmp_path / 'buckets.db')
+    # One trusted proxy in front, as with TRUSTED_PROXIES=1
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=1)
+
+    @app.route('/limited', endpoint='limited')
+    @rate_limit()
+    def limited():
+        return jsonify({'ok': True})
+
+    rate_limit_service.init_app(app)
+    yield app.test_client()
+    rate_limit_service.limits = {}
+
+
+def test_rejects_with_429_and_retry_after(client):
+    headers = {'X-Forwarded-For': '203.0.113.1'}
+    responses = [client.get('/limited', headers=headers) for _ in range(3)]
+
+    assert [response.status_code for response in responses] == [200, 200, 429]
+    assert responses[0].headers['RateLimit-Remaining'] == '1'
+    assert int(responses[2].headers['Retry-After']) >= 1
+
+
+def test_clients_behind_the_proxy_have_their_own_buckets(client):
+    for _ in range(2):
+        client.get('/limited', headers={'X-Forwarded-For': '203.0.113.1'})
+
+    assert client.get('/limited', headers={'X-Forwarded-For': '203.0.113.1'}).status_code == 429
+    assert client.get('/limited', headers={'X-Forwarded-For': '203.0.113.2'}).status_code == 200